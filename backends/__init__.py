@@ -0,0 +1,66 @@
+import importlib
+import logging
+import os
+import sys
+import threading
+from dataclasses import dataclass
+from config import BACKEND
+
+logger = logging.getLogger("bot.backends")
+
+KINDS = ("win32", "x11", "headless")
+_instances: dict[str, object] = {}
+_lock = threading.Lock()
+
+
+class BackendUnavailable(RuntimeError):
+    """The platform has no implementation for this capability (e.g. input on a headless box)."""
+
+
+@dataclass
+class WindowInfo:
+    handle: int  # HWND / X window id
+    title: str
+    process: str  # executable name, "" when unknown
+    rect: tuple[int, int, int, int]  # left, top, width, height
+    minimized: bool = False
+
+
+def platform_kind() -> str:
+    """win32, x11 (any desktop session: X11, XWayland, macOS) or headless. BACKEND overrides."""
+    if BACKEND in KINDS:
+        return BACKEND
+    if sys.platform == "win32":
+        return "win32"
+    if sys.platform == "darwin" or os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"):
+        return "x11"
+    return "headless"
+
+
+def _get(role: str):
+    """Import backends.<kind> and instantiate its `role` class on first use only."""
+    if role not in _instances:
+        with _lock:
+            if role not in _instances:
+                kind = platform_kind()
+                module = importlib.import_module(f"backends.{kind}")
+                _instances[role] = getattr(module, role)()
+                logger.debug("Loaded %s backend: %s", role.lower(), kind)
+    return _instances[role]
+
+
+def get_input():
+    """Keyboard and mouse: press(keys, repeat, interval), send(events, abort), paste(), click(x, y)."""
+    return _get("Input")
+
+
+def get_clipboard():
+    """Clipboard: set_text(text)."""
+    return _get("Clipboard")
+
+
+def get_window():
+    """Window manager: list_windows() -> [WindowInfo] (topmost first where the platform reports
+    stacking order), activate(handle), rect(handle) -> (left, top, width, height) | None,
+    active_handle() -> handle | None."""
+    return _get("Window")
@@ -0,0 +1,36 @@
+# Input events for Input.send(), plain tuples so long sequences stay cheap to build:
+# ("down", key), ("up", key), ("click", x, y), ("text", s). Key names are pyautogui's.
+DOWN, UP, CLICK, TEXT = "down", "up", "click", "text"
+BATCH = 256  # key events per OS call; the abort flag is checked between batches
+
+
+class InputAborted(RuntimeError):
+    """Input.send() stopped early because the abort event was set."""
+
+    def __init__(self, sent: int):
+        super().__init__(f"Input aborted after {sent} events")
+        self.sent = sent
+
+
+def combo(keys: list[str], repeat: int = 1) -> list[tuple]:
+    """Press a key or combo (ctrl+shift+t) `repeat` times: modifiers down in order, up in reverse."""
+    once = [(DOWN, k) for k in keys] + [(UP, k) for k in reversed(keys)]
+    return once * repeat
+
+
+def chunks(events: list[tuple], size: int = BATCH):
+    """Runs of up to `size` key events, one OS call each; text and click events come out alone."""
+    run: list[tuple] = []
+    for event in events:
+        if event[0] in (DOWN, UP):
+            run.append(event)
+            if len(run) == size:
+                yield run
+                run = []
+            continue
+        if run:
+            yield run
+            run = []
+        yield [event]
+    if run:
+        yield run
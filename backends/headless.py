@@ -0,0 +1,36 @@
+from backends import BackendUnavailable
+
+_NO_DISPLAY = "No display on this machine ({}) — running headless"
+
+
+class Input:
+    def press(self, keys: list[str], repeat: int = 1, interval: float = 0.0):
+        raise BackendUnavailable(_NO_DISPLAY.format("keyboard input"))
+
+    def send(self, events: list[tuple], abort=None) -> int:
+        raise BackendUnavailable(_NO_DISPLAY.format("input"))
+
+    def paste(self):
+        raise BackendUnavailable(_NO_DISPLAY.format("keyboard input"))
+
+    def click(self, x: int, y: int):
+        raise BackendUnavailable(_NO_DISPLAY.format("mouse input"))
+
+
+class Clipboard:
+    def set_text(self, text: str):
+        raise BackendUnavailable(_NO_DISPLAY.format("clipboard"))
+
+
+class Window:
+    def list_windows(self) -> list:
+        return []
+
+    def activate(self, handle: int):
+        raise BackendUnavailable(_NO_DISPLAY.format("windows"))
+
+    def rect(self, handle: int) -> tuple[int, int, int, int] | None:
+        return None
+
+    def active_handle(self) -> int | None:
+        return None
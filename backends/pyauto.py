@@ -0,0 +1,81 @@
+import threading
+import time
+from backends.events import CLICK, DOWN, TEXT, UP, InputAborted, chunks, combo
+
+
+class PyAutoGuiInput:
+    """Keyboard/mouse through pyautogui (Win32 SendInput, X11 XTest, macOS Quartz).
+
+    Portable fallback for send(): one pyautogui call per event, but without pyautogui's
+    per-call PAUSE. Platform backends subclass it and override _keys/_click/_text to
+    inject a whole batch per OS call.
+    """
+
+    def __init__(self):
+        import pyautogui  # slow import, and fails without a display — only load on first use
+        pyautogui.FAILSAFE = False
+        self._gui = pyautogui
+        self._keynames = set(pyautogui.KEY_NAMES)
+
+    def press(self, keys: list[str], repeat: int = 1, interval: float = 0.0):
+        """Press key or combo `repeat` times — one batch unless an interval is asked for."""
+        if not interval:
+            self.send(combo(keys, repeat))
+            return
+        for _ in range(repeat):
+            self.send(combo(keys))
+            time.sleep(interval)
+
+    def send(self, events: list[tuple], abort: threading.Event | None = None) -> int:
+        """Inject events (see backends.events) in batches; returns how many were sent.
+
+        Raises InputAborted when `abort` gets set between batches. Keys still held down
+        at the end (abort, error or an unbalanced script) are released.
+        """
+        unknown = {e[1] for e in events if e[0] in (DOWN, UP) and e[1] not in self._keynames}
+        if unknown:
+            raise ValueError(f"Unknown key: {', '.join(sorted(unknown))}")
+        sent, held = 0, {}
+        try:
+            for batch in chunks(events):
+                if abort is not None and abort.is_set():
+                    raise InputAborted(sent)
+                kind = batch[0][0]
+                if kind == TEXT:
+                    self._text(batch[0][1])
+                elif kind == CLICK:
+                    self._click(*batch[0][1:])
+                else:
+                    for k, key in batch:  # before sending, so a failed batch is released too
+                        if k == DOWN:
+                            held[key] = True
+                        else:
+                            held.pop(key, None)
+                    self._keys(batch)
+                sent += len(batch)
+        finally:
+            if held:
+                self._keys([(UP, key) for key in reversed(held)])
+        return sent
+
+    def _keys(self, batch: list[tuple]):
+        for kind, key in batch:
+            if kind == DOWN:
+                self._gui.keyDown(key, _pause=False)
+            else:
+                self._gui.keyUp(key, _pause=False)
+
+    def _click(self, x: int, y: int):
+        self._gui.click(x, y, _pause=False)
+
+    def _text(self, text: str):
+        from backends import get_clipboard
+        get_clipboard().set_text(text)
+        self.paste()
+        time.sleep(0.1)  # the target reads the clipboard asynchronously; don't overwrite it yet
+
+    def paste(self):
+        self._gui.hotkey("ctrl", "v")
+
+    def click(self, x: int, y: int):
+        self._gui.click(x, y)
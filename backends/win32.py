@@ -0,0 +1,210 @@
+import ctypes
+import logging
+import time
+from ctypes import wintypes
+from backends import WindowInfo
+from backends.events import BATCH, DOWN
+from backends.pyauto import PyAutoGuiInput
+
+logger = logging.getLogger("bot.backends.win32")
+
+_INPUT_MOUSE, _INPUT_KEYBOARD = 0, 1
+_KEYEVENTF_EXTENDEDKEY, _KEYEVENTF_KEYUP, _KEYEVENTF_UNICODE = 0x1, 0x2, 0x4
+_MOUSEEVENTF_LEFTDOWN, _MOUSEEVENTF_LEFTUP = 0x2, 0x4
+_VK_SHIFT, _VK_CONTROL, _VK_MENU, _VK_RETURN = 0x10, 0x11, 0x12, 0x0D
+# Navigation keys live on the extended keypad; without the flag some apps read them as numpad keys
+_EXTENDED = {0x21, 0x22, 0x23, 0x24, 0x25, 0x26, 0x27, 0x28, 0x2D, 0x2E, 0x5B, 0x5C, 0x6F, 0x90, 0xA3, 0xA5}
+
+
+class _KEYBDINPUT(ctypes.Structure):
+    _fields_ = [("wVk", wintypes.WORD), ("wScan", wintypes.WORD), ("dwFlags", wintypes.DWORD),
+                ("time", wintypes.DWORD), ("dwExtraInfo", ctypes.c_size_t)]
+
+
+class _MOUSEINPUT(ctypes.Structure):
+    _fields_ = [("dx", wintypes.LONG), ("dy", wintypes.LONG), ("mouseData", wintypes.DWORD),
+                ("dwFlags", wintypes.DWORD), ("time", wintypes.DWORD), ("dwExtraInfo", ctypes.c_size_t)]
+
+
+class _HARDWAREINPUT(ctypes.Structure):
+    _fields_ = [("uMsg", wintypes.DWORD), ("wParamL", wintypes.WORD), ("wParamH", wintypes.WORD)]
+
+
+class _INPUTUNION(ctypes.Union):
+    _fields_ = [("ki", _KEYBDINPUT), ("mi", _MOUSEINPUT), ("hi", _HARDWAREINPUT)]
+
+
+class _INPUT(ctypes.Structure):
+    _fields_ = [("type", wintypes.DWORD), ("u", _INPUTUNION)]
+
+
+class Input(PyAutoGuiInput):
+    """SendInput with a whole batch of events per call; text goes in as Unicode key events."""
+
+    def __init__(self):
+        super().__init__()
+        from pyautogui._pyautogui_win import keyboardMapping  # name → VK code (+ modifier bits)
+        self._vk = keyboardMapping
+        self._u32 = u32 = ctypes.windll.user32
+        u32.SendInput.argtypes = [wintypes.UINT, ctypes.POINTER(_INPUT), ctypes.c_int]
+        u32.SendInput.restype = wintypes.UINT
+        self._scan = {}
+
+    def _key(self, vk: int, up: bool) -> _INPUT:
+        if vk not in self._scan:
+            self._scan[vk] = self._u32.MapVirtualKeyW(vk, 0)
+        flags = (_KEYEVENTF_KEYUP if up else 0) | (_KEYEVENTF_EXTENDEDKEY if vk in _EXTENDED else 0)
+        return _INPUT(_INPUT_KEYBOARD, _INPUTUNION(ki=_KEYBDINPUT(vk, self._scan[vk], flags, 0, 0)))
+
+    def _inject(self, inputs: list[_INPUT]):
+        if not inputs:
+            return
+        array = (_INPUT * len(inputs))(*inputs)
+        sent = self._u32.SendInput(len(inputs), array, ctypes.sizeof(_INPUT))
+        if sent != len(inputs):
+            # UIPI: an elevated foreground window rejects input from a non-elevated process
+            raise OSError(f"SendInput injected {sent}/{len(inputs)} events (target window elevated?)")
+
+    def _keys(self, batch: list[tuple]):
+        inputs = []
+        for kind, key in batch:
+            mods, vk = divmod(self._vk[key] or 0, 0x100)
+            if kind != DOWN:
+                inputs.append(self._key(vk, True))
+                continue
+            # Characters like '@' carry the modifiers needed to type them (as pyautogui does)
+            shift = mods & 1 or self._gui.isShiftCharacter(key)
+            wrap = [m for m, on in ((_VK_MENU, mods & 4), (_VK_CONTROL, mods & 2), (_VK_SHIFT, shift)) if on]
+            inputs += [self._key(m, False) for m in wrap]
+            inputs.append(self._key(vk, False))
+            inputs += [self._key(m, True) for m in reversed(wrap)]
+        self._inject(inputs)
+
+    def _click(self, x: int, y: int):
+        self._u32.SetCursorPos(x, y)
+        self._inject([_INPUT(_INPUT_MOUSE, _INPUTUNION(mi=_MOUSEINPUT(0, 0, 0, flags, 0, 0)))
+                      for flags in (_MOUSEEVENTF_LEFTDOWN, _MOUSEEVENTF_LEFTUP)])
+
+    def _text(self, text: str):
+        """Unicode key events — any language, no clipboard round-trip."""
+        inputs = []
+        for line_no, line in enumerate(text.split("\n")):
+            if line_no:
+                inputs += [self._key(_VK_RETURN, False), self._key(_VK_RETURN, True)]
+            data = line.encode("utf-16-le")
+            for i in range(0, len(data), 2):
+                unit = int.from_bytes(data[i:i + 2], "little")
+                for flags in (_KEYEVENTF_UNICODE, _KEYEVENTF_UNICODE | _KEYEVENTF_KEYUP):
+                    inputs.append(_INPUT(_INPUT_KEYBOARD, _INPUTUNION(ki=_KEYBDINPUT(0, unit, flags, 0, 0))))
+        for i in range(0, len(inputs), BATCH):
+            self._inject(inputs[i:i + BATCH])
+
+
+class Clipboard:
+    """Clipboard via Win32 API — 64-bit safe with error checks."""
+
+    def __init__(self):
+        # Fix 64-bit pointer truncation for clipboard Win32 calls
+        self._k32 = k32 = ctypes.windll.kernel32
+        self._u32 = u32 = ctypes.windll.user32
+        vp = ctypes.c_void_p
+        k32.GlobalAlloc.restype = k32.GlobalLock.restype = vp
+        k32.GlobalAlloc.argtypes = [ctypes.c_uint, ctypes.c_size_t]
+        k32.GlobalLock.argtypes = k32.GlobalUnlock.argtypes = k32.GlobalFree.argtypes = [vp]
+        u32.SetClipboardData.restype = vp
+        u32.SetClipboardData.argtypes = [ctypes.c_uint, vp]
+
+    def set_text(self, text: str):
+        k32, u32 = self._k32, self._u32
+        if not u32.OpenClipboard(0):
+            raise OSError("OpenClipboard failed")
+        try:
+            u32.EmptyClipboard()
+            data = text.encode("utf-16-le") + b"\x00\x00"
+            h_mem = k32.GlobalAlloc(0x0002, len(data))
+            if not h_mem:
+                raise OSError("GlobalAlloc failed")
+            p_mem = k32.GlobalLock(h_mem)
+            if not p_mem:
+                k32.GlobalFree(h_mem)
+                raise OSError("GlobalLock failed")
+            ctypes.memmove(p_mem, data, len(data))
+            k32.GlobalUnlock(h_mem)
+            u32.SetClipboardData(13, h_mem)
+        finally:
+            u32.CloseClipboard()
+
+
+_WNDENUMPROC = ctypes.WINFUNCTYPE(wintypes.BOOL, wintypes.HWND, wintypes.LPARAM)
+_PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+
+
+class Window:
+    """Windows enumerated with EnumWindows (one pass, no per-window COM/pygetwindow objects)."""
+
+    def __init__(self):
+        import pygetwindow  # activation with its minimize/restore workaround
+        self._gw = pygetwindow
+        self._u32, self._k32 = ctypes.windll.user32, ctypes.windll.kernel32
+        self._u32.GetForegroundWindow.restype = wintypes.HWND
+        self._exe: dict[int, str] = {}  # pid -> executable name
+
+    @staticmethod
+    def _activate(win):
+        """Activate window with minimize/restore fallback for Windows."""
+        try:
+            win.activate()
+        except Exception:
+            # Windows blocks .activate() when caller isn't foreground —
+            # minimize+restore forces the OS to bring it forward
+            if win.isMinimized:
+                win.restore()
+            else:
+                win.minimize()
+                time.sleep(0.1)
+                win.restore()
+
+    def _process(self, hwnd: int) -> str:
+        pid = wintypes.DWORD()
+        self._u32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+        if pid.value not in self._exe:
+            name = ""
+            handle = self._k32.OpenProcess(_PROCESS_QUERY_LIMITED_INFORMATION, False, pid.value)
+            if handle:
+                buf, size = ctypes.create_unicode_buffer(260), wintypes.DWORD(260)
+                if self._k32.QueryFullProcessImageNameW(handle, 0, buf, ctypes.byref(size)):
+                    name = buf.value.rsplit("\\", 1)[-1]
+                self._k32.CloseHandle(handle)
+            self._exe[pid.value] = name
+        return self._exe[pid.value]
+
+    def list_windows(self) -> list[WindowInfo]:
+        u32, handles = self._u32, []
+
+        @_WNDENUMPROC
+        def collect(hwnd, _):
+            if u32.IsWindowVisible(hwnd) and u32.GetWindowTextLengthW(hwnd):
+                handles.append(hwnd)
+            return True
+
+        u32.EnumWindows(collect, 0)  # z-order: topmost first
+        windows = []
+        for hwnd in handles:
+            title = ctypes.create_unicode_buffer(u32.GetWindowTextLengthW(hwnd) + 1)
+            u32.GetWindowTextW(hwnd, title, len(title))
+            rect = self.rect(hwnd)
+            if rect is not None:
+                windows.append(WindowInfo(hwnd, title.value, self._process(hwnd), rect, bool(u32.IsIconic(hwnd))))
+        return windows
+
+    def activate(self, handle: int):
+        self._activate(self._gw.Win32Window(handle))
+
+    def rect(self, handle: int) -> tuple[int, int, int, int] | None:
+        r = wintypes.RECT()
+        if not self._u32.GetWindowRect(handle, ctypes.byref(r)):
+            return None  # window is gone
+        return r.left, r.top, r.right - r.left, r.bottom - r.top
+
+    def active_handle(self) -> int | None:
+        return self._u32.GetForegroundWindow() or None
@@ -0,0 +1,145 @@
+import logging
+import shutil
+import subprocess
+import sys
+from backends import BackendUnavailable, WindowInfo
+from backends.events import DOWN
+from backends.pyauto import PyAutoGuiInput
+
+logger = logging.getLogger("bot.backends.x11")
+
+
+class XTestInput(PyAutoGuiInput):
+    """XTest fake_input on pyautogui's Xlib display: a whole batch of events, then one round-trip."""
+
+    def __init__(self):
+        super().__init__()
+        from Xlib import X
+        from Xlib.ext.xtest import fake_input
+        from pyautogui import _pyautogui_x11  # its display and name → keycode map
+        self._X, self._fake = X, fake_input
+        self._display, self._codes = _pyautogui_x11._display, _pyautogui_x11.keyboardMapping
+
+    def _keys(self, batch: list[tuple]):
+        X, fake, display, shift = self._X, self._fake, self._display, self._codes["shift"]
+        for kind, key in batch:
+            code = self._codes.get(key)
+            if code is None:
+                raise ValueError(f"Key not on this keyboard layout: {key}")
+            if kind != DOWN:
+                fake(display, X.KeyRelease, code)
+            elif self._gui.isShiftCharacter(key):  # '@', 'A': typed with shift, as pyautogui does
+                fake(display, X.KeyPress, shift)
+                fake(display, X.KeyPress, code)
+                fake(display, X.KeyRelease, shift)
+            else:
+                fake(display, X.KeyPress, code)
+        self._display.sync()
+
+    def _click(self, x: int, y: int):
+        X, fake, display = self._X, self._fake, self._display
+        fake(display, X.MotionNotify, x=x, y=y)
+        fake(display, X.ButtonPress, 1)
+        fake(display, X.ButtonRelease, 1)
+        display.sync()
+
+
+# macOS desktops share this backend but have no X server: pyautogui drives Quartz there
+Input = PyAutoGuiInput if sys.platform == "darwin" else XTestInput
+
+# First available tool wins; each reads the text on stdin
+_CLIPBOARD_TOOLS = [
+    ["xclip", "-selection", "clipboard"],
+    ["xsel", "--clipboard", "--input"],
+    ["wl-copy"],
+    ["pbcopy"],
+]
+
+
+class Clipboard:
+    """Clipboard via xclip/xsel (X11), wl-copy (Wayland) or pbcopy (macOS)."""
+
+    def __init__(self):
+        self._cmd = next((c for c in _CLIPBOARD_TOOLS if shutil.which(c[0])), None)
+
+    def set_text(self, text: str):
+        if self._cmd is None:
+            raise BackendUnavailable("No clipboard tool found (install xclip or xsel)")
+        # xclip keeps running to serve the selection: don't wait on its output pipes
+        subprocess.run(self._cmd, input=text.encode("utf-8"), stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL, timeout=5, check=True)
+
+
+class Window:
+    """Windows via wmctrl (one call lists all) or xdotool."""
+
+    def __init__(self):
+        self._xdotool = shutil.which("xdotool")
+        self._wmctrl = shutil.which("wmctrl")
+        self._xprop = shutil.which("xprop")
+
+    def _run(self, *args: str) -> str:
+        if self._xdotool is None:
+            raise BackendUnavailable("xdotool not installed")
+        proc = subprocess.run([self._xdotool, *args], capture_output=True, text=True, timeout=5)
+        return proc.stdout.strip()
+
+    @staticmethod
+    def _process(pid: int) -> str:
+        try:
+            with open(f"/proc/{pid}/comm", encoding="utf-8") as f:
+                return f.read().strip()
+        except OSError:
+            return ""
+
+    def _stacking(self) -> list[int]:
+        """Window ids bottom-to-top from _NET_CLIENT_LIST_STACKING ([] without xprop or EWMH)."""
+        if self._xprop is None:
+            return []
+        # _NET_CLIENT_LIST_STACKING(WINDOW): window id # 0x1e00003, 0x3a00003
+        out = subprocess.run([self._xprop, "-root", "_NET_CLIENT_LIST_STACKING"],
+                             capture_output=True, text=True, timeout=5).stdout
+        _, _, ids = out.partition("#")
+        return [int(wid, 16) for wid in ids.replace(",", " ").split() if wid.startswith("0x")]
+
+    def list_windows(self) -> list[WindowInfo]:
+        """Topmost first when the WM publishes stacking order; wmctrl/xdotool alone list in mapping order."""
+        windows = self._list()
+        order = {wid: z for z, wid in enumerate(reversed(self._stacking()))}
+        return sorted(windows, key=lambda w: order.get(w.handle, len(order)))
+
+    def _list(self) -> list[WindowInfo]:
+        if self._wmctrl:
+            # 0x03a00003  0 4242   10 40 800 600 host Title with spaces
+            out = subprocess.run([self._wmctrl, "-lpG"], capture_output=True, text=True, timeout=5).stdout
+            windows = []
+            for line in out.splitlines():
+                parts = line.split(None, 8)
+                if len(parts) < 9 or parts[1] == "-1":  # -1: sticky panels/docks
+                    continue
+                x, y, w, h = map(int, parts[3:7])
+                windows.append(WindowInfo(int(parts[0], 16), parts[8], self._process(int(parts[2])), (x, y, w, h)))
+            return windows
+        windows = []
+        for wid in self._run("search", "--onlyvisible", "--name", ".").split():
+            rect = self.rect(int(wid))
+            pid = self._run("getwindowpid", wid)
+            if rect is not None:
+                title = self._run("getwindowname", wid)
+                windows.append(WindowInfo(int(wid), title, self._process(int(pid)) if pid.isdigit() else "", rect))
+        return windows
+
+    def activate(self, handle: int):
+        self._run("windowactivate", "--sync", str(handle))
+
+    def rect(self, handle: int) -> tuple[int, int, int, int] | None:
+        out = self._run("getwindowgeometry", "--shell", str(handle))
+        geo = dict(line.split("=", 1) for line in out.splitlines() if "=" in line)
+        try:
+            return int(geo["X"]), int(geo["Y"]), int(geo["WIDTH"]), int(geo["HEIGHT"])
+        except (KeyError, ValueError):
+            return None
+
+    def active_handle(self) -> int | None:
+        wid = self._run("getactivewindow")
+        return int(wid) if wid.isdigit() else None
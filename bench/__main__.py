@@ -0,0 +1,353 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from config import VERSION
+from bench.fakes import FakeBot, FakeUpdate, SyntheticScreen, Timer, fake_context, install_screen
+
+logger = logging.getLogger("bot.bench")
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+CASES = {}
+
+
+def case(name: str):
+    def register(func):
+        CASES[name] = func
+        return func
+    return register
+
+
+def _grab_function():
+    """handlers.screen._grab_to_jpeg when the screen handler imports here, else the same capture+encode path."""
+    try:
+        from handlers.screen import _grab_to_jpeg
+        return _grab_to_jpeg, "handlers.screen._grab_to_jpeg"
+    except ImportError as e:
+        from utils.capture import engine
+        from utils.encoder import encode
+        logger.warning("handlers.screen unavailable (%s), timing engine.capture + encode", e)
+        return lambda region=None: encode(engine.capture(region)).buf, "engine.capture+encode"
+
+
+@case("grab")
+def bench_grab(quick: bool) -> dict:
+    """Full-screen capture + encode per resolution and content type."""
+    from utils.capture import engine
+    grab, path = _grab_function()
+    sizes = [(1280, 720), (1920, 1080)] if quick else [(1280, 720), (1920, 1080), (2560, 1440), (3840, 2160)]
+    out = {"path": path}
+    for kind in ("ide", "photo"):
+        for w, h in sizes:
+            install_screen(engine, SyntheticScreen(w, h, kind))
+            grab()  # warm-up
+            timer = Timer()
+            for _ in range(2 if quick else 5):
+                with timer:
+                    buf = grab()
+            out[f"{kind}/{w}x{h}"] = {**timer.summary(), "bytes": buf.getbuffer().nbytes}
+    return out
+
+
+@case("monitors")
+def bench_monitors(quick: bool) -> dict:
+    """/screen all: N 1080p monitors grabbed and encoded in parallel vs one monitor."""
+    from handlers.screen import _grab_monitor, _grab_to_jpeg
+    from utils.capture import engine
+    from utils.executor import run_blocking
+
+    async def grab_all(monitors):
+        return await asyncio.gather(*(run_blocking(_grab_monitor, m) for m in monitors))
+
+    out = {}
+    for count in (2, 3):
+        screen = SyntheticScreen(1920, 1080, "photo", monitors=count)
+        install_screen(engine, screen)
+        single, parallel = Timer(), Timer()
+        asyncio.run(grab_all(screen.monitors[1:]))  # warm-up (starts the encode pool)
+        for _ in range(2 if quick else 5):
+            with single:
+                _grab_to_jpeg(screen.monitors[1])
+            with parallel:
+                asyncio.run(grab_all(screen.monitors[1:]))
+        out[f"{count}x1080p"] = {"single": single.summary(), "all": parallel.summary()}
+    return out
+
+
+@case("encode_quality")
+def bench_encode_quality(quick: bool) -> dict:
+    """JPEG path with different quality caps (SCREENSHOT_QUALITY) on a photographic 1080p frame."""
+    import utils.encoder as encoder
+    screen = SyntheticScreen(1920, 1080, "photo")
+    img = _frame_image(screen)
+    default = encoder.SCREENSHOT_QUALITY
+    out = {}
+    try:
+        for q in (50, 70, 90):
+            encoder.SCREENSHOT_QUALITY = q
+            timer = Timer()
+            for _ in range(2 if quick else 5):
+                with timer:
+                    result = encoder.encode(img)
+            out[f"q{q}"] = {**timer.summary(), "bytes": result.size, "quality": result.quality}
+    finally:
+        encoder.SCREENSHOT_QUALITY = default
+    return out
+
+
+def _frame_image(screen: SyntheticScreen):
+    from PIL import Image
+    raw = screen.grab(screen.monitors[1])
+    return Image.frombuffer("RGB", raw.size, raw.bgra, "raw", "BGRX", 0, 1)
+
+
+def _sample_text(kind: str, size: int, rng: random.Random) -> str:
+    lines, total = [], 0
+    while total < size:
+        if kind == "code" and rng.random() < 0.05:
+            line = "```" if len(lines) % 2 else "```python"
+        elif kind == "emoji":
+            line = "".join(rng.choice("ab ✅🚀日本") for _ in range(rng.randrange(10, 120)))
+        else:
+            line = f"{time.strftime('%H:%M:%S')} INFO task-{rng.randrange(1000)} " + "x" * rng.randrange(0, 140)
+        lines.append(line)
+        total += len(line) + 1
+    return "\n".join(lines)
+
+
+@case("chunks")
+def bench_chunks(quick: bool) -> dict:
+    """split_message + send_long_text on large command outputs."""
+    from utils.chunks import send_long_text, split_message
+    rng = random.Random(3)
+    sizes = [8_000, 64_000] if quick else [8_000, 64_000, 1_000_000]
+    out = {}
+    for kind in ("log", "code", "emoji"):
+        for size in sizes:
+            text = _sample_text(kind, size, rng)
+            split, send = Timer(), Timer()
+            for _ in range(3):
+                with split:
+                    parts = split_message(text)
+            bot = FakeBot()
+            for _ in range(3):
+                bot.reset()
+                with send:
+                    asyncio.run(send_long_text(FakeUpdate(bot), text))
+            out[f"{kind}/{size // 1000}k"] = {
+                "split": split.summary(), "send": send.summary(),
+                "chunks": len(parts), "api_calls": bot.count(), "bytes_sent": sum(n for _, n in bot.calls),
+            }
+    return out
+
+
+def _make_apk_tree(root: str, modules: int, rng: random.Random) -> int:
+    """Gradle-like projects: build outputs with APKs plus source/intermediate noise. Returns APK count."""
+    apks = 0
+    for m in range(modules):
+        project = os.path.join(root, f"project{m // 10}", f"module{m}")
+        for variant in ("debug", "release"):
+            d = os.path.join(project, "build", "outputs", "apk", variant)
+            os.makedirs(d)
+            with open(os.path.join(d, f"module{m}-{variant}.apk"), "wb") as f:
+                f.write(os.urandom(rng.randrange(1024, 8192)))
+            apks += 1
+        for sub in ("src/main/java", "build/intermediates/classes"):
+            d = os.path.join(project, *sub.split("/"))
+            os.makedirs(d)
+            for i in range(rng.randrange(5, 30)):
+                open(os.path.join(d, f"F{i}.java"), "w").close()
+    return apks
+
+
+@case("find_apks")
+def bench_find_apks(quick: bool) -> dict:
+    """APK index over generated trees: cold scan, unchanged refresh, query, _find_apks."""
+    from utils.apk_index import ApkIndex
+    out = {}
+    for modules in ([20, 100] if quick else [20, 200, 1000]):
+        root = tempfile.mkdtemp(prefix="bench_apks_")
+        try:
+            apks = _make_apk_tree(root, modules, random.Random(modules))
+            index_file = os.path.join(root, "index.json")
+            cold, warm, query = Timer(), Timer(), Timer()
+            with cold:
+                index = ApkIndex([root], path=index_file, ttl=0)
+                index.refresh(force=True)
+            for _ in range(5):
+                with warm:
+                    index.refresh(force=True)
+                with query:
+                    index.query("release")
+            entry = {"apks": apks, "cold": cold.summary(), "refresh": warm.summary(), "query": query.summary()}
+            try:
+                import handlers.files as files
+            except ImportError as e:
+                entry["find_apks"] = {"skipped": str(e)}
+            else:
+                saved, files.apk_index = files.apk_index, index
+                found = Timer()
+                try:
+                    for _ in range(5):
+                        with found:
+                            files._find_apks("debug")
+                finally:
+                    files.apk_index = saved
+                entry["find_apks"] = found.summary()
+            out[f"{modules}_modules"] = entry
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+    return out
+
+
+async def _roundtrip(handler, args: list[str], latency: float, repeat: int) -> dict:
+    bot = FakeBot(latency)
+    timer = Timer()
+    for _ in range(repeat):
+        bot.reset()
+        with timer:
+            await handler(FakeUpdate(bot), fake_context(bot, args))
+    return {**timer.summary(), "api_calls": bot.count()}
+
+
+@case("handlers")
+def bench_handlers(quick: bool) -> dict:
+    """Update → reply latency through auth, limiter and handler, with 0 and 50ms simulated API latency."""
+    from utils.ratelimit import limiter
+    limiter.buckets.clear()  # measure the handlers, not the configured pacing
+    repo = tempfile.mkdtemp(prefix="bench_repo_")
+    subprocess.run(["git", "init", "-q", repo], check=False)
+    for i in range(50):
+        with open(os.path.join(repo, f"f{i}.txt"), "w") as f:
+            f.write("x\n" * i)
+
+    targets = []
+    try:
+        import handlers.git as git
+        git._git_dir = repo
+        targets += [("git_status", git.git_cmd, ["status"]), ("git_log", git.git_cmd, ["log"])]
+    except ImportError as e:
+        logger.warning("handlers.git unavailable: %s", e)
+    try:
+        from handlers.shell import sh_cmd
+        targets.append(("sh_echo", sh_cmd, ["echo hello"]))
+    except ImportError as e:
+        logger.warning("handlers.shell unavailable: %s", e)
+    try:
+        from handlers.screen import screen_cmd
+        from utils.capture import engine
+        install_screen(engine, SyntheticScreen(1920, 1080, "ide"))
+        targets.append(("screen", screen_cmd, []))
+    except ImportError as e:
+        logger.warning("handlers.screen unavailable: %s", e)
+
+    async def run_all() -> dict:
+        res = {}
+        for name, handler, args in targets:
+            for latency in (0.0, 0.05):
+                res[f"{name}/{int(latency * 1000)}ms"] = await _roundtrip(handler, args, latency, 3 if quick else 10)
+        return res
+
+    try:
+        return asyncio.run(run_all())
+    finally:
+        shutil.rmtree(repo, ignore_errors=True)
+
+
+@case("startup")
+def bench_startup(quick: bool) -> dict:
+    """Cold interpreter: import bot (handlers load lazily) vs. importing every handler module up front."""
+    handlers = ["screen", "live", "input", "files", "shell", "claude", "jobs", "metrics", "git", "panel"]
+    eager = "; ".join(f"import handlers.{h}" for h in handlers)
+    out = {}
+    for name, code in (("import_bot", "import bot"), ("import_bot_all_handlers", f"import bot; {eager}")):
+        timer = Timer()
+        for _ in range(2 if quick else 5):
+            with timer:
+                subprocess.run([sys.executable, "-c", code], capture_output=True, check=True,
+                               cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        out[name] = timer.summary()
+    return out
+
+
+def _flatten(d: dict, prefix: str = "") -> dict[str, float]:
+    flat = {}
+    for k, v in d.items():
+        key = f"{prefix}/{k}" if prefix else k
+        if isinstance(v, dict):
+            flat.update(_flatten(v, key))
+        elif isinstance(v, (int, float)) and k.endswith("_ms") and k != "min_ms":
+            flat[key] = v
+    return flat
+
+
+def compare(current: dict, baseline_path: str):
+    """Print mean/p95 changes against an earlier results file."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    old, new = _flatten(baseline["cases"]), _flatten(current["cases"])
+    print(f"\nvs {baseline.get('version')} ({os.path.basename(baseline_path)}):")
+    for key in sorted(new.keys() & old.keys()):
+        if not key.endswith(("mean_ms", "p95_ms")) or old[key] <= 0:
+            continue
+        change = (new[key] - old[key]) / old[key] * 100
+        flag = "  <-- slower" if change > 15 else ""
+        print(f"  {key:<55} {old[key]:>10.2f} → {new[key]:>10.2f} ms ({change:+.0f}%){flag}")
+
+
+def _latest_result(exclude: str) -> str | None:
+    if not os.path.isdir(RESULTS_DIR):
+        return None
+    files = [os.path.join(RESULTS_DIR, n) for n in os.listdir(RESULTS_DIR) if n.endswith(".json")]
+    files = [p for p in files if os.path.abspath(p) != os.path.abspath(exclude)]
+    return max(files, key=os.path.getmtime) if files else None
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Offline benchmarks for TG-IDE-Bot hot paths")
+    parser.add_argument("cases", nargs="*", help=f"subset of: {', '.join(CASES)}")
+    parser.add_argument("--quick", action="store_true", help="fewer sizes and repetitions")
+    parser.add_argument("--out", help=f"results JSON (default {RESULTS_DIR}/v<version>.json)")
+    parser.add_argument("--compare", nargs="?", const="latest", help="results file to diff against (default: newest other)")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    unknown = set(args.cases) - CASES.keys()
+    if unknown:
+        parser.error(f"unknown case(s): {', '.join(sorted(unknown))}")
+    results = {
+        "version": VERSION,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": f"{platform.system()} {platform.machine()}",
+        "quick": args.quick,
+        "cases": {},
+    }
+    for name in args.cases or CASES:
+        start = time.perf_counter()
+        print(f"{name}...", end=" ", flush=True)
+        results["cases"][name] = CASES[name](args.quick)
+        print(f"{time.perf_counter() - start:.1f}s")
+
+    out = args.out or os.path.join(RESULTS_DIR, f"v{VERSION}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results: {out}")
+
+    baseline = _latest_result(out) if args.compare == "latest" else args.compare
+    if baseline:
+        compare(results, baseline)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+import asyncio
+import io
+import itertools
+import random
+import time
+from types import SimpleNamespace
+from PIL import Image, ImageDraw
+from config import ALLOWED_USER_ID
+
+
+def _payload_size(value) -> int:
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, io.IOBase):
+        pos = value.tell()
+        value.seek(0, 2)
+        size = value.tell()
+        value.seek(pos)
+        return size
+    return 0
+
+
+class FakeBot:
+    """Records every Bot API call; each call takes `latency` seconds (simulated network)."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls: list[tuple[str, int]] = []  # (method, payload bytes)
+        self._ids = itertools.count(1)
+
+    def __getattr__(self, method: str):
+        if method.startswith("_"):
+            raise AttributeError(method)
+
+        async def call(*args, **kwargs):
+            payload = next((v for k, v in kwargs.items() if k in ("text", "photo", "document", "media")),
+                           args[1] if len(args) > 1 else None)
+            self.calls.append((method, _payload_size(payload)))
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            chat_id = kwargs.get("chat_id", args[0] if args else 1)
+            text = payload if isinstance(payload, str) else ""
+            return FakeMessage(self, chat_id, text, next(self._ids))
+
+        return call
+
+    def count(self, method: str | None = None) -> int:
+        return sum(1 for m, _ in self.calls if method is None or m == method)
+
+    def reset(self):
+        self.calls.clear()
+
+
+class FakeMessage:
+    def __init__(self, bot: FakeBot, chat_id: int = 1, text: str = "", message_id: int = 1):
+        self._bot = bot
+        self.chat_id = chat_id
+        self.chat = SimpleNamespace(id=chat_id)
+        self.text = text
+        self.message_id = message_id
+
+    def get_bot(self) -> FakeBot:
+        return self._bot
+
+    async def reply_text(self, text, **kwargs):
+        return await self._bot.send_message(self.chat_id, text, **kwargs)
+
+    async def reply_photo(self, photo, **kwargs):
+        return await self._bot.send_photo(self.chat_id, photo=photo, **kwargs)
+
+    async def reply_document(self, document, **kwargs):
+        return await self._bot.send_document(self.chat_id, document=document, **kwargs)
+
+    async def reply_media_group(self, media, **kwargs):
+        return await self._bot.send_media_group(self.chat_id, media=media, **kwargs)
+
+    async def edit_text(self, text, **kwargs):
+        return await self._bot.edit_message_text(text, chat_id=self.chat_id, message_id=self.message_id, **kwargs)
+
+
+class FakeUpdate:
+    """Update from the allowed user carrying a text message."""
+
+    def __init__(self, bot: FakeBot, text: str = "", chat_id: int = 1):
+        self._bot = bot
+        self.effective_user = SimpleNamespace(id=ALLOWED_USER_ID)
+        self.effective_chat = SimpleNamespace(id=chat_id)
+        self.message = FakeMessage(bot, chat_id, text)
+        self.effective_message = self.message
+        self.callback_query = None
+
+    def get_bot(self) -> FakeBot:
+        return self._bot
+
+
+def fake_context(bot: FakeBot, args: list[str] | None = None):
+    """Minimal CallbackContext: args, bot and an application that can start tasks."""
+    app = SimpleNamespace(create_task=asyncio.ensure_future, bot=bot)
+    return SimpleNamespace(args=list(args or []), bot=bot, application=app)
+
+
+class SyntheticScreen:
+    """mss-compatible framebuffer: `grab(region)` returns BGRA frames of an IDE-like or noisy desktop."""
+
+    def __init__(self, width: int = 1920, height: int = 1080, kind: str = "ide", seed: int = 1, monitors: int = 1):
+        # Monitors sit side by side; monitors[0] is their bounding box, as in mss
+        self.width, self.height, self.kind = width * monitors, height, kind
+        self.monitors = [{"left": 0, "top": 0, "width": self.width, "height": height}]
+        self.monitors += [{"left": i * width, "top": 0, "width": width, "height": height} for i in range(monitors)]
+        self._frame = self._render(random.Random(seed))
+        self.grabs = 0
+
+    def _render(self, rng: random.Random) -> bytes:
+        w, h = self.width, self.height
+        if self.kind == "photo":
+            img = Image.effect_noise((w, h), 64).convert("RGB")
+            img = Image.blend(img, Image.linear_gradient("L").resize((w, h)).convert("RGB"), 0.5)
+        else:
+            # Dark editor: sidebar, gutter and lines of "glyph" blocks in a few syntax colors
+            img = Image.new("RGB", (w, h), (30, 31, 34))
+            draw = ImageDraw.Draw(img)
+            draw.rectangle((0, 0, w // 6, h), fill=(43, 45, 48))
+            palette = [(206, 141, 109), (86, 156, 214), (181, 206, 168), (212, 212, 212), (106, 153, 85)]
+            for y in range(8, h - 16, 18):
+                x = w // 6 + 40 + rng.randrange(0, 8) * 16
+                for _ in range(rng.randrange(0, 12)):
+                    word = rng.randrange(16, 90)
+                    draw.rectangle((x, y, x + word, y + 11), fill=rng.choice(palette))
+                    x += word + 8
+        return img.convert("RGBA").tobytes("raw", "BGRA")
+
+    def grab(self, region: dict):
+        """Crop region out of the cached frame (copying, like a real grab)."""
+        self.grabs += 1
+        left, top = region["left"], region["top"]
+        width, height = region["width"], region["height"]
+        if (left, top, width, height) == (0, 0, self.width, self.height):
+            data = bytes(self._frame)
+        else:
+            stride = self.width * 4
+            rows = (self._frame[(top + y) * stride + left * 4:(top + y) * stride + (left + width) * 4]
+                    for y in range(height))
+            data = b"".join(rows)
+        return SimpleNamespace(size=(width, height), bgra=data)
+
+
+def install_screen(engine, screen: SyntheticScreen):
+    """Point a CaptureEngine at a synthetic screen instead of mss."""
+    engine._sct = lambda: screen
+    engine._monitors = [dict(m) for m in screen.monitors]
+    engine.last_frame = None
+
+
+class Timer:
+    """perf_counter samples → summary dict in milliseconds."""
+
+    def __init__(self):
+        self.samples: list[float] = []
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.samples.append((time.perf_counter() - self._start) * 1000)
+
+    def summary(self) -> dict:
+        s = sorted(self.samples)
+        if not s:
+            return {"n": 0}
+        return {
+            "n": len(s),
+            "mean_ms": round(sum(s) / len(s), 3),
+            "p50_ms": round(s[len(s) // 2], 3),
+            "p95_ms": round(s[min(len(s) - 1, int(len(s) * 0.95))], 3),
+            "min_ms": round(s[0], 3),
+        }
@@ -0,0 +1,76 @@
+import argparse
+import json
+import time
+import urllib.error
+import urllib.request
+from config import ALLOWED_USER_ID, WEBHOOK_LISTEN, WEBHOOK_PATH, WEBHOOK_PORT, WEBHOOK_SECRET
+from bench.fakes import Timer
+
+
+def synthetic_update(update_id: int, text: str = "/status") -> dict:
+    """A private-chat text message from the allowed user, as Telegram would POST it."""
+    user = {"id": ALLOWED_USER_ID, "is_bot": False, "first_name": "bench"}
+    message = {
+        "message_id": update_id, "date": int(time.time()), "text": text, "from": user,
+        "chat": {"id": ALLOWED_USER_ID, "type": "private", "first_name": "bench"},
+    }
+    if text.startswith("/"):
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+    return {"update_id": update_id, "message": message}
+
+
+def load_updates(path: str) -> list[dict]:
+    """Updates recorded by the bot with UPDATE_RECORD_FILE set (one JSON object per line)."""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def post(url: str, update: dict, secret: str | None) -> int:
+    headers = {"Content-Type": "application/json"}
+    if secret is not None:
+        headers["X-Telegram-Bot-Api-Secret-Token"] = secret
+    req = urllib.request.Request(url, data=json.dumps(update).encode(), headers=headers, method="POST")
+    try:
+        with urllib.request.urlopen(req, timeout=10) as resp:
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m bench.webhook",
+                                     description="POST recorded or synthetic updates to the bot's local webhook")
+    parser.add_argument("updates", nargs="?", help="JSON-lines file of recorded updates (default: synthetic /status)")
+    parser.add_argument("-n", type=int, default=10, help="synthetic updates to send")
+    parser.add_argument("--text", default="/status", help="text of synthetic updates")
+    parser.add_argument("--url", default=f"http://{WEBHOOK_LISTEN}:{WEBHOOK_PORT}/{WEBHOOK_PATH}")
+    parser.add_argument("--check-secret", action="store_true", help="also verify a wrong secret is rejected")
+    args = parser.parse_args()
+
+    if args.updates:
+        updates = load_updates(args.updates)
+    else:
+        base = int(time.time())  # unique update_ids across runs
+        updates = [synthetic_update(base + i, args.text) for i in range(args.n)]
+
+    timer, statuses = Timer(), {}
+    try:
+        for update in updates:
+            with timer:
+                status = post(args.url, update, WEBHOOK_SECRET)
+            statuses[status] = statuses.get(status, 0) + 1
+    except urllib.error.URLError as e:
+        raise SystemExit(f"{args.url}: {e.reason} — is the bot running with WEBHOOK_URL set?")
+    print(f"{args.url}: {len(updates)} updates, HTTP {statuses}")
+    print(json.dumps(timer.summary()))
+
+    if args.check_secret:
+        bad = post(args.url, synthetic_update(0), "wrong-secret")
+        missing = post(args.url, synthetic_update(0), None)
+        ok = bad == missing == 403
+        print(f"wrong secret → {bad}, no secret → {missing}: {'ok' if ok else 'NOT REJECTED'}")
+        raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
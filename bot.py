@@ -1,32 +1,49 @@
+import importlib
 import logging
+import sys
+import threading
 import time
 import platform
 from telegram import Update
 from telegram.ext import Application, CallbackQueryHandler, CommandHandler, MessageHandler, filters, ContextTypes
-from config import BOT_TOKEN, VERSION
+from config import BOT_TOKEN, RECORD_ALWAYS_ON, VERSION
+from backends import platform_kind
 from utils.auth import auth_required
-from handlers.screen import screen_cmd, window_cmd, crop_cmd
-from handlers.input import text_handler, key_cmd, type_cmd, click_cmd, focus_cmd
-from handlers.files import build_cmd, apk_cmd, file_cmd
-from handlers.shell import sh_cmd
-from handlers.claude import claude_cmd
-from handlers.git import git_cmd
-from handlers.panel import panel_cmd, panel_callback
+from utils.executor import in_flight, run_blocking
+from utils.jobs import jobs
+from utils.ratelimit import ChatRateLimiter
+from utils import webhook
 
 logger = logging.getLogger("bot.main")
 
 _start_time = time.time()
 
+
+def _lazy(path: str):
+    """Handler that imports its module on first update — startup skips mss, PIL and pyautogui."""
+    module, name = path.rsplit(".", 1)
+
+    async def handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        if module not in sys.modules:
+            await run_blocking(importlib.import_module, module)
+        return await getattr(sys.modules[module], name)(update, context)
+
+    handler.__name__ = name
+    return handler
+
+
 HELP_TEXT = (
     f"TG-IDE-Bot v{VERSION}\n\n"
-    "Screen:\n/screen — Screenshot\n/window — Active window\n/crop — Crop region\n\n"
+    "Screen:\n/screen — Screenshot\n/screen all|N — Other monitors\n/screen delta on|off — Changes only\n/screen grid — Overview, tap to zoom\n/live [fps] [sec] — Live view\n/record N|last — Screen clip\n/window [id|name] — Active or chosen window\n/windows [name] — List windows\n/crop — Crop region\n\n"
     "Input:\n/key <k> [N] — Key + repeat\n/type <text> — Type /commands\n"
-    "/click x y — Mouse click\n/focus <title> — Focus window\n\n"
+    "/click x y — Mouse click\n/click B2 [x y] — Click in grid cell\n/macro — Key/text/click sequences\n/focus <id|name> — Focus window\n\n"
     "Files:\n/build [dir] — Gradle build\n/build apk — Build + send APK\n"
     "/apk [filter] — Send APK\n"
-    "/file <path> — Send file\n\n"
-    "Tools:\n/sh <cmd> — Shell\n/claude <prompt> — Ask Claude\n"
+    "/file <path> — Send file\n/zip <path> — Split zip upload\n\n"
+    "Tools:\n/sh <cmd> — Shell\n/claude <prompt> — Ask Claude\n/claude new — New session\n"
     "/git — status/log/diff/branch/commit/push/pull/cd\n"
+    "/jobs — Running jobs\n/cancel <id> — Cancel job\n"
+    "/metrics [cmd] — Timings\n"
     "/panel — Control panel\n/status — Bot info\n/help — This message\n\n"
     "Plain text → typed + auto-screenshot"
 )
@@ -51,47 +68,76 @@ async def status_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     uptime = int(time.time() - _start_time)
     hours, remainder = divmod(uptime, 3600)
     minutes, seconds = divmod(remainder, 60)
+    load = in_flight()
+    screen = sys.modules.get("handlers.screen")  # only loaded once a screen command ran
+    last = screen.last_encode.summary() if screen and screen.last_encode else "-"
 
     await update.message.reply_text(
         f"TG-IDE-Bot v{VERSION}\n"
         f"Uptime: {hours}h {minutes}m {seconds}s\n"
         f"OS: {platform.system()} {platform.release()}\n"
-        f"Python: {platform.python_version()}"
+        f"Python: {platform.python_version()}\n"
+        f"In flight: {load['procs']} procs, {load['threads']} pool jobs, {jobs.running_count()} active jobs\n"
+        f"Backend: {platform_kind()}, updates via {webhook.mode}\n"
+        f"Last frame: {last}"
     )
 
 
+def _start_recorder():
+    from utils.recorder import recorder
+    recorder.start()
+
+
 def main():
     if not BOT_TOKEN:
         logger.error("BOT_TOKEN not set. Create .env file from .env.example")
         return
 
-    app = Application.builder().token(BOT_TOKEN).build()
+    # Concurrent updates: a running build must not hold up /screen or panel presses
+    # Outgoing sends/edits are paced per chat to stay under Telegram's flood limits
+    app = Application.builder().token(BOT_TOKEN).concurrent_updates(True).rate_limiter(ChatRateLimiter()).build()
 
     # Commands
     app.add_handler(CommandHandler("start", start_cmd))
     app.add_handler(CommandHandler("help", help_cmd))
     app.add_handler(CommandHandler("status", status_cmd))
-    app.add_handler(CommandHandler("screen", screen_cmd))
-    app.add_handler(CommandHandler("window", window_cmd))
-    app.add_handler(CommandHandler("crop", crop_cmd))
-    app.add_handler(CommandHandler("key", key_cmd))
-    app.add_handler(CommandHandler("type", type_cmd))
-    app.add_handler(CommandHandler("click", click_cmd))
-    app.add_handler(CommandHandler("focus", focus_cmd))
-    app.add_handler(CommandHandler("build", build_cmd))
-    app.add_handler(CommandHandler("apk", apk_cmd))
-    app.add_handler(CommandHandler("file", file_cmd))
-    app.add_handler(CommandHandler("sh", sh_cmd))
-    app.add_handler(CommandHandler("claude", claude_cmd))
-    app.add_handler(CommandHandler("git", git_cmd))
-    app.add_handler(CommandHandler("panel", panel_cmd))
-    app.add_handler(CallbackQueryHandler(panel_callback, pattern="^p:"))
+    app.add_handler(CommandHandler("screen", _lazy("handlers.screen.screen_cmd")))
+    app.add_handler(CommandHandler("live", _lazy("handlers.live.live_cmd")))
+    app.add_handler(CommandHandler("record", _lazy("handlers.record.record_cmd")))
+    app.add_handler(CommandHandler("window", _lazy("handlers.screen.window_cmd")))
+    app.add_handler(CommandHandler("windows", _lazy("handlers.windows.windows_cmd")))
+    app.add_handler(CommandHandler("crop", _lazy("handlers.screen.crop_cmd")))
+    app.add_handler(CommandHandler("key", _lazy("handlers.input.key_cmd")))
+    app.add_handler(CommandHandler("type", _lazy("handlers.input.type_cmd")))
+    app.add_handler(CommandHandler("click", _lazy("handlers.input.click_cmd")))
+    app.add_handler(CommandHandler("focus", _lazy("handlers.input.focus_cmd")))
+    app.add_handler(CommandHandler("macro", _lazy("handlers.macro.macro_cmd")))
+    app.add_handler(CommandHandler("build", _lazy("handlers.files.build_cmd")))
+    app.add_handler(CommandHandler("apk", _lazy("handlers.files.apk_cmd")))
+    app.add_handler(CommandHandler("file", _lazy("handlers.files.file_cmd")))
+    app.add_handler(CommandHandler("zip", _lazy("handlers.files.zip_cmd")))
+    app.add_handler(CommandHandler("sh", _lazy("handlers.shell.sh_cmd")))
+    app.add_handler(CommandHandler("claude", _lazy("handlers.claude.claude_cmd")))
+    app.add_handler(CommandHandler("git", _lazy("handlers.git.git_cmd")))
+    app.add_handler(CommandHandler("jobs", _lazy("handlers.jobs.jobs_cmd")))
+    app.add_handler(CommandHandler("cancel", _lazy("handlers.jobs.cancel_cmd")))
+    app.add_handler(CommandHandler("metrics", _lazy("handlers.metrics.metrics_cmd")))
+    app.add_handler(CommandHandler("panel", _lazy("handlers.panel.panel_cmd")))
+    app.add_handler(CallbackQueryHandler(_lazy("handlers.panel.panel_callback"), pattern="^p:"))
+    app.add_handler(CallbackQueryHandler(_lazy("handlers.live.live_callback"), pattern="^live:"))
+    app.add_handler(CallbackQueryHandler(_lazy("handlers.screen.zoom_callback"), pattern="^zoom:"))
+    app.add_handler(CallbackQueryHandler(_lazy("handlers.windows.window_callback"), pattern="^win:"))
+    app.add_handler(CallbackQueryHandler(_lazy("handlers.jobs.job_callback"), pattern="^job:"))
 
     # Plain text → input handler
-    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, text_handler))
+    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, _lazy("handlers.input.text_handler")))
+
+    if RECORD_ALWAYS_ON and platform_kind() != "headless":
+        # Background "what just happened" buffer for /record last; imports PIL/mss off the main thread
+        threading.Thread(target=_start_recorder, name="bot-recorder-init", daemon=True).start()
 
     logger.info("Bot started (v%s)", VERSION)
-    app.run_polling()
+    webhook.run(app)
 
 
 if __name__ == "__main__":
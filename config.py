@@ -1,3 +1,4 @@
+import hashlib
 import os
 import logging
 from dotenv import load_dotenv
@@ -7,27 +8,119 @@ load_dotenv()
 # Bot settings
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 ALLOWED_USER_ID = int(os.getenv("ALLOWED_USER_ID", "0"))
-VERSION = "0.7.5"
+VERSION = "0.22.0"
 
 # Paths
 LOG_FILE = "bot.log"
 
 # Screen capture
-SCREENSHOT_QUALITY = 70  # JPEG compression %
-SCREENSHOT_COOLDOWN = 2  # seconds between screenshots
+SCREENSHOT_QUALITY = 70  # JPEG compression % (upper bound of quality search)
+SCREENSHOT_MIN_QUALITY = 40  # lowest JPEG quality when shrinking to budget
+SCREENSHOT_MAX_DIM = 2560  # px, Telegram recompresses anything larger
+SCREENSHOT_BUDGET = 600 * 1024  # bytes per frame
+SCREENSHOT_TEXT_COLORS = 512  # frames with fewer sampled colors go lossless
+SCREENSHOT_TEXT_FORMAT = "PNG"  # PNG or WEBP for text-heavy frames
+ENCODE_PROCESSES = min(4, os.cpu_count() or 1)  # pool for /screen all (frames passed via shared memory), 0 = in-thread
+DELTA_TILE = 64  # px, tile size for change detection
+DELTA_MAX_AREA = 0.6  # send full frame when dirty bbox exceeds this share
+LIVE_MAX_FPS = 2  # Telegram edits above ~1/s per chat hit flood control
+LIVE_DEFAULT_DURATION = 60  # seconds
+LIVE_MAX_DURATION = 600  # seconds
+SETTLE_STABLE_MS = 300  # screen unchanged this long after an action → take the screenshot
+SETTLE_QUIET_MS = 500  # no visible reaction within this → don't wait any longer
+SETTLE_TIMEOUT = 3.0  # seconds, cap for animated or busy screens
+SETTLE_PASTE_TIMEOUT = 0.5  # seconds to wait for a paste to show before pressing Enter
+SETTLE_FOCUS_TIMEOUT = 1.0  # seconds to wait for a focused window to come up
+SETTLE_INTERVAL = 0.05  # seconds between samples
+SETTLE_SAMPLE_DIM = 160  # px, longest side of the grayscale sample
+SETTLE_PIXEL_DELTA = 12  # gray levels a sample pixel must move to count as changed
+SETTLE_TOLERANCE = 0.001  # share of changed sample pixels ignored (caret blink)
+ZOOM_GRID = (6, 4)  # columns, rows of /screen grid tiles (A1 = top left)
+ZOOM_OVERVIEW_DIM = 1280  # px, longest side of the grid overview
+ZOOM_KEEP = 3  # recent overviews whose full frames stay cached for tile taps
+RECORD_ALWAYS_ON = os.getenv("RECORD_ALWAYS_ON", "0") == "1"  # buffer from startup for /record last (else /record on)
+RECORD_FPS = float(os.getenv("RECORD_FPS", "4"))
+RECORD_MAX_DIM = 960  # px, longest side of buffered frames
+RECORD_BUFFER_SECONDS = 60  # oldest frames are dropped after this
+RECORD_MAX_BYTES = int(os.getenv("RECORD_MAX_MB", "48")) * 1024 * 1024  # hard cap on the compressed frame buffer
+RECORD_MAX_SECONDS = 60  # longest /record clip
+RECORD_ENCODE_TIMEOUT = 120  # seconds for ffmpeg to write an mp4
+
+# Platform backends (input, clipboard, window, capture): auto, win32, x11 or headless
+BACKEND = os.getenv("BACKEND", "auto")
+
+# Update delivery: webhook when WEBHOOK_URL is set (needs python-telegram-bot[webhooks]), else polling
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")  # public https base URL, e.g. https://bot.example.com
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "127.0.0.1")  # bind address of the embedded server
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "telegram")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET") or hashlib.sha256((BOT_TOKEN or "").encode()).hexdigest()[:32]
+WEBHOOK_HEALTH_INTERVAL = 60  # seconds between getWebhookInfo checks (falls back to polling on errors)
+UPDATE_RECORD_FILE = os.getenv("UPDATE_RECORD_FILE", "")  # append raw updates (JSON lines) for replay
+
+# Windows
+WINDOW_TTL = 2.0  # seconds a window enumeration is reused by /windows, /focus and /window <id>
+WINDOW_LIST_MAX = 20  # windows shown by /windows
+
+# Execution
+WORKER_THREADS = 4  # thread pool for capture/input/window calls
 
 # Input simulation
 TYPING_INTERVAL = 0.02  # delay between keystrokes (seconds)
+MACRO_FILE = "macros.json"  # saved /macro scripts
+MACRO_MAX_EVENTS = 20000  # key/click/text events per macro run
+MACRO_MAX_WAIT = 60  # seconds, longest single wait step
 
 # File delivery
 APK_SEARCH_DIRS = [
     os.path.expanduser("~"),  # fallback: search from home
 ]
-APK_GLOB = "**/*.apk"
+APK_INDEX_FILE = "apk_index.json"  # persisted APK index (dir mtimes + APK list)
+APK_INDEX_TTL = 30  # seconds between incremental rescans
 BUILD_CMD = "cmd /c gradlew.bat assembleDebug"
+BUILD_TIMEOUT = 300  # seconds
 PROJECT_DIR = r"C:\Users\Magerash\PycharmProjects\My habits"
 GIT_DIR = os.getenv("GIT_DIR", PROJECT_DIR)
+GIT_WORKTREE_TTL = 3  # seconds to trust cached status/diff when watchdog isn't installed
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50 MB (Telegram limit)
+FILE_CACHE_FILE = "file_cache.json"  # Telegram file_id per file content
+FILE_CACHE_MAX = 200  # entries, least recently used evicted
+ZIP_COMPRESSLEVEL = 6  # deflate level for /zip volumes
+
+# Shell
+SH_TIMEOUT = 600  # seconds, /sh streams output and can be cancelled
+STREAM_EDIT_INTERVAL = 1.5  # seconds between message edits
+STREAM_TAIL_CHARS = 3500  # rolling tail shown in the live message
+
+# Claude CLI
+CLAUDE_TIMEOUT = 600  # seconds, answers stream and can be cancelled
+
+# Rate limits: resource -> (tokens per second, burst). Bursts wait for a token instead of being rejected
+RATE_LIMITS = {
+    "screen": (0.5, 2),  # /screen, /window, /crop, panel Screen/Window
+    "input": (5.0, 10),  # keys, typing, clicks, focus
+    "build": (0.2, 2),
+    "upload": (0.5, 3),  # /apk, /file, /zip
+    "exec": (0.5, 3),  # /sh, /claude, /git
+}
+TG_CHAT_RATE = (1.0, 3)  # private chat: ~1 message/s sustained
+TG_GROUP_RATE = (20 / 60, 3)  # group chat: 20 messages/min
+TG_OVERALL_RATE = (30.0, 30)  # whole bot: 30 messages/s
+TG_MAX_RETRIES = 3  # resend after a RetryAfter flood-wait (sends only; stale edits are dropped)
+TG_MAX_RETRY_WAIT = 60  # seconds, longer flood-waits are raised to the caller
+
+# Outbound text
+SEND_MAX_CHUNKS = 3  # longer text goes out as an attachment instead of a message burst
+SEND_GZIP_OVER = 256 * 1024  # bytes, attachments above this are gzipped
+
+# Metrics
+METRICS_DEBUG = os.getenv("METRICS_DEBUG", "0") == "1"  # reply with stage timings after every command
+METRICS_PROM_FILE = os.getenv("METRICS_PROM_FILE", "")  # Prometheus textfile path, empty = off
+METRICS_PROM_INTERVAL = 15  # seconds between textfile rewrites
+
+# Jobs
+JOB_LIMITS = {"build": 1, "sh": 3, "claude": 1, "git": 1, "upload": 1, "macro": 1, "record": 1}  # concurrent jobs per kind
+JOB_HISTORY = 20  # finished jobs kept for /jobs
 
 # Logging setup
 logging.basicConfig(
@@ -1,42 +1,139 @@
+import asyncio
+import json
 import logging
 import subprocess
 from telegram import Update
 from telegram.ext import ContextTypes
+from config import CLAUDE_TIMEOUT
+from handlers.jobs import cancel_button
 from utils.auth import auth_required, rate_limit
-from utils.chunks import send_long_text
+from utils.executor import run_process, stream_process
+from utils.jobs import jobs
+from utils.stream import LineSplitter, StreamingReply
 
 logger = logging.getLogger("bot.claude")
 
+_sessions: dict[str, str] = {}  # working dir -> Claude session_id
+_help: str | None = None  # `claude --help`, read once to see which output flags this CLI has
+
+
+async def _command(prompt: str, session_id: str | None) -> list[str]:
+    """claude -p with the richest output the installed CLI supports (older ones reject unknown flags)."""
+    global _help
+    if _help is None:
+        result = await run_process(["claude", "--help"], timeout=30)
+        _help = (result.stdout + result.stderr).decode(errors="replace")
+    cmd = ["claude", "-p", prompt]
+    if "stream-json" in _help:
+        cmd += ["--output-format", "stream-json", "--verbose"]
+        if "--include-partial-messages" in _help:
+            cmd.append("--include-partial-messages")
+    if session_id:
+        cmd += ["--resume", session_id]
+    return cmd
+
+
+class _ClaudeStream:
+    """Turn `claude -p --output-format stream-json` lines into text for the live reply."""
+
+    def __init__(self, reply: StreamingReply):
+        self.reply = reply
+        self.session_id = ""
+        self.cost = 0.0
+        self.streamed = False
+        self.errors: list[str] = []
+
+    def on_line(self, line: str):
+        line = line.strip()
+        if not line:
+            return
+        try:
+            event = json.loads(line)
+        except ValueError:
+            self._emit(line + "\n")  # older CLI without stream-json: plain text
+            return
+
+        self.session_id = event.get("session_id") or self.session_id
+        kind = event.get("type")
+        if kind == "stream_event":
+            delta = event.get("event", {}).get("delta", {})
+            if delta.get("type") == "text_delta":
+                self.streamed = True
+                self._emit(delta.get("text", ""))
+        elif kind == "assistant" and not self.streamed:
+            # CLI without partial messages: whole text blocks per turn
+            for block in event.get("message", {}).get("content", []):
+                if block.get("type") == "text":
+                    self._emit(block.get("text", "") + "\n")
+        elif kind == "result":
+            self.cost = event.get("total_cost_usd") or 0.0
+            if event.get("is_error"):
+                self.errors.append(str(event.get("result") or event.get("subtype")))
+            elif self.reply.total_chars == 0 and event.get("result"):
+                self._emit(event["result"])
+
+    def _emit(self, text: str):
+        self.reply.feed(text.encode("utf-8"))
+
+    def on_stderr(self, line: str):
+        if line.strip():
+            self.errors.append(line.strip())
+
 
 @auth_required
-@rate_limit(10.0)
+@rate_limit("exec")
 async def claude_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """/claude <prompt> — run claude -p query and return text output."""
-    args = context.args
+    """/claude <prompt> — stream Claude's answer; follow-ups continue the session. /claude new to reset."""
+    from handlers.git import _git_dir
+
+    args = list(context.args or [])
+    if args and args[0].lower() == "new":
+        _sessions.pop(_git_dir, None)
+        args.pop(0)
+        if not args:
+            await update.message.reply_text(f"New Claude session for {_git_dir}")
+            return
     if not args:
-        await update.message.reply_text("Usage: /claude <prompt>")
+        await update.message.reply_text("Usage: /claude <prompt>\n/claude new [prompt] — fresh session")
         return
 
     prompt = " ".join(args)
-    logger.debug("/claude called: %s", prompt)
-    await update.message.reply_text("Asking Claude...")
+    session_id = _sessions.get(_git_dir)
+    logger.debug("/claude called (session=%s): %s", session_id, prompt)
 
+    job = jobs.create("claude", prompt)
+    msg = await update.message.reply_text(
+        "Asking Claude..." + (" (continuing session)" if session_id else ""), reply_markup=cancel_button(job.id),
+    )
+    reply = StreamingReply(context.bot, msg.chat_id, msg.message_id, "", cancel_button(job.id))
+    job.tail_fn = lambda: reply.tail
+    stream = _ClaudeStream(reply)
+    out, err = LineSplitter(stream.on_line), LineSplitter(stream.on_stderr)
+    ticker = None
     try:
-        proc = subprocess.run(
-            ["claude", "-p", prompt],
-            capture_output=True, timeout=120,
-            encoding="utf-8", errors="replace",
-        )
-        output = proc.stdout.strip()
-        if not output:
-            output = proc.stderr.strip() or "(no response)"
-
-        await send_long_text(update, output)
-        logger.debug("/claude response sent (%d chars)", len(output))
+        async with jobs.track("claude", prompt, job):
+            ticker = asyncio.create_task(reply.run())
+            cmd = await _command(prompt, session_id)
+            code = await stream_process(cmd, out, cwd=_git_dir, timeout=CLAUDE_TIMEOUT, on_error=err)
+        out(b"", final=True)
+        err(b"", final=True)
+        if stream.session_id:
+            _sessions[_git_dir] = stream.session_id
+        footer = f"[session {stream.session_id[:8]} · ${stream.cost:.3f}]" if stream.session_id else ""
+        if code != 0 or (stream.errors and reply.total_chars == 0):
+            footer = f"[exit {code}] " + "\n".join(stream.errors[-3:])
+        logger.debug("/claude response streamed (%d chars)", reply.total_chars)
     except FileNotFoundError:
-        await update.message.reply_text("Claude CLI not found. Install with: npm install -g @anthropic-ai/claude-code")
+        footer = "Claude CLI not found. Install with: npm install -g @anthropic-ai/claude-code"
     except subprocess.TimeoutExpired:
-        await update.message.reply_text("Claude timed out (2 min limit).")
+        footer = f"[timed out after {CLAUDE_TIMEOUT}s]"
+    except asyncio.CancelledError:
+        footer = "[cancelled]"
     except Exception as e:
         logger.error("/claude error: %s", e)
-        await update.message.reply_text(f"Claude error: {e}")
+        footer = f"Claude error: {e}"
+    finally:
+        if ticker:
+            ticker.cancel()
+    await reply.finish(footer)
+
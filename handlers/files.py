@@ -1,47 +1,82 @@
-import glob
+import asyncio
+import io
 import logging
 import os
-import subprocess
 from telegram import Update
+from telegram.error import BadRequest, RetryAfter
 from telegram.ext import ContextTypes
-from config import APK_SEARCH_DIRS, APK_GLOB, BUILD_CMD, MAX_FILE_SIZE, PROJECT_DIR
+from config import MAX_FILE_SIZE, PROJECT_DIR, STREAM_EDIT_INTERVAL
+from handlers.jobs import cancel_button
+from utils.apk_index import apk_index
+from utils.archive import send_zip_volumes
 from utils.auth import auth_required, rate_limit
+from utils.chunks import send_long_text_to_chat
+from utils.executor import run_blocking
+from utils.file_cache import send_document_cached
+from utils.gradle import apk_output_dirs, build_queue
+from utils.jobs import jobs
 
 logger = logging.getLogger("bot.files")
 
 
-def _find_apks(filter_str: str | None = None) -> list[str]:
-    """Find APKs across search dirs, optionally filtered by name substring."""
-    all_apks = []
-    for search_dir in APK_SEARCH_DIRS:
-        pattern = os.path.join(search_dir, APK_GLOB)
-        all_apks.extend(glob.glob(pattern, recursive=True))
+def _find_apks(filter_str: str | None = None, refresh: bool = True) -> list[str]:
+    """APKs from the index, newest first, optionally filtered by name or variant substring."""
+    if refresh:
+        apk_index.refresh()
+    return [e.path for e in apk_index.query(filter_str)]
 
-    if filter_str:
-        all_apks = [a for a in all_apks if filter_str.lower() in os.path.basename(a).lower()]
 
-    all_apks.sort(key=os.path.getmtime, reverse=True)
-    return all_apks
+def _register_build_apks(cwd: str | None):
+    """Put fresh build outputs into the index without a rescan."""
+    for out_dir in apk_output_dirs(cwd or os.getcwd()):
+        apk_index.register_tree(out_dir)
 
 
-async def _send_apk(update: Update):
+async def _send_apk(bot, chat_id: int):
     """Find and send latest debug APK after successful build."""
-    apks = _find_apks("debug")
+    apks = await run_blocking(_find_apks, "debug", False)
     if not apks:
-        await update.message.reply_text("Build done but no APK found.")
+        await bot.send_message(chat_id, "Build done but no APK found.")
         return
     apk_path = apks[0]
     size = os.path.getsize(apk_path)
     if size > MAX_FILE_SIZE:
-        await update.message.reply_text(f"APK too large: {size // 1024 // 1024}MB (limit 50MB)")
+        await bot.send_message(chat_id, f"APK too large: {size // 1024 // 1024}MB (limit 50MB)")
         return
     name = os.path.basename(apk_path)
-    with open(apk_path, "rb") as f:
-        await update.message.reply_document(document=f, filename=name, caption=f"{name} ({size // 1024}KB)")
+    await send_document_cached(bot, chat_id, apk_path, caption=f"{name} ({size // 1024}KB)")
+
+
+async def run_build(bot, chat_id: int, cwd: str | None, send_apk: bool = False):
+    """Queue a build, keep one progress message updated, then report result (and APK)."""
+    run = build_queue.submit(cwd)
+    msg = await bot.send_message(chat_id, run.status_text() if build_queue.active else "Building...")
+    shown = msg.text
+    while not run.done.is_set():
+        try:
+            await asyncio.wait_for(run.done.wait(), STREAM_EDIT_INTERVAL * 2)
+        except asyncio.TimeoutError:
+            pass
+        text = run.summary() if run.done.is_set() else run.status_text()
+        if text == shown:
+            continue
+        markup = cancel_button(run.job.id) if run.state == "running" and not run.done.is_set() else None
+        try:
+            await msg.edit_text(text[:4000], reply_markup=markup)
+            shown = text
+        except (BadRequest, RetryAfter) as e:
+            logger.debug("Build progress edit skipped: %s", e)
+
+    if shown != run.summary():
+        await send_long_text_to_chat(bot, chat_id, run.summary())
+    if run.ok:
+        await run_blocking(_register_build_apks, cwd)
+        if send_apk:
+            await _send_apk(bot, chat_id)
 
 
 @auth_required
-@rate_limit(60.0)
+@rate_limit("build")
 async def build_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """/build [apk] [dir] — run gradle build. 'apk' sends APK after build."""
     args = list(context.args or [])
@@ -52,37 +87,11 @@ async def build_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     cwd = " ".join(args) if args else (PROJECT_DIR or None)
     logger.debug("/build called, cwd=%s, send_apk=%s", cwd, send_apk)
-
-    gradlew = os.path.join(cwd, "gradlew.bat") if cwd else "gradlew.bat"
-    cmd = [gradlew, "assembleDebug"]
-    await update.message.reply_text("Building...")
-    try:
-        proc = subprocess.run(
-            cmd, cwd=cwd,
-            capture_output=True, timeout=300,
-            encoding="utf-8", errors="replace",
-        )
-        if proc.returncode == 0:
-            lines = [l for l in proc.stdout.strip().splitlines() if l.strip()]
-            tail = lines[-1] if lines else ""
-            await update.message.reply_text(f"Build SUCCESS\n{tail}")
-            if send_apk:
-                await _send_apk(update)
-        else:
-            stderr = proc.stderr[-1500:] if len(proc.stderr) > 1500 else proc.stderr
-            msg = f"Build FAILED (code {proc.returncode})\n{stderr}"
-            if len(msg) > 4000:
-                msg = msg[:4000] + "\n...(truncated)"
-            await update.message.reply_text(msg)
-    except subprocess.TimeoutExpired:
-        await update.message.reply_text("Build timed out (5 min limit).")
-    except Exception as e:
-        logger.error("/build error: %s", e)
-        await update.message.reply_text(f"Build failed: {e}")
+    await run_build(context.bot, update.effective_chat.id, cwd, send_apk)
 
 
 @auth_required
-@rate_limit(3.0)
+@rate_limit("upload", coalesce=True)
 async def apk_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """/apk [filter] — send latest APK. Filter: debug, release, list."""
     args = context.args
@@ -91,19 +100,19 @@ async def apk_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     # /apk list — show available APKs
     if filter_str == "list":
-        apks = _find_apks()
+        await run_blocking(apk_index.refresh)
+        apks = apk_index.query()
         if not apks:
             await update.message.reply_text("No APKs found.")
             return
         lines = []
         for a in apks[:10]:
-            size = os.path.getsize(a) // 1024
-            lines.append(f"  {os.path.basename(a)} ({size}KB)")
+            lines.append(f"  {os.path.basename(a.path)} [{a.variant}] ({a.size // 1024}KB)")
         await update.message.reply_text("APKs found:\n" + "\n".join(lines))
         return
 
     await update.message.reply_text("Searching for APK...")
-    apks = _find_apks(filter_str)
+    apks = await run_blocking(_find_apks, filter_str)
     if not apks:
         msg = f"No APK matching '{filter_str}'." if filter_str else "No APK found."
         await update.message.reply_text(msg + "\nTry: /apk list")
@@ -116,12 +125,10 @@ async def apk_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     try:
-        with open(apk_path, "rb") as f:
-            await update.message.reply_document(
-                document=f,
-                filename=os.path.basename(apk_path),
-                caption=f"{os.path.basename(apk_path)} ({size // 1024}KB)",
-            )
+        await send_document_cached(
+            context.bot, update.effective_chat.id, apk_path,
+            caption=f"{os.path.basename(apk_path)} ({size // 1024}KB)",
+        )
         logger.debug("Sent APK: %s", apk_path)
     except Exception as e:
         logger.error("/apk send error: %s", e)
@@ -129,7 +136,7 @@ async def apk_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 @auth_required
-@rate_limit(3.0)
+@rate_limit("upload")
 async def file_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """/file <path> — send any file by path."""
     args = context.args
@@ -140,23 +147,62 @@ async def file_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     path = " ".join(args)
     logger.debug("/file called: %s", path)
 
+    if os.path.isdir(path):
+        await update.message.reply_text(f"{path} is a directory.\nSend it zipped: /zip {path}")
+        return
     if not os.path.isfile(path):
         await update.message.reply_text(f"File not found: {path}")
         return
 
     size = os.path.getsize(path)
     if size > MAX_FILE_SIZE:
-        await update.message.reply_text(f"File too large: {size // 1024 // 1024}MB (limit 50MB)")
+        await update.message.reply_text(
+            f"File too large: {size // 1024 // 1024}MB (limit 50MB)\nSend as split zip: /zip {path}"
+        )
         return
 
     try:
-        with open(path, "rb") as f:
-            await update.message.reply_document(
-                document=f,
-                filename=os.path.basename(path),
-                caption=f"{os.path.basename(path)} ({size // 1024}KB)",
-            )
+        await send_document_cached(
+            context.bot, update.effective_chat.id, path,
+            caption=f"{os.path.basename(path)} ({size // 1024}KB)",
+        )
         logger.debug("Sent file: %s", path)
     except Exception as e:
         logger.error("/file send error: %s", e)
         await update.message.reply_text(f"Failed to send file: {e}")
+
+
+@auth_required
+@rate_limit("upload")
+async def zip_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/zip <path> — stream-compress file or directory into split volumes under the upload limit."""
+    args = context.args
+    if not args:
+        await update.message.reply_text("Usage: /zip <file or directory>")
+        return
+
+    path = " ".join(args)
+    logger.debug("/zip called: %s", path)
+    if not os.path.exists(path):
+        await update.message.reply_text(f"Not found: {path}")
+        return
+
+    chat_id = update.effective_chat.id
+    name = os.path.basename(os.path.normpath(path))
+    job = jobs.create("upload", f"zip {name}")
+    await update.message.reply_text(f"Zipping {name}...", reply_markup=cancel_button(job.id))
+    try:
+        async with jobs.track("upload", job.title, job):
+            result = await send_zip_volumes(context.bot, chat_id, path)
+    except asyncio.CancelledError:
+        await update.message.reply_text(f"Zip of {name} cancelled.")
+        return
+    except Exception as e:
+        logger.error("/zip error: %s", e)
+        await update.message.reply_text(f"Zip failed: {e}")
+        return
+
+    manifest = io.BytesIO(result.manifest().encode("utf-8"))
+    await context.bot.send_document(chat_id, document=manifest, filename=f"{result.name}.sha256",
+                                    caption=result.summary()[:1024])
+    logger.debug("/zip done: %s", result.summary())
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import os
 import subprocess
@@ -6,14 +7,19 @@ from telegram.ext import ContextTypes
 from config import GIT_DIR
 from utils.auth import auth_required, rate_limit
 from utils.chunks import send_long_text
+from utils.git_cache import git_cache
+from utils.jobs import jobs
 
 logger = logging.getLogger("bot.git")
 
 _git_dir: str = GIT_DIR
 
+# Slow, network-bound commands run as cancellable jobs (see /jobs)
+NETWORK_COMMANDS = {"push", "pull", "fetch", "clone"}
+
 
 @auth_required
-@rate_limit(3.0)
+@rate_limit("exec")
 async def git_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """/git [subcommand] — run git commands in working directory."""
     global _git_dir
@@ -53,10 +59,11 @@ async def git_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     logger.debug("Running: %s in %s", cmd, _git_dir)
 
     try:
-        proc = subprocess.run(
-            cmd, cwd=_git_dir,
-            capture_output=True, timeout=60,
-        )
+        if args[0] in NETWORK_COMMANDS:
+            async with jobs.track("git", " ".join(cmd)):
+                proc = await git_cache.run(_git_dir, args, timeout=60)
+        else:
+            proc = await git_cache.run(_git_dir, args, timeout=60)
         raw = proc.stdout + proc.stderr
         try:
             output = raw.decode("utf-8")
@@ -72,6 +79,8 @@ async def git_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("Error: git not found in PATH.")
     except subprocess.TimeoutExpired:
         await update.message.reply_text("Git command timed out (60s limit).")
+    except asyncio.CancelledError:
+        await update.message.reply_text("Git command cancelled.")
     except Exception as e:
         logger.error("/git error: %s", e)
         await update.message.reply_text(f"Git error: {e}")
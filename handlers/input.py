@@ -1,73 +1,56 @@
-import asyncio
-import ctypes
 import logging
-import time
-import pyautogui
 from telegram import Update
 from telegram.ext import ContextTypes
+from backends import get_clipboard, get_input
+from config import SETTLE_PASTE_TIMEOUT
 from utils.auth import auth_required, rate_limit
+from utils.executor import run_blocking
+from utils.grid import grids, is_cell
+from utils.macro import macros, text_step
+from utils import settle
 from utils.window import focus_window
 
 logger = logging.getLogger("bot.input")
 
-pyautogui.FAILSAFE = False
-
-# Fix 64-bit pointer truncation for clipboard Win32 calls
-_k32 = ctypes.windll.kernel32
-_u32 = ctypes.windll.user32
-_vp = ctypes.c_void_p
-_k32.GlobalAlloc.restype = _k32.GlobalLock.restype = _vp
-_k32.GlobalAlloc.argtypes = [ctypes.c_uint, ctypes.c_size_t]
-_k32.GlobalLock.argtypes = _k32.GlobalUnlock.argtypes = _k32.GlobalFree.argtypes = [_vp]
-_u32.SetClipboardData.restype = _vp
-_u32.SetClipboardData.argtypes = [ctypes.c_uint, _vp]
-
-def _set_clipboard(text: str):
-    """Set clipboard text via Win32 API — 64-bit safe with error checks."""
-    if not _u32.OpenClipboard(0):
-        raise OSError("OpenClipboard failed")
-    try:
-        _u32.EmptyClipboard()
-        data = text.encode("utf-16-le") + b"\x00\x00"
-        h_mem = _k32.GlobalAlloc(0x0002, len(data))
-        if not h_mem:
-            raise OSError("GlobalAlloc failed")
-        p_mem = _k32.GlobalLock(h_mem)
-        if not p_mem:
-            _k32.GlobalFree(h_mem)
-            raise OSError("GlobalLock failed")
-        ctypes.memmove(p_mem, data, len(data))
-        _k32.GlobalUnlock(h_mem)
-        _u32.SetClipboardData(13, h_mem)
-    finally:
-        _u32.CloseClipboard()
 
 def _type_text(text: str):
     """Type text via clipboard paste — instant, reliable, supports any language."""
-    _set_clipboard(text)
-    pyautogui.hotkey("ctrl", "v")
-    time.sleep(0.1)
+    get_clipboard().set_text(text)
+    get_input().paste()
+
+def _type_and_enter(text: str):
+    """Paste text and submit with Enter once the paste shows up (blocking — run in worker pool)."""
+    settle.after(_type_text, text, stable_ms=0, timeout=SETTLE_PASTE_TIMEOUT)
+    get_input().press(["enter"])
+
+def _press_keys(parts: list[str], repeat: int, interval: float = 0.0):
+    """Press key or combo `repeat` times (blocking — run in worker pool)."""
+    get_input().press(parts, repeat, interval)
+
+def _click(x: int, y: int):
+    get_input().click(x, y)
 
 @auth_required
-@rate_limit(1.0)
+@rate_limit("input")
 async def text_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Type plain text into active window and press Enter."""
     text = update.message.text
     logger.debug("Typing text: %s", text)
     try:
-        _type_text(text)
-        pyautogui.press("enter")
+        before = await run_blocking(settle.sample)
+        await run_blocking(_type_and_enter, text)
+        macros.record(text_step(text))
         await update.message.reply_text(f"Typed: {text}")
-        await asyncio.sleep(2)
-        from handlers.screen import _grab_to_jpeg
-        buf = _grab_to_jpeg()
-        await update.message.reply_photo(photo=buf)
+        # Screenshot as soon as the app has reacted and stopped redrawing
+        await run_blocking(settle.wait, before)
+        from handlers.screen import _reply_screen
+        await _reply_screen(update)
     except Exception as e:
         logger.error("text_handler error: %s", e)
         await update.message.reply_text(f"Typing failed: {e}")
 
 @auth_required
-@rate_limit(1.0)
+@rate_limit("input")
 async def key_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """/key <key> — send special key or combo (e.g. ctrl+c, enter, tab)."""
     args = context.args
@@ -88,12 +71,8 @@ async def key_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     logger.debug("/key called: %s x%d", key_str, repeat)
 
     try:
-        parts = key_str.split("+")
-        for _ in range(repeat):
-            if len(parts) > 1:
-                pyautogui.hotkey(*parts)
-            else:
-                pyautogui.press(parts[0])
+        await run_blocking(_press_keys, key_str.split("+"), repeat)
+        macros.record(f"key {key_str}" + (f" {repeat}" if repeat > 1 else ""))
         label = f"Pressed: {key_str}" + (f" x{repeat}" if repeat > 1 else "")
         await update.message.reply_text(label)
     except Exception as e:
@@ -101,7 +80,7 @@ async def key_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text(f"Key press failed: {e}")
 
 @auth_required
-@rate_limit(1.0)
+@rate_limit("input")
 async def type_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """/type <text> — type text literally (for text starting with /)."""
     if not context.args:
@@ -110,35 +89,50 @@ async def type_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     text = " ".join(context.args)
     logger.debug("/type called: %s", text)
     try:
-        _type_text(text)
-        pyautogui.press("enter")
+        await run_blocking(_type_and_enter, text)
+        macros.record(text_step(text))
         await update.message.reply_text(f"Typed: {text}")
     except Exception as e:
         logger.error("/type error: %s", e)
         await update.message.reply_text(f"Typing failed: {e}")
 
 @auth_required
-@rate_limit(1.0)
+@rate_limit("input")
 async def click_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """/click x y — mouse click at coordinates."""
-    if not context.args or len(context.args) < 2:
-        await update.message.reply_text("Usage: /click <x> <y>")
-        return
-    try:
-        x, y = int(context.args[0]), int(context.args[1])
-    except ValueError:
-        await update.message.reply_text("Coordinates must be integers.")
-        return
+    """/click x y | cell [x y] — mouse click at coordinates, or in a cell of the last /screen grid."""
+    args = context.args or []
+    if args and is_cell(args[0]):
+        grid = grids.last
+        if grid is None:
+            await update.message.reply_text("No grid yet — send /screen grid first.")
+            return
+        try:
+            # Optional x y are pixels into the cell, as read off its zoomed tile
+            offset = (int(args[1]), int(args[2])) if len(args) >= 3 else (None, None)
+            x, y = grid.point(args[0], *offset)
+        except ValueError as e:
+            await update.message.reply_text(str(e))
+            return
+    else:
+        if len(args) < 2:
+            await update.message.reply_text("Usage: /click <x> <y> | /click B2 [x y]")
+            return
+        try:
+            x, y = int(args[0]), int(args[1])
+        except ValueError:
+            await update.message.reply_text("Coordinates must be integers.")
+            return
     logger.debug("/click at (%d, %d)", x, y)
     try:
-        pyautogui.click(x, y)
+        await run_blocking(_click, x, y)
+        macros.record(f"click {x} {y}")
         await update.message.reply_text(f"Clicked: ({x}, {y})")
     except Exception as e:
         logger.error("/click error: %s", e)
         await update.message.reply_text(f"Click failed: {e}")
 
 @auth_required
-@rate_limit(1.0)
+@rate_limit("input")
 async def focus_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """/focus <title> — focus a window by partial title match."""
     if not context.args:
@@ -146,5 +140,5 @@ async def focus_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     title = " ".join(context.args)
     logger.debug("/focus called: %s", title)
-    success, msg = focus_window(title)
+    success, msg = await run_blocking(focus_window, title)
     await update.message.reply_text(msg)
@@ -0,0 +1,66 @@
+import logging
+from telegram import InlineKeyboardButton as Btn, InlineKeyboardMarkup, Update
+from telegram.ext import ContextTypes
+from config import ALLOWED_USER_ID
+from utils.auth import auth_required
+from utils.chunks import send_text
+from utils.jobs import jobs
+
+logger = logging.getLogger("bot.jobs")
+
+
+def cancel_button(job_id: int) -> InlineKeyboardMarkup:
+    """Single Cancel button for a job's live message."""
+    return InlineKeyboardMarkup([[Btn("Cancel", callback_data=f"job:cancel:{job_id}")]])
+
+
+def jobs_overview() -> tuple[str, InlineKeyboardMarkup | None]:
+    """Text listing of active + recent jobs, with Cancel buttons for active ones."""
+    listed = jobs.list()
+    if not listed:
+        return "No jobs.", None
+    blocks, buttons = [], []
+    for job in listed[:15]:
+        block = job.describe()
+        if job.active and job.tail():
+            block += "\n  " + job.tail().replace("\n", "\n  ")
+        blocks.append(block)
+        if job.active:
+            buttons.append(Btn(f"Cancel #{job.id}", callback_data=f"job:cancel:{job.id}"))
+    rows = [buttons[i:i + 3] for i in range(0, len(buttons), 3)]
+    return "\n".join(blocks), InlineKeyboardMarkup(rows) if rows else None
+
+
+@auth_required
+async def jobs_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/jobs — list running and recent jobs."""
+    logger.debug("/jobs called")
+    text, markup = jobs_overview()
+    await send_text(context.bot, update.effective_chat.id, text, reply_markup=markup)
+
+
+@auth_required
+async def cancel_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/cancel <id> — cancel a running or queued job."""
+    args = context.args
+    if not args or not args[0].lstrip("#").isdigit():
+        await update.message.reply_text("Usage: /cancel <job id>  (see /jobs)")
+        return
+    job_id = int(args[0].lstrip("#"))
+    if jobs.cancel(job_id):
+        await update.message.reply_text(f"Cancelling job #{job_id}...")
+    else:
+        await update.message.reply_text(f"No active job #{job_id}.")
+
+
+async def job_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle job:cancel:<id> buttons (under live messages and in /jobs)."""
+    query = update.callback_query
+    if query.from_user is None or query.from_user.id != ALLOWED_USER_ID:
+        await query.answer("Unauthorized", show_alert=True)
+        return
+    job_id = int(query.data.rsplit(":", 1)[-1])
+    if jobs.cancel(job_id):
+        await query.answer(f"Cancelling #{job_id}...")
+    else:
+        await query.answer("Already finished.")
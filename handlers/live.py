@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from telegram import InlineKeyboardButton as Btn, InlineKeyboardMarkup, InputMediaPhoto, Update
+from telegram.error import BadRequest, RetryAfter
+from telegram.ext import ContextTypes
+from config import ALLOWED_USER_ID, LIVE_DEFAULT_DURATION, LIVE_MAX_DURATION, LIVE_MAX_FPS
+import handlers.screen as screen
+from utils.auth import auth_required
+from utils.capture import engine
+from utils.chunks import retry_after_seconds
+from utils.delta import FrameDiffer
+from utils.executor import run_blocking
+
+logger = logging.getLogger("bot.live")
+
+STOP_KEYBOARD = InlineKeyboardMarkup([[Btn("Stop", callback_data="live:stop")]])
+
+
+@dataclass
+class LiveSession:
+    fps: float
+    duration: float
+    stop: asyncio.Event = field(default_factory=asyncio.Event)
+    differ: FrameDiffer = field(default_factory=FrameDiffer)
+    sent: int = 0
+    skipped: int = 0
+
+
+_sessions: dict[int, LiveSession] = {}  # chat_id -> running session
+
+
+def _grab_changed(session: LiveSession, region: dict | None):
+    """Capture frame and encode it, or return None when nothing changed."""
+    target = engine.target(region)
+    img = engine.capture(target)
+    if session.differ.diff(img, (target["left"], target["top"], target["width"], target["height"])) is None:
+        return None
+    return screen._encode(img)
+
+
+async def _run(bot, chat_id: int, message_id: int, session: LiveSession):
+    """Edit the live photo in place until duration ends or stop is requested."""
+    interval = 1.0 / session.fps
+    start = time.monotonic()
+    deadline = start + session.duration
+    next_tick = start + interval
+
+    while not session.stop.is_set() and time.monotonic() < deadline:
+        try:
+            await asyncio.wait_for(session.stop.wait(), max(0.0, next_tick - time.monotonic()))
+            break
+        except asyncio.TimeoutError:
+            pass
+
+        buf = await run_blocking(_grab_changed, session, screen._crop_region)
+        if buf is None:
+            session.skipped += 1
+        else:
+            left = int(deadline - time.monotonic())
+            caption = f"Live {session.fps:g} fps · frame {session.sent + 1} · {left}s left"
+            try:
+                await bot.edit_message_media(
+                    media=InputMediaPhoto(buf, caption=caption),
+                    chat_id=chat_id, message_id=message_id, reply_markup=STOP_KEYBOARD,
+                )
+                session.sent += 1
+            except RetryAfter as e:
+                wait = retry_after_seconds(e)
+                logger.debug("Live flood wait %.0fs", wait)
+                session.differ.reset()
+                next_tick = time.monotonic() + wait
+                continue
+            except BadRequest as e:
+                if "not modified" not in str(e).lower():
+                    raise
+
+        # Upload took longer than a tick — drop the missed frames instead of queueing them
+        next_tick += interval
+        now = time.monotonic()
+        if next_tick < now:
+            missed = int((now - next_tick) / interval) + 1
+            session.skipped += missed
+            next_tick += missed * interval
+
+
+async def _live_task(bot, chat_id: int, message_id: int, session: LiveSession):
+    try:
+        await _run(bot, chat_id, message_id, session)
+    except Exception as e:
+        logger.error("Live error: %s", e)
+        await bot.send_message(chat_id, f"Live stopped: {e}")
+    finally:
+        _sessions.pop(chat_id, None)
+        logger.debug("Live ended: %d sent, %d skipped", session.sent, session.skipped)
+        try:
+            await bot.edit_message_caption(
+                chat_id=chat_id, message_id=message_id,
+                caption=f"Live ended · {session.sent} frames, {session.skipped} skipped",
+            )
+        except Exception as e:
+            logger.debug("Live final caption failed: %s", e)
+
+
+@auth_required
+async def live_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/live [fps] [duration] — stream screen into one photo. /live off to stop."""
+    args = context.args or []
+    chat_id = update.effective_chat.id
+    logger.debug("/live called: %s", args)
+
+    if args and args[0].lower() in ("off", "stop"):
+        session = _sessions.get(chat_id)
+        if session is None:
+            await update.message.reply_text("Live is not running.")
+            return
+        session.stop.set()
+        await update.message.reply_text("Live stopping...")
+        return
+
+    if chat_id in _sessions:
+        await update.message.reply_text("Live already running. /live off to stop.")
+        return
+
+    try:
+        fps = float(args[0]) if args else 1.0
+        duration = float(args[1]) if len(args) > 1 else LIVE_DEFAULT_DURATION
+    except ValueError:
+        await update.message.reply_text("Usage: /live [fps] [duration_sec] | /live off")
+        return
+    fps = min(max(fps, 0.1), LIVE_MAX_FPS)
+    duration = min(max(duration, 1.0), LIVE_MAX_DURATION)
+
+    # Register before the first await: updates run concurrently, a second /live must see this one
+    session = LiveSession(fps=fps, duration=duration)
+    _sessions[chat_id] = session
+    try:
+        buf = await run_blocking(_grab_changed, session, screen._crop_region)
+        msg = await update.message.reply_photo(
+            photo=buf, caption=f"Live {fps:g} fps · {duration:.0f}s", reply_markup=STOP_KEYBOARD,
+        )
+    except Exception as e:
+        _sessions.pop(chat_id, None)
+        logger.error("/live start error: %s", e)
+        await update.message.reply_text(f"Live failed: {e}")
+        return
+    context.application.create_task(_live_task(context.bot, chat_id, msg.message_id, session))
+
+
+async def live_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle the Stop button under a live photo."""
+    query = update.callback_query
+    if query.from_user is None or query.from_user.id != ALLOWED_USER_ID:
+        await query.answer("Unauthorized", show_alert=True)
+        return
+    session = _sessions.get(query.message.chat_id)
+    if session is None:
+        await query.answer("Live is not running.")
+        return
+    session.stop.set()
+    await query.answer("Stopping...")
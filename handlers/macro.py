@@ -0,0 +1,112 @@
+import asyncio
+import contextlib
+import logging
+import threading
+from telegram import Update
+from telegram.ext import ContextTypes
+from handlers.jobs import cancel_button
+from utils.auth import auth_required, rate_limit
+from utils.executor import run_thread
+from utils.jobs import jobs
+from utils.macro import compile_script, macros, run, stop_all
+
+logger = logging.getLogger("bot.macro")
+
+USAGE = (
+    "Usage: /macro <steps> — run steps now (one per line or ;)\n"
+    "Steps: key ctrl+s [N] · type <text> (+Enter) · text <text> · click x y | click B2 · wait 0.5 · run <name>\n"
+    "/macro run <name> · save <name> [steps] · show <name> · del <name>\n"
+    "/macro rec — record /key /type /click until /macro save <name>\n"
+    "/macro stop — abort running macros"
+)
+
+
+async def _run_macro(update: Update, context: ContextTypes.DEFAULT_TYPE, title: str, script: str):
+    try:
+        events = compile_script(script, macros)
+    except ValueError as e:
+        await update.message.reply_text(f"Macro error: {e}")
+        return
+
+    job = jobs.create("macro", title)
+    msg = await update.message.reply_text(f"Macro {title}: {len(events)} events [job #{job.id}]",
+                                          reply_markup=cancel_button(job.id))
+    abort = threading.Event()
+    try:
+        async with jobs.track("macro", title, job):
+            # Own thread, not the worker pool: waits of up to a minute must not starve /screen
+            worker = asyncio.ensure_future(run_thread(run, events, abort))
+            try:
+                result = await asyncio.shield(worker)
+            except asyncio.CancelledError:
+                # Keep the job slot until the thread has seen the flag and returned
+                abort.set()
+                while not worker.done():
+                    with contextlib.suppress(asyncio.CancelledError):
+                        await asyncio.shield(worker)
+                raise
+        text = f"Macro {title}: {result.summary()}"
+    except asyncio.CancelledError:
+        text = f"Macro {title}: cancelled"
+    except Exception as e:
+        logger.error("/macro error: %s", e)
+        text = f"Macro {title} failed: {e}"
+    await msg.edit_text(text)
+
+
+@auth_required
+@rate_limit("input")
+async def macro_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/macro <steps> | run|save|show|del <name> | rec | stop — batched key/text/click sequences."""
+    # Scripts keep their line breaks, so parse the raw text instead of context.args
+    body = (update.message.text or "").partition(" ")[2].strip()
+    sub, _, rest = body.partition(" ")
+    sub, rest = sub.lower(), rest.strip()
+    logger.debug("/macro called: %s", body[:100])
+
+    if not body:
+        names = ", ".join(macros.names()) or "none"
+        await update.message.reply_text(f"{USAGE}\n\nSaved: {names}")
+
+    elif sub == "stop":
+        count = stop_all()
+        await update.message.reply_text(f"Abort requested for {count} macro(s)." if count else "No macro running.")
+
+    elif sub == "rec":
+        macros.start_recording()
+        await update.message.reply_text("Recording /key, /type, /click and typed text.\n/macro save <name> to finish.")
+
+    elif sub == "save":
+        name, _, script = rest.partition(" ")
+        if not name:
+            await update.message.reply_text("Usage: /macro save <name> [steps]")
+            return
+        script = script.strip() or (macros.stop_recording() if macros.recording else "")
+        if not script:
+            await update.message.reply_text("Nothing to save — give steps or /macro rec first.")
+            return
+        try:
+            compile_script(script, macros)
+        except ValueError as e:
+            await update.message.reply_text(f"Macro error: {e}")
+            return
+        macros.put(name, script)
+        await update.message.reply_text(f"Saved macro {name.lower()}:\n{script}")
+
+    elif sub == "show":
+        script = macros.get(rest)
+        await update.message.reply_text(script if script else f"No macro named {rest}")
+
+    elif sub == "del":
+        ok = macros.delete(rest)
+        await update.message.reply_text(f"Deleted {rest}." if ok else f"No macro named {rest}")
+
+    elif sub == "run":
+        script = macros.get(rest)
+        if script is None:
+            await update.message.reply_text(f"No macro named {rest}")
+            return
+        await _run_macro(update, context, rest.lower(), script)
+
+    else:
+        await _run_macro(update, context, "(inline)", body)
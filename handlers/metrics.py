@@ -0,0 +1,32 @@
+import logging
+from telegram import Update
+from telegram.ext import ContextTypes
+from utils.auth import auth_required
+from utils.chunks import send_long_text
+from utils.executor import run_blocking
+from utils.metrics import metrics
+
+logger = logging.getLogger("bot.metrics")
+
+
+@auth_required
+async def metrics_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/metrics [command|reset|debug on|off|prom] — latency histograms per command and stage."""
+    args = list(context.args or [])
+    logger.debug("/metrics called: %s", args)
+
+    if not args:
+        await send_long_text(update, metrics.report())
+    elif args[0] == "reset":
+        metrics.reset()
+        await update.message.reply_text("Metrics reset.")
+    elif args[0] == "debug":
+        if len(args) > 1:
+            metrics.debug = args[1].lower() in ("on", "1", "true")
+        await update.message.reply_text(f"Per-reply timings: {'on' if metrics.debug else 'off'}")
+    elif args[0] == "prom":
+        await send_long_text(update, metrics.prometheus())
+        if metrics.prom_file:
+            await run_blocking(metrics.maybe_write, True)
+    else:
+        await send_long_text(update, metrics.report(args[0].lstrip("/")))
@@ -0,0 +1,164 @@
+import asyncio
+import io
+import logging
+import os
+import subprocess
+import tempfile
+import time
+from telegram import Update
+from telegram.ext import ContextTypes
+from config import RECORD_BUFFER_SECONDS, RECORD_ENCODE_TIMEOUT, RECORD_MAX_SECONDS
+from handlers.jobs import cancel_button
+from utils.auth import auth_required, rate_limit
+from utils.executor import run_blocking, run_thread
+from utils.jobs import jobs
+from utils.metrics import stage
+from utils.recorder import Clip, encode_animation, ffmpeg_path, pick_format, pipe_raw, recorder
+
+logger = logging.getLogger("bot.record")
+
+FORMATS = ("gif", "webp", "mp4")
+USAGE = (
+    "Usage: /record <seconds> [gif|webp|mp4] — record from now\n"
+    f"/record last [seconds] [format] — what just happened (up to {RECORD_BUFFER_SECONDS}s)\n"
+    "/record on|off|status — background buffer"
+)
+
+
+async def _encode_mp4(clip: Clip) -> io.BytesIO:
+    """Pipe frames into ffmpeg (rawvideo on stdin) at the clip's average frame rate."""
+    times = clip.times
+    fps = (len(times) - 1) / (times[-1] - times[0]) if times[-1] > times[0] else 1.0
+    width, height = clip.size
+    with tempfile.TemporaryDirectory(prefix="record-") as tmp:
+        out = os.path.join(tmp, "clip.mp4")  # +faststart rewrites the file, so not a pipe
+        with open(os.path.join(tmp, "ffmpeg.log"), "w+b") as log:
+            proc = subprocess.Popen([
+                ffmpeg_path(), "-y", "-loglevel", "error",
+                "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-framerate", f"{fps:.3f}",
+                "-i", "-",
+                "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2",  # yuv420p needs even dimensions
+                "-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p", "-movflags", "+faststart", out,
+            ], stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=log)
+            try:
+                with stage("subprocess"):
+                    code = await run_thread(pipe_raw, clip, proc, RECORD_ENCODE_TIMEOUT)
+            except BrokenPipeError:
+                code = proc.wait()
+            except BaseException:
+                proc.kill()  # cancelled or timed out: don't leave ffmpeg behind
+                raise
+            if code != 0:
+                log.seek(0)
+                raise RuntimeError(log.read().decode(errors="replace").strip()[-300:] or f"ffmpeg exit {code}")
+        with open(out, "rb") as f:
+            return io.BytesIO(f.read())
+
+
+async def _send_clip(update: Update, clip: Clip, fmt: str):
+    """Encode and send; mp4 falls back to an animated image when ffmpeg is missing or fails."""
+    times = clip.times
+    caption = f"{times[-1] - times[0]:.1f}s"
+    if fmt == "mp4":
+        if ffmpeg_path():
+            try:
+                buf = await _encode_mp4(clip)
+                await update.message.reply_video(video=buf, filename="clip.mp4", supports_streaming=True,
+                                                 caption=f"{caption} · {len(times)} frames · mp4")
+                return
+            except (RuntimeError, OSError, subprocess.TimeoutExpired) as e:
+                logger.warning("mp4 encode failed, sending an animation: %s", e)
+        fmt = pick_format(None, video=False)
+    buf, count = await run_blocking(encode_animation, clip, fmt)
+    caption = f"{caption} · {count} frames · {fmt}"
+    if fmt == "gif":
+        await update.message.reply_animation(animation=buf, filename="clip.gif", caption=caption)
+    else:
+        # Telegram shows .webp photos as stickers; a document keeps the animation
+        await update.message.reply_document(document=buf, filename="clip.webp", caption=caption)
+
+
+def _parse(args: list[str], default: int) -> tuple[int, str]:
+    """[seconds] [format] in any order → (seconds capped to RECORD_MAX_SECONDS, format)."""
+    seconds, fmt = default, None
+    for arg in args:
+        if arg in FORMATS:
+            fmt = arg
+        elif arg.isdigit():
+            seconds = int(arg)
+        else:
+            raise ValueError(f"unknown argument '{arg}'")
+    return max(1, min(seconds, RECORD_MAX_SECONDS)), pick_format(fmt)
+
+
+async def _record(update: Update, seconds: int, fmt: str):
+    """Record forward through the ring, running the recorder just for this clip if it is off."""
+    title = f"{seconds}s {fmt}"
+    job = jobs.create("record", title)
+    msg = await update.message.reply_text(f"Recording {seconds}s... [job #{job.id}]",
+                                          reply_markup=cancel_button(job.id))
+    started = False
+    try:
+        async with jobs.track("record", title, job):
+            started = recorder.start(keep=False)
+            start = time.time()
+            await asyncio.sleep(seconds)
+            clip = recorder.ring.clip(start)
+            if len(clip) < 2:
+                await msg.edit_text("Recording captured no frames — is a screen available?")
+                return
+            await msg.edit_text(f"Encoding {len(clip)} frames...")
+            await _send_clip(update, clip, fmt)
+        await msg.delete()
+    except asyncio.CancelledError:
+        await msg.edit_text("Recording cancelled.")
+    except Exception as e:
+        logger.error("/record error: %s", e)
+        await msg.edit_text(f"Recording failed: {e}")
+    finally:
+        # Leave it running if /record on came in meanwhile (or someone else started it)
+        if started and not recorder.keep:
+            await run_blocking(recorder.stop)
+
+
+@auth_required
+@rate_limit("screen")
+async def record_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/record <seconds> [fmt] | last [seconds] [fmt] | on | off | status — screen clips."""
+    args = [a.lower() for a in context.args or []]
+    logger.debug("/record called: %s", args)
+
+    if not args:
+        await update.message.reply_text(f"{USAGE}\n\n{recorder.status()}")
+        return
+
+    if args[0] in ("on", "off", "status"):
+        if args[0] == "on":
+            recorder.start()
+        elif args[0] == "off":
+            await run_blocking(recorder.stop)
+            recorder.ring.clear()
+        await update.message.reply_text(recorder.status())
+        return
+
+    last = args[0] == "last"
+    try:
+        seconds, fmt = _parse(args[1:] if last else args, RECORD_BUFFER_SECONDS if last else 10)
+    except ValueError as e:
+        await update.message.reply_text(f"{e}\n{USAGE}")
+        return
+
+    if not last:
+        await _record(update, seconds, fmt)
+        return
+
+    clip = recorder.ring.clip(time.time() - seconds)
+    if len(clip) < 2:
+        hint = "" if recorder.running else " — /record on to keep a buffer"
+        await update.message.reply_text(f"Nothing buffered yet{hint}.")
+        return
+    try:
+        await _send_clip(update, clip, fmt)
+    except Exception as e:
+        logger.error("/record last error: %s", e)
+        await update.message.reply_text(f"Clip failed: {e}")
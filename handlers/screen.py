@@ -1,42 +1,154 @@
+import asyncio
 import io
 import logging
-import mss
-from PIL import Image
-from telegram import Update
+from telegram import InlineKeyboardButton as Btn, InlineKeyboardMarkup, InputMediaPhoto, Update
 from telegram.ext import ContextTypes
-from config import SCREENSHOT_QUALITY
+from config import ALLOWED_USER_ID
 from utils.auth import auth_required, rate_limit
-from utils.window import get_active_window_rect
+from utils.capture import engine
+from utils.delta import differ
+from utils.encode_pool import encode_raw
+from utils.encoder import Encoded, encode
+from utils.executor import run_blocking
+from utils.grid import Grid, grids, is_cell
+from utils.metrics import stage, track_request
+from utils.ratelimit import limiter
+from utils.window import get_active_window_rect, registry
 
 logger = logging.getLogger("bot.screen")
 
 _crop_region = None  # {"left": x, "top": y, "width": w, "height": h}
+_delta_mode = False  # send only changed area for /screen and auto-screenshots
+last_encode: Encoded | None = None
 
 
 def _grab_to_jpeg(region: dict | None = None) -> io.BytesIO:
-    """Capture screen region (or full monitor) and return JPEG BytesIO."""
-    with mss.mss() as sct:
-        if region:
-            raw = sct.grab(region)
-        else:
-            raw = sct.grab(sct.monitors[1])  # primary monitor
+    """Capture screen region (or full monitor) and return encoded BytesIO (JPEG or PNG, see utils.encoder)."""
+    return _encode(engine.capture(region))
+
+
+def _encode(img) -> io.BytesIO:
+    """Encode PIL image within size budget, remembering stats for /status."""
+    global last_encode
+    last_encode = encode(img)
+    return last_encode.buf
+
+
+def _grab_delta(region: dict | None = None) -> tuple[io.BytesIO | None, str]:
+    """Capture and encode only the area changed since the last delta frame. (None, msg) if unchanged."""
+    target = engine.target(region)
+    img = engine.capture(target)
+    box = differ.diff(img, (target["left"], target["top"], target["width"], target["height"]))
+    if box is None:
+        return None, "No change."
+    left, top, right, bottom = box
+    if (right - left, bottom - top) == img.size:
+        return _encode(img), ""
+    x, y = target["left"] + left, target["top"] + top
+    return _encode(img.crop(box)), f"Changed: {x},{y} {right - left}x{bottom - top}"
+
+
+def _grab_monitor(monitor: dict) -> Encoded:
+    """Grab one monitor and encode it in the process pool (several run side by side)."""
+    global last_encode
+    with stage("capture"):
+        size, bgra, _ = engine.grab_raw(monitor)
+    with stage("encode"):
+        last_encode = encode_raw(size, bgra)
+    return last_encode
+
+
+async def _reply_monitors(update: Update, args: list[str]):
+    """/screen all | /screen N [M ...] — one photo, or a media group grabbed and encoded in parallel."""
+    monitors = await run_blocking(lambda: engine.monitors)
+    count = len(monitors) - 1
+    if args[0] == "all":
+        picked = list(range(1, count + 1))
+    else:
+        picked = sorted({int(a) for a in args if a.isdigit()})
+        bad = [n for n in picked if not 1 <= n <= count]
+        if bad:
+            await update.message.reply_text(f"No monitor {bad[0]} — this machine has {count} (/screen 1..{count} or all).")
+            return
+    if len(picked) == 1:
+        await update.message.reply_photo(photo=await run_blocking(_grab_to_jpeg, monitors[picked[0]]))
+        return
+    results = await asyncio.gather(*(run_blocking(_grab_monitor, monitors[n]) for n in picked))
+    media = [InputMediaPhoto(r.buf, caption=f"Monitor {n}: {r.summary()}") for n, r in zip(picked, results)]
+    for i in range(0, len(media), 10):  # Telegram albums hold up to 10 items
+        await update.message.reply_media_group(media[i:i + 10])
+
+
+def _grab_overview(region: dict | None = None) -> tuple[io.BytesIO, Grid]:
+    """Capture once, keep the full frame for zooming, encode a small labeled overview."""
+    target = engine.target(region)
+    grid = grids.create(engine.capture(target), target)
+    return _encode(grid.overview()), grid
 
-    img = Image.frombytes("RGB", (raw.width, raw.height), raw.rgb)
-    buf = io.BytesIO()
-    img.save(buf, format="JPEG", quality=SCREENSHOT_QUALITY)
-    buf.seek(0)
-    buf.name = "screenshot.jpg"
-    return buf
+
+def _zoom_keyboard(grid: Grid) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup([[Btn(label, callback_data=f"zoom:{grid.id}:{label}") for label in row]
+                                 for row in grid.labels()])
+
+
+def _grab_tile(grid: Grid, label: str) -> io.BytesIO:
+    return _encode(grid.tile(label))
+
+
+def _window_rect(query: str = "") -> tuple[tuple[int, int, int, int] | None, str]:
+    """Bounds of the active window, or of a registry window by id / name. (None, reason) if none."""
+    if not query:
+        rect = get_active_window_rect()
+        return rect, "" if rect else "No active window detected."
+    entry = registry.resolve(query)
+    if entry is None:
+        return None, f"No window matching '{query}' — see /windows."
+    rect = registry.rect(entry)
+    return rect, "" if rect else f"Window {entry.describe()} is gone."
+
+
+async def _reply_screen(update: Update, region: dict | None = None):
+    """Reply with a screenshot — only the changed area when delta mode is on."""
+    if not _delta_mode:
+        await update.message.reply_photo(photo=await run_blocking(_grab_to_jpeg, region))
+        return
+    buf, caption = await run_blocking(_grab_delta, region)
+    if buf is None:
+        await update.message.reply_text(caption)
+        return
+    await update.message.reply_photo(photo=buf, caption=caption or None)
 
 
 @auth_required
-@rate_limit(2.0)
+@rate_limit("screen", coalesce=True)
 async def screen_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """/screen — capture full monitor (or crop region if set)."""
-    logger.debug("/screen called")
+    """/screen [all|N|grid|delta on|off|full] — capture primary monitor (or crop region if set)."""
+    global _delta_mode
+    args = [a.lower() for a in context.args or []]
+    logger.debug("/screen called: %s", args)
+
+    if args and args[0] == "delta":
+        if len(args) > 1:
+            _delta_mode = args[1] == "on"
+            differ.reset()
+        await update.message.reply_text(f"Delta mode: {'on' if _delta_mode else 'off'}")
+        return
+
+    if args and args[0] == "full":
+        differ.reset()
+
     try:
-        buf = _grab_to_jpeg(_crop_region)
-        await update.message.reply_photo(photo=buf)
+        if args and (args[0] == "all" or args[0].isdigit()):
+            await _reply_monitors(update, args)
+            return
+        if args and args[0] in ("grid", "zoom"):
+            buf, grid = await run_blocking(_grab_overview, _crop_region)
+            await update.message.reply_photo(
+                photo=buf, reply_markup=_zoom_keyboard(grid),
+                caption=f"{grid.frame.width}x{grid.frame.height} · tap a tile to zoom · /click B2 · /crop B2",
+            )
+            return
+        await _reply_screen(update, _crop_region)
         logger.debug("/screen sent successfully")
     except Exception as e:
         logger.error("/screen error: %s", e)
@@ -44,23 +156,25 @@ async def screen_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 @auth_required
-@rate_limit(2.0)
+@rate_limit("screen", coalesce=True)
 async def window_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """/window — capture active window only."""
-    logger.debug("/window called")
-    rect = get_active_window_rect()
-    if rect is None:
-        await update.message.reply_text("No active window detected.")
-        return
+    """/window [id|name] — capture the active window, or one from /windows."""
+    query = " ".join(context.args or [])
+    logger.debug("/window called: %s", query)
+    try:
+        # The window backend can fail too (no display, wmctrl/xdotool missing or timing out)
+        rect, err = await run_blocking(_window_rect, query)
+        if rect is None:
+            await update.message.reply_text(err)
+            return
 
-    left, top, width, height = rect
-    if width <= 0 or height <= 0:
-        await update.message.reply_text("Active window has invalid dimensions.")
-        return
+        left, top, width, height = rect
+        if width <= 0 or height <= 0:
+            await update.message.reply_text("Active window has invalid dimensions.")
+            return
 
-    region = {"left": left, "top": top, "width": width, "height": height}
-    try:
-        buf = _grab_to_jpeg(region)
+        region = {"left": left, "top": top, "width": width, "height": height}
+        buf = await run_blocking(_grab_to_jpeg, region)
         await update.message.reply_photo(photo=buf)
         logger.debug("/window sent successfully (%s)", rect)
     except Exception as e:
@@ -69,8 +183,9 @@ async def window_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 @auth_required
+@rate_limit("screen")
 async def crop_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """/crop x y w h — set crop region for /screen. /crop off to reset."""
+    """/crop x y w h | cell — set crop region for /screen. /crop off to reset."""
     global _crop_region
     args = context.args
 
@@ -85,7 +200,8 @@ async def crop_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await update.message.reply_text(
                 "No crop set (full screen).\n"
                 "Usage: /crop <x> <y> <w> <h>\n"
-                "/crop window — use active window bounds"
+                "/crop B2 or /crop A1:C2 — cells of the last /screen grid\n"
+                "/crop window [id|name] — use window bounds (active or from /windows)"
             )
         return
 
@@ -96,9 +212,14 @@ async def crop_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     if args[0].lower() == "window":
-        rect = get_active_window_rect()
+        try:
+            rect, err = await run_blocking(_window_rect, " ".join(args[1:]))
+        except Exception as e:
+            logger.error("/crop window error: %s", e)
+            await update.message.reply_text(f"Window lookup failed: {e}")
+            return
         if rect is None:
-            await update.message.reply_text("No active window detected.")
+            await update.message.reply_text(err)
             return
         left, top, width, height = rect
         _crop_region = {"left": left, "top": top, "width": width, "height": height}
@@ -106,6 +227,21 @@ async def crop_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text(f"Crop set to window: {left},{top} {width}x{height}")
         return
 
+    if is_cell(args[0]):
+        grid = grids.last
+        if grid is None:
+            await update.message.reply_text("No grid yet — send /screen grid first.")
+            return
+        try:
+            _crop_region = grid.region_of(args[0])
+        except ValueError as e:
+            await update.message.reply_text(str(e))
+            return
+        r = _crop_region
+        logger.debug("Crop set to cell %s: %s", args[0], r)
+        await update.message.reply_text(f"Crop set to {args[0].upper()}: {r['left']},{r['top']} {r['width']}x{r['height']}")
+        return
+
     if len(args) < 4:
         await update.message.reply_text("Usage: /crop <x> <y> <w> <h>")
         return
@@ -119,3 +255,32 @@ async def crop_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     _crop_region = {"left": x, "top": y, "width": w, "height": h}
     logger.debug("Crop set: %s", _crop_region)
     await update.message.reply_text(f"Crop set: {x},{y} {w}x{h}")
+
+
+async def zoom_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle a tile tap under a /screen grid overview: send that cell at full resolution."""
+    query = update.callback_query
+    if query.from_user is None or query.from_user.id != ALLOWED_USER_ID:
+        await query.answer("Unauthorized", show_alert=True)
+        return
+    _, grid_id, label = query.data.split(":", 2)
+    grid = grids.get(int(grid_id))
+    if grid is None:
+        await query.answer("Overview expired — send /screen grid again.", show_alert=True)
+        return
+    if not await limiter.acquire("screen", query.data):
+        await query.answer("Already queued")
+        return
+
+    async with track_request("zoom"):
+        await query.answer(f"Zooming {label}...")
+        r = grid.region_of(label)
+        try:
+            buf = await run_blocking(_grab_tile, grid, label)
+            await context.bot.send_photo(
+                query.message.chat_id, photo=buf,
+                caption=f"{label}: {r['left']},{r['top']} {r['width']}x{r['height']} · /click {label} [x y] · /crop {label}",
+            )
+        except Exception as e:
+            logger.error("Zoom error: %s", e)
+            await context.bot.send_message(query.message.chat_id, f"Zoom failed: {e}")
@@ -1,17 +1,22 @@
+import asyncio
 import logging
 import subprocess
 from telegram import Update
 from telegram.ext import ContextTypes
+from config import SH_TIMEOUT
+from handlers.jobs import cancel_button
 from utils.auth import auth_required, rate_limit
-from utils.chunks import send_long_text
+from utils.executor import stream_process
+from utils.jobs import jobs
+from utils.stream import StreamingReply
 
 logger = logging.getLogger("bot.shell")
 
 
 @auth_required
-@rate_limit(5.0)
+@rate_limit("exec")
 async def sh_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """/sh <command> — run shell command, return stdout."""
+    """/sh <command> — run shell command, streaming output into one message."""
     args = context.args
     if not args:
         await update.message.reply_text("Usage: /sh <command>")
@@ -30,22 +35,26 @@ async def sh_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
         run_cmd = cmd
         use_shell = True
 
+    job = jobs.create("sh", cmd)
+    msg = await update.message.reply_text(f"$ {cmd}\n[job #{job.id}]", reply_markup=cancel_button(job.id))
+    reply = StreamingReply(context.bot, msg.chat_id, msg.message_id, f"$ {cmd}", cancel_button(job.id))
+    job.tail_fn = lambda: reply.tail
+    ticker = None
     try:
-        proc = subprocess.run(
-            run_cmd, shell=use_shell,
-            capture_output=True, timeout=60,
-        )
-        raw = proc.stdout + proc.stderr
-        try:
-            output = raw.decode("utf-8")
-        except UnicodeDecodeError:
-            output = raw.decode("cp866", errors="replace")
-        if not output.strip():
-            output = f"(no output, exit code {proc.returncode})"
-
-        await send_long_text(update, output)
+        async with jobs.track("sh", cmd, job):
+            ticker = asyncio.create_task(reply.run())
+            code = await stream_process(run_cmd, reply.feed, shell=use_shell, timeout=SH_TIMEOUT,
+                                        on_error=reply.feed_err)
+        footer = f"[exit {code}]"
     except subprocess.TimeoutExpired:
-        await update.message.reply_text("Command timed out (60s limit).")
+        footer = f"[timed out after {SH_TIMEOUT}s]"
+    except asyncio.CancelledError:
+        footer = "[cancelled]"
     except Exception as e:
         logger.error("/sh error: %s", e)
-        await update.message.reply_text(f"Shell error: {e}")
+        footer = f"[shell error: {e}]"
+    finally:
+        if ticker:
+            ticker.cancel()
+    await reply.finish(footer)
+
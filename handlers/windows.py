@@ -0,0 +1,73 @@
+import logging
+from telegram import InlineKeyboardButton as Btn, InlineKeyboardMarkup, Update
+from telegram.ext import ContextTypes
+from config import ALLOWED_USER_ID, WINDOW_LIST_MAX
+from handlers.screen import _grab_to_jpeg
+from utils.auth import auth_required
+from utils.executor import run_blocking
+from utils.metrics import track_request
+from utils.ratelimit import limiter
+from utils.window import focus_entry, region_of, registry
+
+logger = logging.getLogger("bot.windows")
+
+
+def _listing(query: str) -> tuple[str, InlineKeyboardMarkup | None]:
+    """Windows (ranked by match when a query is given) with Focus / Shot buttons (blocking)."""
+    if query:
+        entries = [entry for _, entry in registry.match(query, limit=WINDOW_LIST_MAX)]
+    else:
+        entries = registry.refresh(force=True)[:WINDOW_LIST_MAX]
+    if not entries:
+        return (f"No window matching '{query}'." if query else "No windows."), None
+    rows = [[Btn(f"Focus #{e.id}", callback_data=f"win:focus:{e.id}"),
+             Btn(f"Shot #{e.id}", callback_data=f"win:shot:{e.id}")] for e in entries]
+    text = "\n".join(e.describe() for e in entries)
+    return text + "\n\n/focus <id|name> · /window <id|name> · /crop window <id|name>", InlineKeyboardMarkup(rows)
+
+
+@auth_required
+async def windows_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/windows [query] — list open windows (best matches first) with focus buttons."""
+    query = " ".join(context.args or [])
+    logger.debug("/windows called: %s", query)
+    try:
+        text, markup = await run_blocking(_listing, query)
+    except Exception as e:
+        logger.error("/windows error: %s", e)
+        await update.message.reply_text(f"Window list failed: {e}")
+        return
+    await update.message.reply_text(text, reply_markup=markup)
+
+
+async def window_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle Focus / Shot buttons under a /windows listing."""
+    query = update.callback_query
+    if query.from_user is None or query.from_user.id != ALLOWED_USER_ID:
+        await query.answer("Unauthorized", show_alert=True)
+        return
+    _, action, window_id = query.data.split(":", 2)
+    entry = registry.get(int(window_id))
+    if entry is None:
+        await query.answer("Window is gone — /windows to refresh.", show_alert=True)
+        return
+    if not await limiter.acquire("input" if action == "focus" else "screen", query.data):
+        await query.answer("Already queued")
+        return
+
+    async with track_request(f"windows:{action}"):
+        if action == "focus":
+            ok, msg = await run_blocking(focus_entry, entry)
+            await query.answer(msg[:200], show_alert=not ok)
+            return
+        await query.answer(f"Capturing #{entry.id}...")
+        try:
+            rect = await run_blocking(registry.rect, entry)
+            if rect is None or rect[2] <= 0 or rect[3] <= 0:
+                await context.bot.send_message(query.message.chat_id, f"Window #{entry.id} has no visible area.")
+                return
+            buf = await run_blocking(_grab_to_jpeg, region_of(rect))
+            await context.bot.send_photo(query.message.chat_id, photo=buf, caption=entry.describe())
+        except Exception as e:
+            logger.error("Window shot error: %s", e)
+            await context.bot.send_message(query.message.chat_id, f"Window capture failed: {e}")
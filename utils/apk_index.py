@@ -0,0 +1,183 @@
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from config import APK_INDEX_FILE, APK_INDEX_TTL, APK_SEARCH_DIRS
+
+logger = logging.getLogger("bot.apk_index")
+
+
+@dataclass
+class ApkEntry:
+    path: str
+    mtime: float
+    size: int
+
+    @property
+    def variant(self) -> str:
+        """Gradle variant dir (outputs/apk/<flavor>/<type>/x.apk → 'flavor/type'), else parent dir name."""
+        parts = os.path.normpath(self.path).split(os.sep)
+        if "apk" in parts[:-1]:
+            i = len(parts) - 1 - parts[::-1].index("apk")
+            return "/".join(parts[i + 1:-1])
+        return parts[-2] if len(parts) > 1 else ""
+
+    def matches(self, filter_str: str) -> bool:
+        f = filter_str.lower()
+        return f in os.path.basename(self.path).lower() or f in self.variant.lower()
+
+
+class ApkIndex:
+    """Persistent APK index: one full walk, then rescans only directories whose mtime changed."""
+
+    def __init__(self, roots: list[str], path: str = APK_INDEX_FILE, ttl: float = APK_INDEX_TTL):
+        self.roots = [os.path.abspath(r) for r in roots]
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._dirs: dict[str, float] = {}  # dir -> mtime when last listed
+        self._apks: dict[str, ApkEntry] = {}
+        self._sorted: list[ApkEntry] | None = None
+        self._refreshed = 0.0
+        self._dirty = False  # in-memory index differs from the file
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("roots") != self.roots:
+            return  # search dirs changed — start fresh
+        self._dirs = data.get("dirs", {})
+        self._apks = {p: ApkEntry(p, m, s) for p, m, s in data.get("apks", [])}
+        logger.debug("APK index loaded: %d dirs, %d apks", len(self._dirs), len(self._apks))
+
+    def _save(self):
+        if not self._dirty:
+            return
+        data = {
+            "roots": self.roots,
+            "dirs": self._dirs,
+            "apks": [(e.path, e.mtime, e.size) for e in self._apks.values()],
+        }
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+            self._dirty = False
+        except OSError as e:
+            logger.warning("APK index save failed: %s", e)
+
+    def _scan_dir(self, d: str):
+        """List one directory: record APKs, recurse into subdirs not seen before."""
+        try:
+            mtime = os.stat(d).st_mtime
+            entries = list(os.scandir(d))
+        except OSError:
+            self._forget_dir(d)
+            return
+        self._dirs[d] = mtime
+        self._dirty = True
+        for entry in entries:
+            # Same rules as glob("**"): skip hidden entries
+            if entry.name.startswith("."):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.path not in self._dirs:
+                        self._scan_dir(entry.path)
+                elif entry.name.lower().endswith(".apk"):
+                    st = entry.stat()
+                    self._apks[entry.path] = ApkEntry(entry.path, st.st_mtime, st.st_size)
+            except OSError:
+                continue
+        self._sorted = None
+
+    def _forget_dir(self, d: str):
+        prefix = d + os.sep
+        for known in [k for k in self._dirs if k == d or k.startswith(prefix)]:
+            del self._dirs[known]
+        for apk in [p for p in self._apks if p.startswith(prefix)]:
+            del self._apks[apk]
+        self._sorted = None
+        self._dirty = True
+
+    def refresh(self, force: bool = False):
+        """Rescan changed directories (at most once per TTL unless forced)."""
+        with self._lock:
+            if not force and time.monotonic() - self._refreshed < self.ttl:
+                return
+            start = time.perf_counter()
+            for root in self.roots:
+                if root not in self._dirs:
+                    self._scan_dir(root)
+            changed = 0
+            for d, mtime in list(self._dirs.items()):
+                if d not in self._dirs:
+                    continue  # dropped with a removed parent
+                try:
+                    current = os.stat(d).st_mtime
+                except OSError:
+                    self._forget_dir(d)
+                    continue
+                if current != mtime:
+                    changed += 1
+                    self._rescan_listing(d)
+            # APKs overwritten in place don't touch the dir mtime
+            for path, entry in list(self._apks.items()):
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    del self._apks[path]
+                    self._sorted, self._dirty = None, True
+                    continue
+                if (st.st_mtime, st.st_size) != (entry.mtime, entry.size):
+                    self._apks[path] = ApkEntry(path, st.st_mtime, st.st_size)
+                    self._sorted, self._dirty = None, True
+            self._refreshed = time.monotonic()
+            self._save()  # only when something changed
+            logger.debug("APK index refresh: %d dirs, %d changed, %d apks in %.0fms",
+                         len(self._dirs), changed, len(self._apks), (time.perf_counter() - start) * 1000)
+
+    def _rescan_listing(self, d: str):
+        """Directory changed: drop vanished children, then list it again."""
+        prefix = d + os.sep
+        for apk in [p for p in self._apks if os.path.dirname(p) == d]:
+            del self._apks[apk]
+        for sub in [k for k in self._dirs if k.startswith(prefix) and os.sep not in k[len(prefix):]]:
+            if not os.path.isdir(sub):
+                self._forget_dir(sub)
+        self._scan_dir(d)
+
+    def register_tree(self, root: str):
+        """Index a known output tree right away (e.g. <project>/app/build/outputs/apk after a build)."""
+        with self._lock:
+            for dirpath, _, filenames in os.walk(root):
+                for name in filenames:
+                    if name.lower().endswith(".apk"):
+                        path = os.path.join(dirpath, name)
+                        try:
+                            st = os.stat(path)
+                        except OSError:
+                            continue  # removed meanwhile (e.g. a concurrent gradle clean)
+                        self._apks[path] = ApkEntry(path, st.st_mtime, st.st_size)
+            self._sorted, self._dirty = None, True
+            self._save()
+
+    def query(self, filter_str: str | None = None) -> list[ApkEntry]:
+        """APKs newest first, optionally filtered by name or variant substring."""
+        with self._lock:
+            if self._sorted is None:
+                self._sorted = sorted(self._apks.values(), key=lambda e: e.mtime, reverse=True)
+            entries = self._sorted
+        if filter_str:
+            entries = [e for e in entries if e.matches(filter_str)]
+        return list(entries)
+
+
+apk_index = ApkIndex(APK_SEARCH_DIRS)
@@ -0,0 +1,167 @@
+import asyncio
+import contextlib
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import time
+import zipfile
+from dataclasses import dataclass
+from config import MAX_FILE_SIZE, ZIP_COMPRESSLEVEL
+from utils.executor import run_thread
+
+logger = logging.getLogger("bot.archive")
+
+VOLUME_SIZE = MAX_FILE_SIZE - 64 * 1024  # headroom under the upload limit
+
+
+@dataclass
+class Volume:
+    index: int
+    data: tempfile.SpooledTemporaryFile
+    size: int
+    sha256: str
+    last: bool
+
+
+class _VolumeWriter(io.RawIOBase):
+    """Unseekable sink for ZipFile that cuts the byte stream into fixed-size volumes.
+
+    Only the volume being filled is buffered (memory up to 8 MB, then a temp file).
+    """
+
+    def __init__(self, volume_size: int, on_volume):
+        self.volume_size = volume_size
+        self.on_volume = on_volume
+        self.aborted = False
+        self.total = hashlib.sha256()
+        self.total_size = 0
+        self._index = 0
+        self._new_volume()
+
+    def _new_volume(self):
+        self._cur = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+        self._cur_hash = hashlib.sha256()
+        self._cur_size = 0
+
+    def _flush_volume(self, last: bool):
+        self._index += 1
+        self._cur.seek(0)
+        self.on_volume(Volume(self._index, self._cur, self._cur_size, self._cur_hash.hexdigest(), last))
+        self._new_volume()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        if self.aborted:
+            raise OSError("archive upload aborted")
+        mv = memoryview(b).cast("B")
+        n = len(mv)
+        while mv:
+            # Emit a full volume only once more data arrives, so the last one is known as last
+            if self._cur_size >= self.volume_size:
+                self._flush_volume(last=False)
+            take = mv[:self.volume_size - self._cur_size]
+            self._cur.write(take)
+            self._cur_hash.update(take)
+            self.total.update(take)
+            self._cur_size += len(take)
+            self.total_size += len(take)
+            mv = mv[len(take):]
+        return n
+
+    def finish(self):
+        self._flush_volume(last=True)
+
+
+def _add_to_zip(zf: zipfile.ZipFile, src: str) -> int:
+    """Add a file or a directory tree, return source bytes read."""
+    src = os.path.abspath(src)
+    if os.path.isfile(src):
+        zf.write(src, os.path.basename(src))
+        return os.path.getsize(src)
+
+    base = os.path.dirname(src)
+    read = 0
+    for dirpath, _, filenames in os.walk(src):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            try:
+                zf.write(path, os.path.relpath(path, base))
+                read += os.path.getsize(path)
+            except OSError as e:
+                logger.debug("Skipping %s: %s", path, e)
+    return read
+
+
+@dataclass
+class ArchiveResult:
+    name: str
+    volumes: list[tuple[str, int, str]]  # (filename, size, sha256)
+    source_bytes: int
+    archive_bytes: int
+    sha256: str
+    elapsed: float
+
+    def manifest(self) -> str:
+        """sha256sum-compatible manifest: every volume plus the reassembled archive."""
+        lines = [f"{sha}  {fname}" for fname, _, sha in self.volumes]
+        if len(self.volumes) > 1:
+            lines.append(f"{self.sha256}  {self.name}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        mb = self.source_bytes / 1024 / 1024
+        rate = mb / self.elapsed if self.elapsed else 0.0
+        text = (f"{self.name}: {len(self.volumes)} volume(s), "
+                f"{mb:.1f}MB → {self.archive_bytes / 1024 / 1024:.1f}MB in {self.elapsed:.0f}s ({rate:.1f} MB/s)")
+        if len(self.volumes) > 1:
+            text += (f"\nReassemble: cat {self.name}.[0-9][0-9][0-9] > {self.name} (Windows: copy /b {self.name}.001+"
+                     f"{self.name}.002+... {self.name})\nVerify: sha256sum -c {self.name}.sha256")
+        return text
+
+
+async def send_zip_volumes(bot, chat_id: int, src: str, volume_size: int = VOLUME_SIZE) -> ArchiveResult:
+    """Zip src in a worker thread and upload each volume as soon as it is complete."""
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue[Volume | None] = asyncio.Queue(maxsize=1)  # backpressure: one volume ahead
+    name = os.path.basename(os.path.normpath(src)) + ".zip"
+    writer = _VolumeWriter(volume_size, lambda v: asyncio.run_coroutine_threadsafe(queue.put(v), loop).result())
+    start = time.monotonic()
+
+    def produce() -> int:
+        try:
+            with zipfile.ZipFile(writer, "w", zipfile.ZIP_DEFLATED, compresslevel=ZIP_COMPRESSLEVEL) as zf:
+                read = _add_to_zip(zf, src)
+            writer.finish()
+            return read
+        finally:
+            asyncio.run_coroutine_threadsafe(queue.put(None), loop).result()
+
+    # Not the worker pool: a big zip would hold a capture/input thread for minutes
+    producer = asyncio.ensure_future(run_thread(produce))
+    volumes: list[tuple[str, int, str]] = []
+    try:
+        while (vol := await queue.get()) is not None:
+            single = vol.index == 1 and vol.last
+            fname = name if single else f"{name}.{vol.index:03d}"
+            volumes.append((fname, vol.size, vol.sha256))
+            logger.debug("Uploading %s (%d bytes)", fname, vol.size)
+            try:
+                await bot.send_document(chat_id, document=vol.data, filename=fname,
+                                        caption=f"{fname} ({vol.size // 1024}KB)")
+            finally:
+                vol.data.close()
+    except BaseException:
+        # Stop the zip thread and let it reach its sentinel
+        writer.aborted = True
+        while (vol := await queue.get()) is not None:
+            vol.data.close()
+        with contextlib.suppress(Exception):
+            await producer
+        raise
+    source_bytes = await producer
+    return ArchiveResult(name, volumes, source_bytes, writer.total_size, writer.total.hexdigest(),
+                         time.monotonic() - start)
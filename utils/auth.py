@@ -1,17 +1,16 @@
 import functools
 import logging
-import time
 from telegram import Update
 from telegram.ext import ContextTypes
 from config import ALLOWED_USER_ID
+from utils.metrics import metrics, track_request
+from utils.ratelimit import limiter
 
 logger = logging.getLogger("bot.auth")
 
-_cooldowns: dict[str, float] = {}
-
 
 def auth_required(func):
-    """Decorator: reject any user except ALLOWED_USER_ID."""
+    """Decorator: reject any user except ALLOWED_USER_ID; time the handler for /metrics."""
 
     @functools.wraps(func)
     async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -22,26 +21,31 @@ def auth_required(func):
             await update.message.reply_text("Unauthorized.")
             return
         logger.debug("Auth OK for user %s -> %s", user.id, func.__name__)
-        return await func(update, context)
+        async with track_request(func.__name__.removesuffix("_cmd")) as req:
+            result = await func(update, context)
+        if metrics.debug and update.effective_message:
+            await update.effective_message.reply_text(req.render())
+        return result
 
     return wrapper
 
 
-def rate_limit(seconds: float):
-    """Decorator: enforce per-command cooldown in seconds."""
+def rate_limit(resource: str, coalesce: bool = False):
+    """Decorator: take a token from the shared `resource` bucket, waiting when a burst exceeds it.
+
+    coalesce: an identical repeat (same command and arguments) while the previous one still
+    waits is merged into it (double-tapping /screen yields one screenshot, not two).
+    """
 
     def decorator(func):
+        name = func.__name__.removesuffix("_cmd")
+
         @functools.wraps(func)
         async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
-            key = func.__name__
-            now = time.time()
-            last = _cooldowns.get(key, 0.0)
-            if now - last < seconds:
-                remaining = seconds - (now - last)
-                logger.debug("Rate limit hit for %s (%.0fs cooldown)", key, seconds)
-                await update.message.reply_text(f"Cooldown: wait {remaining:.0f}s")
+            key = " ".join([name, *(context.args or [])]) if coalesce else None
+            if not await limiter.acquire(resource, key):
+                await update.message.reply_text(f"/{key}: merged into the identical queued request.")
                 return
-            _cooldowns[key] = now
             return await func(update, context)
 
         return wrapper
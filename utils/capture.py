@@ -0,0 +1,95 @@
+import logging
+import threading
+from PIL import Image
+from backends import BackendUnavailable, platform_kind
+from utils.metrics import stage
+
+logger = logging.getLogger("bot.capture")
+
+
+def _screenshot_error() -> type[Exception]:
+    # Evaluated only when an except clause is matched, so mss stays unimported until needed
+    from mss.exception import ScreenShotError
+    return ScreenShotError
+
+
+class CaptureEngine:
+    """Long-lived screen grabber: keeps mss session and monitor geometry across calls."""
+
+    def __init__(self):
+        # mss handles are bound to the thread that created them
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._monitors: list[dict] | None = None
+        self.last_frame: Image.Image | None = None
+        self.last_region: dict | None = None
+
+    def _sct(self):
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            if platform_kind() == "headless":
+                raise BackendUnavailable("No display on this machine (screen capture) — running headless")
+            import mss  # loaded on first capture, not at startup
+            sct = mss.mss()
+            self._local.sct = sct
+            logger.debug("mss session opened in %s", threading.current_thread().name)
+        return sct
+
+    @property
+    def monitors(self) -> list[dict]:
+        """Cached monitor geometry (index 0 = all monitors, 1 = primary)."""
+        if self._monitors is None:
+            with self._lock:
+                if self._monitors is None:
+                    self._monitors = [dict(m) for m in self._sct().monitors]
+        return self._monitors
+
+    def refresh_monitors(self):
+        """Drop cached geometry — call after display layout changes."""
+        with self._lock:
+            self._monitors = None
+
+    def target(self, region: dict | None = None) -> dict:
+        """Resolve region to absolute screen geometry (None = primary monitor)."""
+        return region or self.monitors[1]
+
+    def grab_raw(self, region: dict | None = None) -> tuple[tuple[int, int], bytes, dict]:
+        """Grab region as undecoded BGRA bytes: (size, bgra, resolved target)."""
+        target = self.target(region)
+        try:
+            raw = self._sct().grab(target)
+        except _screenshot_error():
+            # Display layout changed or session went stale — reopen once
+            self.close()
+            self.refresh_monitors()
+            target = self.target(region)
+            raw = self._sct().grab(target)
+        return raw.size, raw.bgra, target
+
+    def _grab(self, region: dict | None) -> tuple[Image.Image, dict]:
+        size, bgra, target = self.grab_raw(region)
+        return Image.frombuffer("RGB", size, bgra, "raw", "BGRX", 0, 1), target
+
+    def capture(self, region: dict | None = None) -> Image.Image:
+        """Grab region (or primary monitor) as RGB image, built straight from BGRA."""
+        with stage("capture"):
+            img, target = self._grab(region)
+        self.last_frame = img
+        self.last_region = dict(target)
+        return img
+
+    def sample(self, region: dict | None, max_dim: int) -> Image.Image:
+        """Small grayscale thumbnail for change detection; leaves last_frame alone."""
+        img, _ = self._grab(region)
+        factor = max(1, -(-max(img.size) // max_dim))
+        return img.reduce(factor).convert("L")
+
+    def close(self):
+        """Close this thread's mss session."""
+        sct = getattr(self._local, "sct", None)
+        if sct is not None:
+            sct.close()
+            self._local.sct = None
+
+
+engine = CaptureEngine()
@@ -1,43 +1,114 @@
+import gzip
 import io
 import logging
+import re
+import shutil
+import tempfile
 from telegram import Update
+from telegram.error import RetryAfter
+from config import SEND_GZIP_OVER, SEND_MAX_CHUNKS
+from utils.executor import run_blocking
 
 logger = logging.getLogger("bot.chunks")
 
-TG_MSG_LIMIT = 4096
+TG_MSG_LIMIT = 4096  # UTF-16 code units, not characters
+TG_CAPTION_LIMIT = 1024
+_FENCE_RE = re.compile(r"^\s*(```|~~~)")
+_FENCE_ROOM = 64  # reserved per chunk for closing/reopening a code fence
 
 
-async def send_long_text(update: Update, text: str):
-    """Send text, splitting into chunks or as .txt file if too long."""
-    if len(text) <= TG_MSG_LIMIT:
-        await update.message.reply_text(text)
-        return
+def retry_after_seconds(e: RetryAfter) -> float:
+    """Flood-wait as float seconds (PTB returns int or timedelta depending on version)."""
+    ra = e.retry_after
+    return ra.total_seconds() if hasattr(ra, "total_seconds") else float(ra)
+
+
+def tg_len(text: str) -> int:
+    """Length as Telegram counts it: emoji and other non-BMP characters count twice."""
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _cut(line: str, room: int) -> str:
+    """Longest prefix of line within `room` units, broken at a space when there is one."""
+    end = min(len(line), room)
+    while tg_len(line[:end]) > room:
+        end -= max(1, (tg_len(line[:end]) - room) // 2)
+    space = line.rfind(" ", end // 2, end)
+    return line[:space + 1] if space > 0 and end < len(line) else line[:end]
+
+
+def _lines(text: str, room: int):
+    for line in text.splitlines(keepends=True):
+        while tg_len(line) > room:
+            piece = _cut(line, room)
+            yield piece
+            line = line[len(piece):]
+        if line:
+            yield line
+
+
+def split_message(text: str, limit: int = TG_MSG_LIMIT) -> list[str]:
+    """Split text into messages on line boundaries; a code block cut in two is closed and reopened."""
+    chunks: list[str] = []
+    buf: list[str] = []
+    size = 0
+    fence = ""  # opening fence line of the block we are in, "" outside code
+    for line in _lines(text, limit - _FENCE_ROOM):
+        n = tg_len(line)
+        if buf and size + n + (_FENCE_ROOM if fence else 0) > limit:
+            body = "".join(buf).rstrip("\n")
+            chunks.append(body + "\n```" if fence else body)
+            buf, size = ([fence], tg_len(fence)) if fence else ([], 0)
+        buf.append(line)
+        size += n
+        if _FENCE_RE.match(line):
+            fence = "" if fence else line.rstrip()[:_FENCE_ROOM - 8] + "\n"
+    chunks.append("".join(buf).rstrip("\n"))
+    return [c for c in chunks if c.strip()]
 
-    # If very long, send as file
-    if len(text) > TG_MSG_LIMIT * 3:
-        buf = io.BytesIO(text.encode("utf-8"))
-        buf.name = "output.txt"
-        await update.message.reply_document(document=buf, caption=f"Output ({len(text)} chars)")
-        return
 
-    # Split into chunks
-    for i in range(0, len(text), TG_MSG_LIMIT):
-        chunk = text[i:i + TG_MSG_LIMIT]
-        await update.message.reply_text(chunk)
+def text_document(text: str, filename: str = "output.txt") -> tuple[io.BytesIO, str]:
+    """Attachment for long text: plain while Telegram can preview it, gzip above SEND_GZIP_OVER."""
+    raw = text.encode("utf-8")
+    if len(raw) > SEND_GZIP_OVER:
+        return io.BytesIO(gzip.compress(raw, compresslevel=6, mtime=0)), filename + ".gz"
+    return io.BytesIO(raw), filename
+
+
+def gzip_file(src) -> tempfile.SpooledTemporaryFile:
+    """Gzip a readable binary file object into a spooled temp file (blocking; run in the pool)."""
+    out = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    with gzip.GzipFile(fileobj=out, mode="wb", compresslevel=6, mtime=0) as gz:
+        shutil.copyfileobj(src, gz, 256 * 1024)
+    out.seek(0)
+    return out
+
+
+async def send_text(bot, chat_id: int, text: str, filename: str = "output.txt", reply_markup=None):
+    """Send text as up to SEND_MAX_CHUNKS messages, else as a (gzipped if large) attachment.
+
+    Messages go out in order; pacing and RetryAfter retries happen in the bot's ChatRateLimiter.
+    """
+    text = text if text.strip() else "(empty)"
+    chunks = split_message(text)
+    if len(chunks) > SEND_MAX_CHUNKS:
+        doc, name = await run_blocking(text_document, text, filename)
+        lines = text.count("\n") + (not text.endswith("\n"))
+        logger.debug("Sending %d chars as %s", len(text), name)
+        return await bot.send_document(chat_id, document=doc, filename=name, reply_markup=reply_markup,
+                                       caption=f"Output ({len(text)} chars, {lines} lines)")
+    msg = None
+    for i, chunk in enumerate(chunks):
+        last = i == len(chunks) - 1
+        msg = await bot.send_message(chat_id, chunk, reply_markup=reply_markup if last else None)
+    return msg
+
+
+async def send_long_text(update: Update, text: str):
+    """Reply with text, split on line boundaries or attached if too long."""
+    await send_text(update.get_bot(), update.effective_chat.id, text)
 
 
 async def send_long_text_to_chat(bot, chat_id: int, text: str):
-    """Send text to chat_id, splitting into chunks or as .txt file if too long."""
-    if len(text) <= TG_MSG_LIMIT:
-        await bot.send_message(chat_id, text)
-        return
-
-    if len(text) > TG_MSG_LIMIT * 3:
-        buf = io.BytesIO(text.encode("utf-8"))
-        buf.name = "output.txt"
-        await bot.send_document(chat_id, document=buf, caption=f"Output ({len(text)} chars)")
-        return
-
-    for i in range(0, len(text), TG_MSG_LIMIT):
-        chunk = text[i:i + TG_MSG_LIMIT]
-        await bot.send_message(chat_id, chunk)
+    """Send text to chat_id, split on line boundaries or attached if too long."""
+    await send_text(bot, chat_id, text)
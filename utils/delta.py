@@ -0,0 +1,64 @@
+import hashlib
+import logging
+import threading
+from PIL import Image
+from config import DELTA_MAX_AREA, DELTA_TILE
+
+logger = logging.getLogger("bot.delta")
+
+
+def tile_hashes(img: Image.Image, tile: int = DELTA_TILE) -> list[bytes]:
+    """Hash image in tile x tile blocks, row-major."""
+    w, h = img.size
+    hashes = []
+    for top in range(0, h, tile):
+        for left in range(0, w, tile):
+            block = img.crop((left, top, min(left + tile, w), min(top + tile, h)))
+            hashes.append(hashlib.blake2b(block.tobytes(), digest_size=8).digest())
+    return hashes
+
+
+class FrameDiffer:
+    """Keep tile hashes of the last frame and report what changed since."""
+
+    def __init__(self, tile: int = DELTA_TILE, max_area: float = DELTA_MAX_AREA):
+        self.tile = tile
+        self.max_area = max_area
+        self._lock = threading.Lock()
+        self._key: tuple | None = None
+        self._size: tuple[int, int] | None = None
+        self._hashes: list[bytes] = []
+
+    def reset(self):
+        """Forget the baseline — next diff reports a full frame."""
+        with self._lock:
+            self._key = None
+            self._hashes = []
+
+    def diff(self, img: Image.Image, key: tuple) -> tuple[int, int, int, int] | None:
+        """Return dirty bbox (left, top, right, bottom), None if unchanged, full box if mostly changed."""
+        hashes = tile_hashes(img, self.tile)
+        w, h = img.size
+        full = (0, 0, w, h)
+        with self._lock:
+            prev, same_frame = self._hashes, (self._key == key and self._size == img.size)
+            self._key, self._size, self._hashes = key, img.size, hashes
+        if not same_frame:
+            return full
+
+        cols = (w + self.tile - 1) // self.tile
+        dirty = [i for i, (a, b) in enumerate(zip(prev, hashes)) if a != b]
+        if not dirty:
+            return None
+
+        rows = [i // cols for i in dirty]
+        xs = [i % cols for i in dirty]
+        left, top = min(xs) * self.tile, min(rows) * self.tile
+        right, bottom = min((max(xs) + 1) * self.tile, w), min((max(rows) + 1) * self.tile, h)
+        if (right - left) * (bottom - top) > self.max_area * w * h:
+            return full
+        logger.debug("Delta: %d/%d tiles dirty, bbox %s", len(dirty), len(hashes), (left, top, right, bottom))
+        return left, top, right, bottom
+
+
+differ = FrameDiffer()
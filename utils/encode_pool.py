@@ -0,0 +1,75 @@
+import io
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from PIL import Image
+from config import ENCODE_PROCESSES
+from utils.encoder import _EXT, Encoded, encode
+
+logger = logging.getLogger("bot.encode_pool")
+
+_pool: ProcessPoolExecutor | None = None
+_lock = threading.Lock()
+
+
+def _encode_shared(name: str, size: tuple[int, int]) -> tuple:
+    """Pool process side: decode the BGRA frame straight out of shared memory and encode it."""
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        img = Image.frombytes("RGB", size, shm.buf, "raw", "BGRX")  # copies, so the block can close
+    finally:
+        shm.close()
+    result = encode(img)
+    return result.buf.getvalue(), result.fmt, result.dims, result.quality, result.elapsed_ms
+
+
+def _init_worker(level: int):
+    """Pool process start: importing config set up DEBUG logging; follow the parent's level instead."""
+    logging.getLogger().setLevel(level)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _lock:
+        if _pool is None:
+            # spawn: never fork a process that has an event loop and worker threads running
+            _pool = ProcessPoolExecutor(ENCODE_PROCESSES, mp_context=multiprocessing.get_context("spawn"),
+                                        initializer=_init_worker, initargs=(logging.getLogger().level,))
+            logger.debug("Encode pool started: %d processes", ENCODE_PROCESSES)
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def encode_raw(size: tuple[int, int], bgra: bytes) -> Encoded:
+    """Encode a raw BGRA grab in a pool process (blocking).
+
+    The frame crosses into the pool through one shared-memory block instead of a
+    pickled copy; only the encoded bytes come back. Several threads calling this at
+    once encode in parallel on separate cores. ENCODE_PROCESSES=0 encodes in-thread.
+    """
+    if ENCODE_PROCESSES <= 0:
+        return encode(Image.frombuffer("RGB", size, bgra, "raw", "BGRX", 0, 1))
+    shm = shared_memory.SharedMemory(create=True, size=len(bgra))
+    try:
+        shm.buf[:len(bgra)] = bgra
+        data, fmt, dims, quality, elapsed_ms = _get_pool().submit(_encode_shared, shm.name, size).result()
+    except BrokenProcessPool as e:
+        logger.warning("Encode pool broke (%s) — encoding in-thread", e)
+        _reset_pool()
+        return encode(Image.frombuffer("RGB", size, bgra, "raw", "BGRX", 0, 1))
+    finally:
+        shm.close()
+        shm.unlink()
+    buf = io.BytesIO(data)
+    buf.name = f"screenshot.{_EXT[fmt]}"
+    return Encoded(buf, fmt, len(data), dims, quality, elapsed_ms)
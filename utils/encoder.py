@@ -0,0 +1,108 @@
+import io
+import logging
+import time
+from dataclasses import dataclass
+from PIL import Image
+from config import (
+    SCREENSHOT_BUDGET, SCREENSHOT_MAX_DIM, SCREENSHOT_MIN_QUALITY, SCREENSHOT_QUALITY,
+    SCREENSHOT_TEXT_COLORS, SCREENSHOT_TEXT_FORMAT,
+)
+from utils.metrics import stage
+
+logger = logging.getLogger("bot.encoder")
+
+_EXT = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp"}
+
+
+@dataclass
+class Encoded:
+    buf: io.BytesIO
+    fmt: str
+    size: int  # bytes
+    dims: tuple[int, int]
+    quality: int | None
+    elapsed_ms: float
+
+    def summary(self) -> str:
+        q = f" q{self.quality}" if self.quality else ""
+        return f"{self.fmt}{q} {self.dims[0]}x{self.dims[1]} {self.size // 1024}KB in {self.elapsed_ms:.0f}ms"
+
+
+def is_text_frame(img: Image.Image, max_colors: int = SCREENSHOT_TEXT_COLORS) -> bool:
+    """Low color count on a nearest-neighbour sample → terminal/IDE-like frame."""
+    sample = img.resize((min(img.width, 320), min(img.height, 180)), Image.Resampling.NEAREST)
+    return sample.getcolors(maxcolors=max_colors) is not None
+
+
+def downscale(img: Image.Image, max_dim: int = SCREENSHOT_MAX_DIM) -> Image.Image:
+    """Fit image into max_dim x max_dim, keeping aspect ratio."""
+    scale = max_dim / max(img.size)
+    if scale >= 1:
+        return img
+    size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+    return img.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+
+def _save(img: Image.Image, fmt: str, **params) -> io.BytesIO:
+    buf = io.BytesIO()
+    img.save(buf, format=fmt, **params)
+    buf.seek(0)
+    return buf
+
+
+def _jpeg_within(img: Image.Image, budget: int) -> tuple[io.BytesIO, int, Image.Image]:
+    """Highest JPEG quality that fits budget — try default, else bisect on a 1/4-area proxy.
+
+    The proxy only estimates; an over-budget full-size result steps the quality down, then
+    the size, until it fits. Returns the image actually encoded as well.
+    """
+    buf = _save(img, "JPEG", quality=SCREENSHOT_QUALITY)
+    if buf.getbuffer().nbytes <= budget:
+        return buf, SCREENSHOT_QUALITY, img
+
+    # JPEG size scales ~linearly with area, so search on the proxy and encode full size once
+    proxy, proxy_budget = img.reduce(2), budget // 4
+    lo, hi, q = SCREENSHOT_MIN_QUALITY, SCREENSHOT_QUALITY - 1, SCREENSHOT_MIN_QUALITY
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        if _save(proxy, "JPEG", quality=mid).getbuffer().nbytes <= proxy_budget:
+            q, lo = mid, mid + 1
+        else:
+            hi = mid - 1
+
+    buf = _save(img, "JPEG", quality=q)
+    while (size := buf.getbuffer().nbytes) > budget and min(img.size) > 64:
+        if q > SCREENSHOT_MIN_QUALITY:
+            q = max(SCREENSHOT_MIN_QUALITY, q - 5)
+        else:
+            # Size scales ~with area: shrink both sides by sqrt of the overshoot (plus margin)
+            scale = (budget / size) ** 0.5 * 0.95
+            img = img.resize((max(1, int(img.width * scale)), max(1, int(img.height * scale))),
+                             Image.Resampling.LANCZOS)
+        buf = _save(img, "JPEG", quality=q)
+    return buf, q, img
+
+
+def encode(img: Image.Image, max_dim: int = SCREENSHOT_MAX_DIM, budget: int = SCREENSHOT_BUDGET) -> Encoded:
+    """Downscale and encode frame: lossless for text-heavy frames, JPEG for photographic ones."""
+    start = time.perf_counter()
+    with stage("encode"):
+        img = downscale(img, max_dim)
+        buf, fmt, quality = None, "JPEG", None
+
+        if is_text_frame(img):
+            fmt = SCREENSHOT_TEXT_FORMAT
+            params = {"lossless": True, "method": 2} if fmt == "WEBP" else {"compress_level": 3}
+            buf = _save(img, fmt, **params)
+            if buf.getbuffer().nbytes > budget and fmt == "PNG":
+                buf = _save(img.quantize(256), "PNG", compress_level=3)
+            if buf.getbuffer().nbytes > budget:
+                buf, fmt = None, "JPEG"
+
+        if buf is None:
+            buf, quality, img = _jpeg_within(img, budget)
+
+    buf.name = f"screenshot.{_EXT[fmt]}"
+    result = Encoded(buf, fmt, buf.getbuffer().nbytes, img.size, quality, (time.perf_counter() - start) * 1000)
+    logger.debug("Encoded %s", result.summary())
+    return result
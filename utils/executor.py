@@ -0,0 +1,144 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import signal
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from config import WORKER_THREADS
+from utils.metrics import stage
+
+logger = logging.getLogger("bot.executor")
+
+# Capture, input and window calls are short but blocking — keep them off the loop
+_pool = ThreadPoolExecutor(max_workers=WORKER_THREADS, thread_name_prefix="bot-worker")
+_in_flight = {"threads": 0, "procs": 0}
+
+
+@dataclass
+class ProcResult:
+    returncode: int
+    stdout: bytes
+    stderr: bytes
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking callable in the bounded worker pool (with the caller's context, for stage timings)."""
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    _in_flight["threads"] += 1
+    try:
+        return await loop.run_in_executor(_pool, functools.partial(ctx.run, func, *args, **kwargs))
+    finally:
+        _in_flight["threads"] -= 1
+
+
+async def run_thread(func, *args, **kwargs):
+    """Run a long blocking callable (minutes, e.g. zipping) on its own thread, outside the worker pool."""
+    _in_flight["threads"] += 1
+    try:
+        return await asyncio.to_thread(func, *args, **kwargs)
+    finally:
+        _in_flight["threads"] -= 1
+
+
+async def spawn(cmd: list[str] | str, *, shell: bool = False, cwd: str | None = None,
+                stdin=subprocess.DEVNULL, env: dict | None = None) -> asyncio.subprocess.Process:
+    """Start a subprocess with piped stdout/stderr in its own process group. env extends os.environ."""
+    kwargs = {"cwd": cwd, "stdin": stdin, "stdout": subprocess.PIPE, "stderr": subprocess.PIPE}
+    if env:
+        kwargs["env"] = {**os.environ, **env}
+    if os.name == "nt":
+        kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs["start_new_session"] = True
+    if shell:
+        return await asyncio.create_subprocess_shell(cmd, **kwargs)
+    return await asyncio.create_subprocess_exec(*cmd, **kwargs)
+
+
+async def kill_tree(proc: asyncio.subprocess.Process):
+    """Kill process and its children (gradlew/cmd spawn grandchildren)."""
+    if proc.returncode is not None:
+        return
+    try:
+        if os.name == "nt":
+            killer = await asyncio.create_subprocess_exec(
+                "taskkill", "/F", "/T", "/PID", str(proc.pid),
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            await killer.wait()
+        else:
+            os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, OSError) as e:
+        logger.debug("kill_tree(%s): %s", proc.pid, e)
+        proc.kill()
+    await proc.wait()
+
+
+async def run_process(cmd: list[str] | str, *, shell: bool = False, cwd: str | None = None,
+                      timeout: float | None = None, env: dict | None = None) -> ProcResult:
+    """Run subprocess without blocking the loop. Raises TimeoutExpired; kills on cancel."""
+    proc = await spawn(cmd, shell=shell, cwd=cwd, env=env)
+    _in_flight["procs"] += 1
+    logger.debug("Spawned pid %s: %s", proc.pid, cmd)
+    try:
+        with stage("subprocess"):
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        await kill_tree(proc)
+        raise subprocess.TimeoutExpired(cmd, timeout)
+    except asyncio.CancelledError:
+        await kill_tree(proc)
+        raise
+    finally:
+        _in_flight["procs"] -= 1
+    return ProcResult(proc.returncode, stdout, stderr)
+
+
+async def stream_process(cmd: list[str] | str, on_output, *, shell: bool = False, cwd: str | None = None,
+                         timeout: float | None = None, on_error=None) -> int:
+    """Run subprocess, passing stdout/stderr byte chunks to on_output as they arrive. Returns exit code.
+
+    Pass on_error to receive stderr separately; a caller decoding text incrementally must,
+    since chunks of the two streams interleave mid-character.
+    """
+    proc = await spawn(cmd, shell=shell, cwd=cwd)
+    _in_flight["procs"] += 1
+    logger.debug("Streaming pid %s: %s", proc.pid, cmd)
+
+    async def pump(stream: asyncio.StreamReader, callback):
+        while chunk := await stream.read(4096):
+            callback(chunk)
+
+    readers = asyncio.gather(pump(proc.stdout, on_output), pump(proc.stderr, on_error or on_output))
+    try:
+        with stage("subprocess"):
+            await asyncio.wait_for(asyncio.shield(readers), timeout)
+            await proc.wait()
+    except asyncio.TimeoutError:
+        await kill_tree(proc)
+        await _drain(readers)
+        raise subprocess.TimeoutExpired(cmd, timeout)
+    except asyncio.CancelledError:
+        await kill_tree(proc)
+        await _drain(readers)
+        raise
+    finally:
+        _in_flight["procs"] -= 1
+    return proc.returncode
+
+
+async def _drain(readers: asyncio.Future):
+    """Collect output left in pipes after a kill, giving up after 2s."""
+    try:
+        await asyncio.wait_for(readers, 2)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        pass
+
+
+def in_flight() -> dict[str, int]:
+    """Snapshot of running pool jobs and subprocesses."""
+    return dict(_in_flight)
@@ -0,0 +1,112 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from telegram.error import BadRequest
+from config import FILE_CACHE_FILE, FILE_CACHE_MAX
+from utils.executor import run_blocking
+
+logger = logging.getLogger("bot.file_cache")
+
+
+class FileIdCache:
+    """Telegram file_id per file content, persisted as JSON with LRU eviction.
+
+    Entries are keyed by size + SHA-256, so a copied APK still hits. The hash is
+    memoised per (path, size, mtime) — unchanged files are never re-read.
+    """
+
+    def __init__(self, path: str = FILE_CACHE_FILE, max_entries: int = FILE_CACHE_MAX):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict] = {}  # key -> {file_id, path, used}
+        self._hashes: dict[str, list] = {}  # path -> [size, mtime, key]
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            self._entries = data.get("entries", {})
+            self._hashes = data.get("hashes", {})
+        except (OSError, ValueError):
+            pass
+
+    def _save(self):
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"entries": self._entries, "hashes": self._hashes}, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning("File cache save failed: %s", e)
+
+    def key(self, path: str) -> str:
+        """size:sha256 for file, reusing the memoised hash if size and mtime match (blocking)."""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        with self._lock:
+            memo = self._hashes.get(path)
+        if memo and memo[0] == st.st_size and memo[1] == st.st_mtime:
+            return memo[2]
+
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            while chunk := f.read(1024 * 1024):
+                h.update(chunk)
+        key = f"{st.st_size}:{h.hexdigest()}"
+        with self._lock:
+            self._hashes[path] = [st.st_size, st.st_mtime, key]
+        return key
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry["used"] = time.time()
+            return entry["file_id"]
+
+    def put(self, key: str, file_id: str, path: str):
+        """Remember an upload and persist the cache (blocking)."""
+        with self._lock:
+            self._entries[key] = {"file_id": file_id, "path": os.path.abspath(path), "used": time.time()}
+            if len(self._entries) > self.max_entries:
+                oldest = sorted(self._entries, key=lambda k: self._entries[k]["used"])
+                for k in oldest[:len(self._entries) - self.max_entries]:
+                    del self._entries[k]
+            live = {e["path"] for e in self._entries.values()}
+            self._hashes = {p: m for p, m in self._hashes.items() if p in live}
+            self._save()
+
+    def drop(self, key: str):
+        """Forget a rejected file_id and persist the cache (blocking)."""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._save()
+
+
+file_cache = FileIdCache()
+
+
+async def send_document_cached(bot, chat_id: int, path: str, caption: str | None = None):
+    """Send file by cached file_id when the same content went out before, else upload and remember."""
+    key = await run_blocking(file_cache.key, path)
+    file_id = file_cache.get(key)
+    if file_id:
+        try:
+            msg = await bot.send_document(chat_id, document=file_id, caption=caption)
+            logger.debug("Sent %s by file_id (no upload)", path)
+            return msg
+        except BadRequest as e:
+            logger.debug("Cached file_id rejected (%s), re-uploading", e)
+            await run_blocking(file_cache.drop, key)
+
+    with open(path, "rb") as f:
+        msg = await bot.send_document(chat_id, document=f, filename=os.path.basename(path), caption=caption)
+    if msg.document:
+        await run_blocking(file_cache.put, key, msg.document.file_id, path)
+    return msg
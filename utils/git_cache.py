@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from config import GIT_WORKTREE_TTL
+from utils.executor import ProcResult, run_blocking, run_process
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # optional: without it worktree queries fall back to a short TTL
+    Observer = None
+    FileSystemEventHandler = object
+
+logger = logging.getLogger("bot.git_cache")
+
+# Queries safe to cache: no side effects on repo state
+CACHEABLE = {"status", "log", "diff", "show"}
+# Read-only only when given flags alone ("git branch foo" creates a branch)
+LIST_ONLY = {"branch", "tag", "remote"}
+# Results that also depend on files in the worktree, not just on .git metadata
+WORKTREE_DEPENDENT = {"status", "diff"}
+_MUTATING_FLAGS = {"-d", "-D", "-m", "-M", "-c", "-C", "-f", "--delete", "--move", "--copy", "--force"}
+
+
+def _find_git_meta(work_dir: str) -> str | None:
+    """Resolve the .git directory for work_dir (walks up; follows 'gitdir:' files)."""
+    d = os.path.abspath(work_dir)
+    while True:
+        candidate = os.path.join(d, ".git")
+        if os.path.isdir(candidate):
+            return candidate
+        if os.path.isfile(candidate):
+            with open(candidate, encoding="utf-8") as f:
+                line = f.read().strip()
+            if line.startswith("gitdir:"):
+                return os.path.normpath(os.path.join(d, line.removeprefix("gitdir:").strip()))
+        parent = os.path.dirname(d)
+        if parent == d:
+            return None
+        d = parent
+
+
+def _stamp(path: str) -> tuple[float, int] | None:
+    try:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return None
+
+
+def _meta_stamp(meta: str) -> tuple:
+    """Cheap fingerprint of HEAD, the checked-out ref, index, packed-refs and loose refs."""
+    parts = [_stamp(os.path.join(meta, n)) for n in ("HEAD", "index", "packed-refs", "FETCH_HEAD", "MERGE_HEAD")]
+    try:
+        with open(os.path.join(meta, "HEAD"), encoding="utf-8") as f:
+            head = f.read().strip()
+        if head.startswith("ref:"):
+            parts.append(_stamp(os.path.join(meta, head.removeprefix("ref:").strip())))
+    except OSError:
+        pass
+    refs = os.path.join(meta, "refs")
+    for dirpath, _, filenames in os.walk(refs):
+        parts.append(_stamp(dirpath))
+        parts.extend(_stamp(os.path.join(dirpath, n)) for n in filenames)
+    return tuple(parts)
+
+
+class _WorktreeWatcher(FileSystemEventHandler):
+    """Bump a generation counter on any worktree change outside .git."""
+
+    def __init__(self, root: str):
+        self.generation = 0
+        self._observer = Observer()
+        self._observer.schedule(self, root, recursive=True)
+        self._observer.daemon = True
+        self._observer.start()
+
+    def on_any_event(self, event):
+        path = getattr(event, "src_path", "")
+        if f"{os.sep}.git{os.sep}" not in path and not path.endswith(f"{os.sep}.git"):
+            self.generation += 1
+
+    def stop(self):
+        self._observer.stop()
+
+
+class GitQueryCache:
+    """Cache read-only git queries per directory; invalidate on HEAD/refs/index or worktree change.
+
+    Concurrent identical queries (e.g. /git status and the panel button) share one git process.
+    """
+
+    def __init__(self, worktree_ttl: float = GIT_WORKTREE_TTL):
+        self.worktree_ttl = worktree_ttl
+        self._lock = threading.Lock()
+        self._meta: dict[str, str | None] = {}
+        self._watchers: dict[str, _WorktreeWatcher] = {}
+        self._results: dict[tuple, tuple[tuple, float, ProcResult]] = {}  # key -> (stamp, time, result)
+        self._inflight: dict[tuple, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def cacheable(args: list[str]) -> bool:
+        if not args:
+            return False
+        if args[0] in CACHEABLE:
+            return True
+        rest = args[1:]
+        return args[0] in LIST_ONLY and all(a.startswith("-") for a in rest) and not _MUTATING_FLAGS.intersection(rest)
+
+    def _fingerprint(self, git_dir: str, worktree: bool) -> tuple | None:
+        """(meta stamp, worktree generation) — None when git_dir isn't a repo."""
+        with self._lock:
+            if git_dir not in self._meta:
+                self._meta[git_dir] = _find_git_meta(git_dir)
+                if Observer is not None and self._meta[git_dir]:
+                    try:
+                        self._watchers[git_dir] = _WorktreeWatcher(git_dir)
+                    except OSError as e:
+                        logger.warning("Worktree watch failed for %s: %s", git_dir, e)
+            meta = self._meta[git_dir]
+            watcher = self._watchers.get(git_dir)
+        if meta is None:
+            return None
+        gen = watcher.generation if (worktree and watcher) else None
+        return _meta_stamp(meta), gen
+
+    async def run(self, git_dir: str, args: list[str], timeout: float = 60) -> ProcResult:
+        """Run git query, served from cache while the repo is unchanged."""
+        if not self.cacheable(args):
+            result = await run_process(["git"] + args, cwd=git_dir, timeout=timeout)
+            self.invalidate(git_dir)
+            return result
+
+        key = (git_dir, tuple(args))
+        worktree = args[0] in WORKTREE_DEPENDENT
+        stamp = await run_blocking(self._fingerprint, git_dir, worktree)
+        cached = self._results.get(key)
+        if stamp is not None and cached and cached[0] == stamp:
+            # Without a watcher, worktree queries are trusted only for a short TTL
+            fresh = not worktree or git_dir in self._watchers or time.monotonic() - cached[1] < self.worktree_ttl
+            if fresh:
+                self.hits += 1
+                logger.debug("git %s: cache hit", " ".join(args))
+                return cached[2]
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            # Optional locks off: 'git status' must not rewrite the index and invalidate itself
+            task = asyncio.ensure_future(
+                run_process(["git"] + args, cwd=git_dir, timeout=timeout, env={"GIT_OPTIONAL_LOCKS": "0"})
+            )
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        result = await asyncio.shield(task)
+        if stamp is not None and result.returncode == 0:
+            self._results[key] = (stamp, time.monotonic(), result)
+        return result
+
+    def invalidate(self, git_dir: str | None = None):
+        """Drop cached results for git_dir (all dirs if None)."""
+        for key in [k for k in self._results if git_dir is None or k[0] == git_dir]:
+            del self._results[key]
+
+
+git_cache = GitQueryCache()
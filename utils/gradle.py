@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import os
+import re
+import subprocess
+import time
+from collections import deque
+from config import BUILD_TIMEOUT
+from utils.executor import stream_process
+from utils.jobs import jobs
+from utils.stream import LineSplitter
+
+logger = logging.getLogger("bot.gradle")
+
+_TASK_RE = re.compile(r"^> Task (:\S+)(?:\s+(\S.*))?$")
+# Kotlin "e: file.kt:12:5 msg", javac "File.java:12: error: msg", AAPT/R8 "ERROR: msg"
+_ERROR_RE = re.compile(r"^(e: |\S.*?:\d+: error: |ERROR:|error: )")
+
+
+def gradle_command(cwd: str | None) -> list[str]:
+    """assembleDebug via the project's wrapper, plain console for parseable task lines."""
+    gradlew = os.path.join(cwd, "gradlew.bat") if cwd else "gradlew.bat"
+    return [gradlew, "assembleDebug", "--console=plain"]
+
+
+def apk_output_dirs(cwd: str) -> list[str]:
+    """<module>/build/outputs/apk for every module dir in the project."""
+    try:
+        modules = [e.path for e in os.scandir(cwd) if e.is_dir() and not e.name.startswith(".")]
+    except OSError:
+        return []
+    return [d for d in (os.path.join(m, "build", "outputs", "apk") for m in modules) if os.path.isdir(d)]
+
+
+class BuildProgress:
+    """Parse Gradle output lines into task progress and the first real error."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.current_task = ""
+        self.tasks_done = 0
+        self.error: list[str] = []
+        self.went_wrong: list[str] = []
+        self.tail: deque[str] = deque(maxlen=20)
+        self._in_went_wrong = False
+
+    def feed_line(self, line: str):
+        line = line.rstrip()
+        if not line:
+            self._in_went_wrong = False
+            return
+        self.tail.append(line)
+
+        match = _TASK_RE.match(line)
+        if match:
+            if self.current_task:
+                self.tasks_done += 1
+            self.current_task = match.group(1)
+            return
+
+        if line.startswith("* What went wrong:"):
+            self._in_went_wrong = True
+            return
+        if self._in_went_wrong and len(self.went_wrong) < 10:
+            self.went_wrong.append(line)
+        elif _ERROR_RE.match(line) and not self.error:
+            self.error.append(line)
+        elif self.error and len(self.error) < 4 and line.startswith(" "):
+            self.error.append(line)  # continuation: source line / caret
+
+    @property
+    def elapsed(self) -> int:
+        return int(time.monotonic() - self.started)
+
+    def render(self) -> str:
+        m, s = divmod(self.elapsed, 60)
+        text = f"Building... {m}m {s:02d}s\nTasks done: {self.tasks_done}"
+        if self.current_task:
+            text += f"\n> {self.current_task}"
+        return text
+
+    def first_error(self) -> str:
+        """First compiler error, else Gradle's 'What went wrong' block, else output tail."""
+        lines = self.error or self.went_wrong or list(self.tail)
+        return "\n".join(lines)[:3000]
+
+
+class BuildRun:
+    """One queued or running Gradle invocation, shared by every requester."""
+
+    def __init__(self, cwd: str | None):
+        self.cwd = cwd
+        self.progress = BuildProgress()
+        self.state = "queued"  # queued → running → done
+        self.returncode: int | None = None
+        self.failure = ""  # timeout / spawn error text
+        self.done = asyncio.Event()
+        self.job = jobs.create("build", cwd or "gradlew")
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
+
+    def status_text(self) -> str:
+        if self.state == "queued":
+            return "Build queued (another build running)..."
+        return self.progress.render()
+
+    def summary(self) -> str:
+        """Final message: last line on success, first error on failure."""
+        if self.failure:
+            return self.failure
+        p = self.progress
+        if self.ok:
+            tail = p.tail[-1] if p.tail else ""
+            return f"Build SUCCESS in {p.elapsed}s ({p.tasks_done + bool(p.current_task)} tasks)\n{tail}"
+        return f"Build FAILED (code {self.returncode})\n{p.first_error()}"
+
+
+class BuildQueue:
+    """Run builds one at a time; requests for a project already queued join that run."""
+
+    def __init__(self):
+        self._queue: deque[BuildRun] = deque()
+        self.active: BuildRun | None = None
+        self._worker: asyncio.Task | None = None
+
+    def submit(self, cwd: str | None) -> BuildRun:
+        for run in self._queue:
+            if run.cwd == cwd:
+                logger.debug("Build request coalesced into queued run (%s)", cwd)
+                return run
+        run = BuildRun(cwd)
+        self._queue.append(run)
+        jobs.enqueue(run.job, lambda: self._drop(run))  # listed in /jobs, cancellable while waiting
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._drain())
+        return run
+
+    def _drop(self, run: BuildRun):
+        """/cancel of a build that hasn't started: remove it and wake its requesters."""
+        if run in self._queue:
+            self._queue.remove(run)
+            run.failure, run.state = "Build cancelled.", "done"
+            run.done.set()
+
+    async def _drain(self):
+        while self._queue:
+            run = self._queue.popleft()
+            self.active = run
+            try:
+                # Own task per build so /cancel stops this run, not the queue
+                await asyncio.wait([asyncio.ensure_future(self._execute(run))])
+            finally:
+                self.active = None
+                run.state = "done"
+                run.done.set()
+
+    async def _execute(self, run: BuildRun):
+        run.state = "running"
+        run.progress = BuildProgress()
+        out, err = LineSplitter(run.progress.feed_line), LineSplitter(run.progress.feed_line)
+        logger.debug("Build started in %s", run.cwd)
+        try:
+            async with jobs.track("build", run.job.title, run.job) as job:
+                job.tail_fn = run.progress.render
+                run.returncode = await stream_process(
+                    gradle_command(run.cwd), out, cwd=run.cwd, timeout=BUILD_TIMEOUT, on_error=err,
+                )
+            out(b"", final=True)
+            err(b"", final=True)
+        except asyncio.CancelledError:
+            run.failure = "Build cancelled."
+        except subprocess.TimeoutExpired:
+            run.failure = f"Build timed out ({BUILD_TIMEOUT // 60} min limit)."
+        except Exception as e:
+            logger.error("Build error: %s", e)
+            run.failure = f"Build failed: {e}"
+        logger.debug("Build finished: code=%s, %ds", run.returncode, run.progress.elapsed)
+
+
+build_queue = BuildQueue()
@@ -0,0 +1,122 @@
+import itertools
+import logging
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from PIL import Image, ImageDraw, ImageFont
+from config import ZOOM_GRID, ZOOM_KEEP, ZOOM_OVERVIEW_DIM
+from utils.encoder import downscale
+
+logger = logging.getLogger("bot.grid")
+
+_CELL = re.compile(r"^([A-Za-z])(\d{1,2})$")
+
+
+@dataclass
+class Grid:
+    """Spreadsheet-style cells (A1 = top left) over one captured frame, kept at full resolution."""
+    id: int
+    frame: Image.Image
+    region: dict  # absolute screen geometry of frame
+    cols: int
+    rows: int
+
+    def labels(self) -> list[list[str]]:
+        return [[f"{chr(65 + c)}{r + 1}" for c in range(self.cols)] for r in range(self.rows)]
+
+    def parse(self, label: str) -> tuple[int, int]:
+        """'B3' → (col 1, row 2); ValueError outside this grid."""
+        m = _CELL.match(label.strip())
+        if not m:
+            raise ValueError(f"Not a cell: {label} (expected e.g. B2)")
+        col, row = ord(m.group(1).upper()) - 65, int(m.group(2)) - 1
+        if not (0 <= col < self.cols and 0 <= row < self.rows):
+            raise ValueError(f"{label.upper()} is outside the {self.cols}x{self.rows} grid")
+        return col, row
+
+    def box(self, label: str) -> tuple[int, int, int, int]:
+        """Frame-relative (left, top, right, bottom) of a cell or an 'A1:B2' range."""
+        first, _, last = label.partition(":")
+        c0, r0 = self.parse(first)
+        c1, r1 = self.parse(last) if last else (c0, r0)
+        c0, c1 = sorted((c0, c1))
+        r0, r1 = sorted((r0, r1))
+        w, h = self.frame.size
+        return (c0 * w // self.cols, r0 * h // self.rows, (c1 + 1) * w // self.cols, (r1 + 1) * h // self.rows)
+
+    def region_of(self, label: str) -> dict:
+        """Absolute screen geometry of a cell or range (for /crop)."""
+        left, top, right, bottom = self.box(label)
+        return {"left": self.region["left"] + left, "top": self.region["top"] + top,
+                "width": right - left, "height": bottom - top}
+
+    def point(self, label: str, dx: int | None = None, dy: int | None = None) -> tuple[int, int]:
+        """Absolute screen point: cell center, or (dx, dy) px into the cell as seen on its zoomed tile."""
+        r = self.region_of(label)
+        x = r["left"] + (r["width"] // 2 if dx is None else min(max(dx, 0), r["width"] - 1))
+        y = r["top"] + (r["height"] // 2 if dy is None else min(max(dy, 0), r["height"] - 1))
+        return x, y
+
+    def tile(self, label: str) -> Image.Image:
+        """Full-resolution crop of the cached frame — no new capture."""
+        return self.frame.crop(self.box(label))
+
+    def overview(self, max_dim: int = ZOOM_OVERVIEW_DIM) -> Image.Image:
+        """Downscaled frame with grid lines and cell labels drawn on top."""
+        img = downscale(self.frame, max_dim).copy()
+        w, h = img.size
+        draw = ImageDraw.Draw(img)
+        font = _font(max(12, min(w // self.cols, h // self.rows) // 6))
+        for c in range(1, self.cols):
+            draw.line([(c * w // self.cols, 0), (c * w // self.cols, h)], fill=(255, 64, 64), width=2)
+        for r in range(1, self.rows):
+            draw.line([(0, r * h // self.rows), (w, r * h // self.rows)], fill=(255, 64, 64), width=2)
+        for r, row in enumerate(self.labels()):
+            for c, label in enumerate(row):
+                xy = (c * w // self.cols + 4, r * h // self.rows + 4)
+                draw.text(xy, label, font=font, fill=(255, 255, 255), stroke_width=2, stroke_fill=(0, 0, 0))
+        return img
+
+
+def _font(size: int):
+    try:
+        return ImageFont.load_default(size)
+    except (TypeError, ValueError, OSError):  # bitmap-only build without FreeType
+        return ImageFont.load_default()
+
+
+class GridStore:
+    """The last few overview grids, so taps on an older overview still zoom into its own frame."""
+
+    def __init__(self, keep: int = ZOOM_KEEP):
+        self.keep = keep
+        self._grids: OrderedDict[int, Grid] = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()  # grids are created in worker threads
+
+    def create(self, frame: Image.Image, region: dict, cols: int = ZOOM_GRID[0], rows: int = ZOOM_GRID[1]) -> Grid:
+        with self._lock:
+            grid = Grid(next(self._ids), frame, dict(region), min(cols, 26), rows)
+            self._grids[grid.id] = grid
+            while len(self._grids) > self.keep:
+                self._grids.popitem(last=False)
+        return grid
+
+    def get(self, grid_id: int) -> Grid | None:
+        with self._lock:
+            return self._grids.get(grid_id)
+
+    @property
+    def last(self) -> Grid | None:
+        """Grid that /click and /crop cell labels refer to."""
+        with self._lock:
+            return next(reversed(self._grids.values()), None)
+
+
+grids = GridStore()
+
+
+def is_cell(arg: str) -> bool:
+    """True for cell labels / ranges like B2 or A1:C2 (used to tell them from pixel coordinates)."""
+    return all(_CELL.match(part) for part in arg.split(":", 1))
@@ -0,0 +1,132 @@
+import asyncio
+import contextlib
+import itertools
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable
+from config import JOB_HISTORY, JOB_LIMITS
+from utils.metrics import metrics
+
+logger = logging.getLogger("bot.jobs")
+
+
+@dataclass
+class Job:
+    id: int
+    kind: str
+    title: str
+    status: str = "queued"  # queued → running → done | failed | cancelled
+    created: float = field(default_factory=time.monotonic)
+    started: float | None = None
+    finished: float | None = None
+    task: asyncio.Task | None = None
+    tail_fn: Callable[[], str] | None = None  # live output/progress provider
+    on_cancel: Callable[[], None] | None = None  # drops a job still waiting in its owner's queue
+    result: str = ""
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("queued", "running")
+
+    @property
+    def elapsed(self) -> int:
+        start = self.started or self.created
+        return int((self.finished or time.monotonic()) - start)
+
+    def tail(self, lines: int = 3) -> str:
+        text = self.tail_fn() if self.tail_fn else self.result
+        return "\n".join(text.strip().splitlines()[-lines:])
+
+    def describe(self) -> str:
+        return f"#{self.id} {self.kind} [{self.status} {self.elapsed}s] {self.title[:60]}"
+
+
+class JobManager:
+    """Tracks long operations as jobs with ids, status and per-kind concurrency limits."""
+
+    def __init__(self, limits: dict[str, int] = JOB_LIMITS, history: int = JOB_HISTORY):
+        self.limits = limits
+        self._sems: dict[str, asyncio.Semaphore] = {}
+        self._ids = itertools.count(1)
+        self._jobs: dict[int, Job] = {}
+        self._finished: deque[int] = deque()
+        self.history = history
+
+    def _sem(self, kind: str) -> asyncio.Semaphore:
+        if kind not in self._sems:
+            self._sems[kind] = asyncio.Semaphore(self.limits.get(kind, 4))
+        return self._sems[kind]
+
+    def create(self, kind: str, title: str) -> Job:
+        """Allocate a job id up front (e.g. for a Cancel button); it is listed once track() starts."""
+        return Job(next(self._ids), kind, title)
+
+    def enqueue(self, job: Job, on_cancel: Callable[[], None]):
+        """List a job that waits in its owner's queue before track() starts; cancel calls on_cancel."""
+        job.on_cancel = on_cancel
+        self._jobs[job.id] = job
+        logger.debug("Job queued: %s", job.describe())
+
+    @contextlib.asynccontextmanager
+    async def track(self, kind: str, title: str, job: Job | None = None):
+        """Run the body as a job: wait for a free slot of its kind, record status, allow cancel."""
+        job = job or self.create(kind, title)
+        job.task, job.on_cancel = asyncio.current_task(), None
+        self._jobs[job.id] = job
+        try:
+            async with self._sem(kind):
+                job.status, job.started = "running", time.monotonic()
+                logger.debug("Job started: %s", job.describe())
+                yield job
+            job.status = "done"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            raise
+        except Exception as e:
+            job.status, job.result = "failed", str(e)
+            raise
+        finally:
+            job.finished = time.monotonic()
+            self._retire(job)
+            if job.started:
+                metrics.observe("job", (job.finished - job.started) * 1000, kind=kind)
+            metrics.inc("jobs", kind=kind, status=job.status)
+            logger.debug("Job finished: %s", job.describe())
+
+    def _retire(self, job: Job):
+        self._finished.append(job.id)
+        while len(self._finished) > self.history:
+            self._jobs.pop(self._finished.popleft(), None)
+
+    def get(self, job_id: int) -> Job | None:
+        return self._jobs.get(job_id)
+
+    def list(self) -> list[Job]:
+        """Active jobs first, then recent history, newest first."""
+        jobs = sorted(self._jobs.values(), key=lambda j: j.id, reverse=True)
+        return [j for j in jobs if j.active] + [j for j in jobs if not j.active]
+
+    def cancel(self, job_id: int) -> bool:
+        job = self._jobs.get(job_id)
+        if job is None or not job.active:
+            return False
+        if job.task is None:
+            if job.on_cancel is None:
+                return False
+            job.on_cancel()  # never started: take it out of the queue
+            job.status, job.finished = "cancelled", time.monotonic()
+            self._retire(job)
+            metrics.inc("jobs", kind=job.kind, status=job.status)
+            logger.debug("Queued job cancelled: %s", job.describe())
+            return True
+        job.task.cancel()
+        logger.debug("Job cancel requested: %s", job.describe())
+        return True
+
+    def running_count(self) -> int:
+        return sum(1 for j in self._jobs.values() if j.active)
+
+
+jobs = JobManager()
@@ -0,0 +1,227 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from backends import get_input
+from backends.events import CLICK, TEXT, InputAborted, combo
+from config import MACRO_FILE, MACRO_MAX_EVENTS, MACRO_MAX_WAIT
+from utils.grid import grids, is_cell
+from utils.metrics import stage
+
+logger = logging.getLogger("bot.macro")
+
+WAIT = "wait"  # handled here between Input.send() batches, never reaches the backend
+_WAIT_ARG = re.compile(r"^(\d+(?:\.\d+)?)(ms|s)?$")
+# A type/text step whose argument is a JSON string may contain ';' and newlines
+_QUOTED_STEP = re.compile(r'[ \t]*(type|text)[ \t]+("(?:[^"\\\n]|\\.)*")[ \t]*(?:[;\n]|$)', re.I)
+_STEP_END = re.compile(r"[;\n]")
+
+_running: set[threading.Event] = set()  # abort flag of every macro whose thread hasn't returned yet
+
+
+def _click_point(args: list[str]) -> tuple[int, int]:
+    if args and is_cell(args[0]):
+        grid = grids.last
+        if grid is None:
+            raise ValueError("No grid yet — send /screen grid first")
+        offset = (int(args[1]), int(args[2])) if len(args) >= 3 else (None, None)
+        return grid.point(args[0], *offset)
+    if len(args) < 2:
+        raise ValueError("click needs <x> <y> or a grid cell")
+    return int(args[0]), int(args[1])
+
+
+def text_step(text: str, enter: bool = True) -> str:
+    """Script step typing text; quoted as a JSON string when it wouldn't survive step splitting."""
+    if any(c in text for c in ";\n") or text != text.strip() or text.startswith('"'):
+        text = json.dumps(text, ensure_ascii=False)
+    return f"{'type' if enter else 'text'} {text}"
+
+
+def _split_steps(script: str) -> list[tuple[str, str | None]]:
+    """Script → (step line, decoded text of a quoted type/text step or None)."""
+    steps, pos = [], 0
+    while pos < len(script):
+        m = _QUOTED_STEP.match(script, pos)
+        if m:
+            try:
+                steps.append((f"{m.group(1)} {m.group(2)}", json.loads(m.group(2))))
+                pos = m.end()
+                continue
+            except ValueError:
+                pass  # not valid JSON: take the step literally
+        end = _STEP_END.search(script, pos)
+        steps.append((script[pos:end.start() if end else len(script)], None))
+        pos = end.end() if end else len(script)
+    return steps
+
+
+def compile_script(script: str, store: "MacroStore | None" = None, depth: int = 0) -> list[tuple]:
+    """Script → event list. One step per line or ';':
+
+    key ctrl+s [N] · type <text> (+ Enter) · text <text> · click x y | click B2 [x y]
+    wait 0.5 | wait 200ms · run <saved macro>
+
+    type/text take a JSON string ("a;b\\nc") for text with ';', line breaks or edge spaces.
+    """
+    events: list[tuple] = []
+    for raw, quoted in _split_steps(script):
+        line = raw.strip()
+        if not line or line.startswith("#"):
+            continue
+        op, _, rest = line.partition(" ")
+        op, rest = op.lower(), rest.strip()
+        try:
+            if op == "key":
+                parts = rest.lower().split()
+                repeat = int(parts.pop()) if len(parts) > 1 and parts[-1].isdigit() else 1
+                events += combo(" ".join(parts).split("+"), repeat)
+            elif op in ("type", "text"):
+                events.append((TEXT, rest if quoted is None else quoted))
+                if op == "type":
+                    events += combo(["enter"])
+            elif op == "click":
+                events.append((CLICK, *_click_point(rest.split())))
+            elif op == WAIT:
+                m = _WAIT_ARG.match(rest.lower())
+                if not m:
+                    raise ValueError("wait needs seconds, e.g. wait 0.5 or wait 200ms")
+                seconds = float(m.group(1)) / (1000 if m.group(2) == "ms" else 1)
+                events.append((WAIT, min(seconds, MACRO_MAX_WAIT)))
+            elif op == "run":
+                if store is None or depth >= 3:
+                    raise ValueError("nested run too deep")
+                body = store.get(rest)
+                if body is None:
+                    raise ValueError(f"no macro named {rest}")
+                events += compile_script(body, store, depth + 1)
+            else:
+                raise ValueError(f"unknown step '{op}'")
+        except ValueError as e:
+            raise ValueError(f"{line}: {e}") from None
+        if len(events) > MACRO_MAX_EVENTS:
+            raise ValueError(f"Macro too long (over {MACRO_MAX_EVENTS} events)")
+    return events
+
+
+@dataclass
+class MacroResult:
+    events: int = 0
+    busy: float = 0.0  # seconds spent injecting (waits excluded)
+    elapsed: float = 0.0
+    aborted: bool = False
+
+    @property
+    def rate(self) -> float:
+        """Injected events per second."""
+        return self.events / self.busy if self.busy else 0.0
+
+    def summary(self) -> str:
+        head = f"Aborted after {self.events} events" if self.aborted else f"{self.events} events"
+        return f"{head} in {self.elapsed:.2f}s · {self.rate:,.0f} events/s"
+
+
+def stop_all() -> int:
+    """/macro stop: abort every running macro. Returns how many were running."""
+    for flag in list(_running):
+        flag.set()
+    return len(_running)
+
+
+def run(events: list[tuple], abort: threading.Event) -> MacroResult:
+    """Inject events with waits in between (blocking — run on its own thread). Stops once `abort` is set.
+
+    Each run has its own flag: a cancelled macro's thread keeps checking its flag until it
+    returns, and a new macro can't re-arm it.
+    """
+    result, start, segment = MacroResult(), time.perf_counter(), []
+    backend = get_input()
+    _running.add(abort)
+    try:
+        for event in [*events, (WAIT, 0.0)]:  # sentinel flushes the last segment
+            if event[0] != WAIT:
+                segment.append(event)
+                continue
+            if segment:
+                t = time.perf_counter()
+                with stage("input"):
+                    result.events += backend.send(segment, abort)
+                result.busy += time.perf_counter() - t
+                segment = []
+            if abort.wait(event[1]):  # wait(0) just checks the flag
+                raise InputAborted(0)
+    except InputAborted as e:
+        result.events += e.sent
+        result.aborted = True
+    finally:
+        _running.discard(abort)
+    result.elapsed = time.perf_counter() - start
+    logger.debug("Macro: %s", result.summary())
+    return result
+
+
+class MacroStore:
+    """Saved macros (name → script) persisted as JSON, plus recording of /key, /type and /click."""
+
+    def __init__(self, path: str = MACRO_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._macros: dict[str, str] = {}
+        self._recording: list[str] | None = None
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self._macros = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    def _save(self):
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._macros, f, ensure_ascii=False, indent=1)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning("Macro save failed: %s", e)
+
+    def get(self, name: str) -> str | None:
+        return self._macros.get(name.lower())
+
+    def names(self) -> list[str]:
+        return sorted(self._macros)
+
+    def put(self, name: str, script: str):
+        with self._lock:
+            self._macros[name.lower()] = script
+            self._save()
+
+    def delete(self, name: str) -> bool:
+        with self._lock:
+            if self._macros.pop(name.lower(), None) is None:
+                return False
+            self._save()
+            return True
+
+    @property
+    def recording(self) -> bool:
+        return self._recording is not None
+
+    def start_recording(self):
+        self._recording = []
+
+    def record(self, step: str):
+        """Append a step while recording (called by the input commands after they succeed)."""
+        if self._recording is not None:
+            self._recording.append(step)
+
+    def stop_recording(self) -> str:
+        steps, self._recording = self._recording or [], None
+        return "\n".join(steps)
+
+
+macros = MacroStore()
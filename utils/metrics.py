@@ -0,0 +1,229 @@
+import asyncio
+import contextlib
+import contextvars
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from dataclasses import dataclass, field
+from config import METRICS_DEBUG, METRICS_PROM_FILE, METRICS_PROM_INTERVAL
+
+logger = logging.getLogger("bot.metrics")
+
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, 300000)
+_HELP = {
+    "command": "Handler latency per command",
+    "stage": "Time spent per stage (capture, encode, subprocess, telegram) per command",
+    "telegram_api": "Bot API call latency per endpoint",
+    "job": "Background job duration per kind",
+}
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (ms) plus a small window of recent samples for percentiles."""
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.recent: deque[float] = deque(maxlen=256)
+
+    def observe(self, ms: float):
+        self.buckets[bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.sum += ms
+        self.max = max(self.max, ms)
+        self.recent.append(ms)
+
+    def quantile(self, q: float) -> float:
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def summary(self) -> str:
+        return f"{self.count} · {self.quantile(0.5):.0f}/{self.quantile(0.95):.0f}/{self.max:.0f}"
+
+
+@dataclass
+class RequestTimer:
+    """Stage timings of one handler call (the current one is kept in a context variable)."""
+    command: str
+    start: float = field(default_factory=time.perf_counter)
+    stages: dict[str, float] = field(default_factory=dict)
+
+    @property
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.start) * 1000
+
+    def render(self) -> str:
+        parts = " · ".join(f"{name} {ms:.0f}" for name, ms in self.stages.items())
+        return f"⏱ {self.command} {self.elapsed_ms:.0f}ms" + (f": {parts}" if parts else "")
+
+
+_current: contextvars.ContextVar[RequestTimer | None] = contextvars.ContextVar("request_timer", default=None)
+
+
+class Metrics:
+    """In-memory histograms and counters keyed by metric name + label values."""
+
+    def __init__(self, debug: bool = METRICS_DEBUG, prom_file: str = METRICS_PROM_FILE):
+        self.debug = debug  # attach stage timings to every reply
+        self.prom_file = prom_file
+        self.histograms: dict[tuple[str, tuple], Histogram] = {}
+        self.counters: dict[tuple[str, tuple], int] = {}
+        self._lock = threading.Lock()  # stages are also recorded from worker threads
+        self._written = 0.0
+
+    def observe(self, metric: str, ms: float, **labels):
+        key = (metric, tuple(sorted(labels.items())))
+        with self._lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(ms)
+
+    def inc(self, metric: str, **labels):
+        key = (metric, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def _rows(self, metric: str, label: str, **where) -> list[tuple[str, Histogram]]:
+        with self._lock:
+            rows = [(dict(lbl), h) for (m, lbl), h in self.histograms.items() if m == metric]
+        rows = [(lbl[label], h) for lbl, h in rows if all(lbl.get(k) == v for k, v in where.items())]
+        merged: dict[str, Histogram] = {}
+        for name, h in rows:
+            if name not in merged:
+                merged[name] = Histogram()
+            m = merged[name]
+            m.buckets = [a + b for a, b in zip(m.buckets, h.buckets)]
+            m.count, m.sum, m.max = m.count + h.count, m.sum + h.sum, max(m.max, h.max)
+            m.recent.extend(h.recent)
+        return sorted(merged.items(), key=lambda r: -r[1].sum)
+
+    def report(self, command: str | None = None) -> str:
+        """Text tables for /metrics: count · p50/p95/max ms."""
+        if command:
+            rows = self._rows("stage", "stage", command=command)
+            cmd = dict(self._rows("command", "command")).get(command)
+            head = f"/{command}: {cmd.summary()} ms" if cmd else f"No calls of {command} yet."
+            return head + "".join(f"\n  {name:<12} {h.summary()}" for name, h in rows)
+
+        errors: dict[str, int] = {}
+        with self._lock:
+            for (m, lbl), n in self.counters.items():
+                lbl = dict(lbl)
+                if m == "commands" and lbl.get("status") != "ok":
+                    errors[lbl["command"]] = errors.get(lbl["command"], 0) + n
+        sections = [
+            ("Commands", self._rows("command", "command")),
+            ("Stages", self._rows("stage", "stage")),
+            ("Telegram API", self._rows("telegram_api", "endpoint")),
+            ("Jobs", self._rows("job", "kind")),
+        ]
+        lines = ["count · p50/p95/max ms"]
+        for title, rows in sections:
+            if not rows:
+                continue
+            lines.append(f"\n{title}:")
+            for name, h in rows[:15]:
+                err = f" ({errors[name]} failed)" if errors.get(name) else ""
+                lines.append(f"  {name:<14} {h.summary()}{err}")
+        return "\n".join(lines) if len(lines) > 1 else "No metrics yet."
+
+    def prometheus(self) -> str:
+        """Prometheus text exposition of all histograms and counters."""
+        out: list[str] = []
+        with self._lock:
+            hists = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+        seen = set()
+        for (metric, labels), h in hists:
+            name = f"tgbot_{metric}_milliseconds"
+            if name not in seen:
+                seen.add(name)
+                out += [f"# HELP {name} {_HELP.get(metric, metric)}", f"# TYPE {name} histogram"]
+            lbl = ",".join(f'{k}="{v}"' for k, v in labels)
+            sep = "," if lbl else ""
+            cumulative = 0
+            for bound, n in zip([*BUCKETS_MS, "+Inf"], h.buckets):
+                cumulative += n
+                out.append(f'{name}_bucket{{{lbl}{sep}le="{bound}"}} {cumulative}')
+            out.append(f"{name}_sum{{{lbl}}} {h.sum:.1f}")
+            out.append(f"{name}_count{{{lbl}}} {h.count}")
+        for (metric, labels), n in counters:
+            name = f"tgbot_{metric}_total"
+            if name not in seen:
+                seen.add(name)
+                out.append(f"# TYPE {name} counter")
+            lbl = ",".join(f'{k}="{v}"' for k, v in labels)
+            out.append(f"{name}{{{lbl}}} {n}")
+        return "\n".join(out) + "\n"
+
+    def write_due(self) -> bool:
+        """True (and claims the slot) when the textfile is due for its periodic rewrite."""
+        if not self.prom_file or time.monotonic() - self._written < METRICS_PROM_INTERVAL:
+            return False
+        self._written = time.monotonic()
+        return True
+
+    def maybe_write(self, force: bool = False):
+        """Rewrite METRICS_PROM_FILE (node_exporter textfile format) at most every interval (blocking)."""
+        if not (force and self.prom_file) and not self.write_due():
+            return
+        self._written = time.monotonic()
+        tmp = self.prom_file + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(self.prometheus())
+            os.replace(tmp, self.prom_file)
+        except OSError as e:
+            logger.warning("Metrics file write failed: %s", e)
+
+
+metrics = Metrics()
+
+
+@contextlib.contextmanager
+def stage(name: str):
+    """Time a block as `name` for the current request (works in worker threads too)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - start) * 1000
+        req = _current.get()
+        metrics.observe("stage", ms, stage=name, command=req.command if req else "-")
+        if req:
+            req.stages[name] = req.stages.get(name, 0.0) + ms
+
+
+@contextlib.asynccontextmanager
+async def track_request(command: str):
+    """Time a whole handler call and collect its stage timings."""
+    req = RequestTimer(command)
+    token = _current.set(req)
+    status = "ok"
+    try:
+        yield req
+    except asyncio.CancelledError:
+        status = "cancelled"
+        raise
+    except Exception:
+        status = "error"
+        raise
+    finally:
+        _current.reset(token)
+        metrics.observe("command", req.elapsed_ms, command=command)
+        metrics.inc("commands", command=command, status=status)
+        if metrics.write_due():
+            # File write + rename off the loop, without holding up the request being measured
+            asyncio.get_running_loop().run_in_executor(None, metrics.maybe_write, True)
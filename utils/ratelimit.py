@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import time
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+from config import RATE_LIMITS, TG_CHAT_RATE, TG_GROUP_RATE, TG_MAX_RETRIES, TG_MAX_RETRY_WAIT, TG_OVERALL_RATE
+from utils.chunks import retry_after_seconds
+from utils.metrics import metrics, stage
+
+logger = logging.getLogger("bot.ratelimit")
+
+
+class TokenBucket:
+    """`rate` tokens per second, up to `burst` saved; acquire() waits in FIFO order instead of failing."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.stamp = time.monotonic()
+        self.waiting = 0
+        self._lock = asyncio.Lock()  # FIFO: waiters are served in arrival order
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def delay(self, cost: float = 1.0) -> float:
+        """Seconds until `cost` tokens are available (0 if available now)."""
+        self._refill()
+        return max(0.0, (cost - self.tokens) / self.rate)
+
+    async def acquire(self, cost: float = 1.0) -> float:
+        """Take `cost` tokens, sleeping until they refill. Returns seconds waited."""
+        start = time.monotonic()
+        self.waiting += 1
+        try:
+            async with self._lock:
+                while (wait := self.delay(cost)) > 0:
+                    await asyncio.sleep(wait)
+                self.tokens -= cost
+        finally:
+            self.waiting -= 1
+        return time.monotonic() - start
+
+    def pause(self, seconds: float):
+        """Drain the bucket so nothing passes for `seconds` (e.g. after a flood-wait)."""
+        self._refill()
+        self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+
+class ResourceLimiter:
+    """Shared token buckets per resource group (screen, input, build, upload, ...).
+
+    Commands and panel buttons draw from the same bucket, so /screen and the panel
+    Screen button share one budget. Bursts wait for a token; with a coalesce key, a
+    repeat of a request that is still waiting is merged into it instead of queuing twice.
+    """
+
+    def __init__(self, limits: dict[str, tuple[float, float]] = RATE_LIMITS):
+        self.buckets = {name: TokenBucket(rate, burst) for name, (rate, burst) in limits.items()}
+        self._queued: set[tuple[str, str]] = set()
+
+    async def acquire(self, resource: str, key: str | None = None) -> bool:
+        """Wait for a token. False means the call was coalesced and should not run."""
+        bucket = self.buckets.get(resource)
+        if bucket is None:
+            return True
+        if key is not None:
+            if (resource, key) in self._queued:
+                logger.debug("Coalesced %s/%s into queued request", resource, key)
+                return False
+            self._queued.add((resource, key))
+        try:
+            waited = await bucket.acquire()
+        finally:
+            if key is not None:
+                self._queued.discard((resource, key))
+        if waited > 0.05:
+            logger.debug("%s waited %.1fs for a %s token", key or "request", waited, resource)
+        return True
+
+
+class ChatRateLimiter(BaseRateLimiter):
+    """Throttle Bot API calls that target a chat to Telegram's flood limits.
+
+    ~30 messages/s overall, ~1/s per private chat, 20/min per group. Calls without
+    a chat_id (getUpdates, answerCallbackQuery, ...) pass straight through. A RetryAfter
+    pauses the chat's bucket so queued sends wait it out; send* calls are then retried,
+    while edits are raised since the caller's next edit supersedes them anyway.
+    """
+
+    def __init__(self):
+        self.overall = TokenBucket(*TG_OVERALL_RATE)
+        self._chats: dict[int | str, TokenBucket] = {}
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def _bucket(self, chat_id: int | str) -> TokenBucket:
+        if chat_id not in self._chats:
+            group = isinstance(chat_id, str) or int(chat_id) < 0
+            self._chats[chat_id] = TokenBucket(*(TG_GROUP_RATE if group else TG_CHAT_RATE))
+        return self._chats[chat_id]
+
+    @staticmethod
+    async def _timed(callback, args, kwargs, endpoint: str):
+        start = time.perf_counter()
+        try:
+            with stage("telegram"):
+                return await callback(*args, **kwargs)
+        finally:
+            metrics.observe("telegram_api", (time.perf_counter() - start) * 1000, endpoint=endpoint)
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        chat_id = data.get("chat_id")
+        if chat_id is None:
+            if endpoint == "getUpdates":  # long poll: its duration is idle time, not latency
+                return await callback(*args, **kwargs)
+            return await self._timed(callback, args, kwargs, endpoint)
+
+        bucket = self._bucket(chat_id)
+        retries = TG_MAX_RETRIES if endpoint.startswith("send") else 0
+        for attempt in range(retries + 1):
+            waited = await bucket.acquire()
+            waited += await self.overall.acquire()
+            if waited > 0.05:
+                logger.debug("%s to %s delayed %.1fs by flood limits", endpoint, chat_id, waited)
+            try:
+                return await self._timed(callback, args, kwargs, endpoint)
+            except RetryAfter as e:
+                wait = retry_after_seconds(e)
+                bucket.pause(wait)
+                if attempt == retries or wait > TG_MAX_RETRY_WAIT:
+                    raise
+                logger.warning("%s to %s hit flood control, retrying in %.0fs", endpoint, chat_id, wait)
+
+
+limiter = ResourceLimiter()
@@ -0,0 +1,263 @@
+import contextlib
+import io
+import logging
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import zlib
+from collections import deque
+from dataclasses import dataclass
+from typing import Iterator
+from PIL import Image, ImageChops
+from backends import BackendUnavailable
+from config import RECORD_BUFFER_SECONDS, RECORD_FPS, RECORD_MAX_BYTES, RECORD_MAX_DIM
+from utils.capture import engine
+
+logger = logging.getLogger("bot.recorder")
+
+
+@dataclass
+class _Frame:
+    t: float  # wall clock
+    box: tuple[int, int, int, int] | None  # patch position; None = unchanged
+    data: bytes  # zlib'd RGB of the patch (whole frame for a keyframe)
+    size: tuple[int, int]  # full frame size
+    key: bool = False
+
+
+def _pack(img: Image.Image) -> bytes:
+    return zlib.compress(img.tobytes(), 1)
+
+
+def _unpack(frame: _Frame, size: tuple[int, int]) -> Image.Image:
+    return Image.frombytes("RGB", size, zlib.decompress(frame.data))
+
+
+class FrameRing:
+    """Downscaled frames stored as deltas against the previous one, under a byte and age cap.
+
+    The oldest entry is always a keyframe (full frame); every later entry holds only the
+    changed bounding box, or nothing when the screen didn't change. Evicting the oldest
+    keyframe turns its successor into the new keyframe, so replay always works.
+    """
+
+    def __init__(self, max_bytes: int = RECORD_MAX_BYTES, max_age: float = RECORD_BUFFER_SECONDS):
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._frames: deque[_Frame] = deque()
+        self._bytes = 0
+        self._prev: Image.Image | None = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    @property
+    def span(self) -> float:
+        """Seconds between oldest and newest frame."""
+        return self._frames[-1].t - self._frames[0].t if len(self._frames) > 1 else 0.0
+
+    def push(self, t: float, img: Image.Image):
+        with self._lock:
+            prev = self._prev
+            if prev is None or prev.size != img.size:
+                frame = _Frame(t, (0, 0, *img.size), _pack(img), img.size, key=True)
+            else:
+                box = ImageChops.difference(prev, img).getbbox()
+                frame = _Frame(t, box, _pack(img.crop(box)) if box else b"", img.size)
+            self._frames.append(frame)
+            self._bytes += len(frame.data)
+            self._prev = img
+            while len(self._frames) > 1 and (self._bytes > self.max_bytes or t - self._frames[0].t > self.max_age):
+                self._evict()
+
+    def _evict(self):
+        """Drop the oldest keyframe and fold it into the next frame."""
+        old = self._frames.popleft()
+        self._bytes -= len(old.data)
+        nxt = self._frames[0]
+        if nxt.key:
+            return
+        img = _unpack(old, old.size)
+        if nxt.box:
+            img.paste(_unpack(nxt, (nxt.box[2] - nxt.box[0], nxt.box[3] - nxt.box[1])), nxt.box[:2])
+        self._bytes -= len(nxt.data)
+        self._frames[0] = _Frame(nxt.t, (0, 0, *img.size), _pack(img), img.size, key=True)
+        self._bytes += len(self._frames[0].data)
+
+    def clip(self, since: float = 0.0, until: float | None = None) -> "Clip":
+        """Frames captured between since and until, still compressed (decoded lazily on export)."""
+        with self._lock:
+            return Clip(list(self._frames), since, time.time() if until is None else until)
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self._bytes = 0
+            self._prev = None
+
+
+@dataclass
+class Clip:
+    """Snapshot of ring entries (shared with the ring, not copied) replayed one frame at a time."""
+
+    entries: list[_Frame]  # from the ring's oldest keyframe on
+    since: float
+    until: float
+
+    @property
+    def times(self) -> list[float]:
+        return [f.t for f in self.entries if self.since <= f.t <= self.until]
+
+    @property
+    def size(self) -> tuple[int, int]:
+        return self.entries[-1].size if self.entries else (0, 0)
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def images(self, step: int = 1) -> Iterator[tuple[float, Image.Image]]:
+        """Decode every step-th frame in range. Only the current frame is held; a yielded image is
+        never modified afterwards, and unchanged frames yield the same object."""
+        img, index = None, 0
+        for f in self.entries:
+            if f.t > self.until:
+                return
+            if f.key:
+                img = _unpack(f, f.size)
+            elif f.box and img is not None:
+                img = img.copy()
+                img.paste(_unpack(f, (f.box[2] - f.box[0], f.box[3] - f.box[1])), f.box[:2])
+            if f.t >= self.since and img is not None:
+                if index % step == 0:
+                    yield f.t, img
+                index += 1
+
+
+class Recorder:
+    """Background thread feeding the ring at RECORD_FPS from the /screen capture region."""
+
+    def __init__(self, fps: float = RECORD_FPS):
+        self.fps = fps
+        self.ring = FrameRing()
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self.keep = False  # asked for (startup or /record on), not just running for one clip
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, keep: bool = True) -> bool:
+        """Start the capture thread; False if it was already running. keep=False: for one clip only."""
+        self.keep = self.keep or keep
+        if self.running:
+            return False
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="bot-recorder", daemon=True)
+        self._thread.start()
+        logger.debug("Recorder started at %g fps", self.fps)
+        return True
+
+    def stop(self):
+        self.keep = False
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        self._thread = None
+        logger.debug("Recorder stopped")
+
+    @staticmethod
+    def _region() -> dict | None:
+        screen = sys.modules.get("handlers.screen")  # follow /crop once the screen handler is loaded
+        return screen._crop_region if screen else None
+
+    def _grab(self) -> Image.Image:
+        size, bgra, _ = engine.grab_raw(self._region())
+        img = Image.frombuffer("RGB", size, bgra, "raw", "BGRX", 0, 1)
+        factor = -(-max(size) // RECORD_MAX_DIM)
+        return img.reduce(factor) if factor > 1 else img.copy()
+
+    def _loop(self):
+        interval = 1.0 / self.fps
+        next_tick = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                self.ring.push(time.time(), self._grab())
+            except BackendUnavailable as e:
+                logger.info("Recorder off: %s", e)
+                return
+            except Exception as e:
+                logger.debug("Recorder grab failed: %s", e)
+            next_tick += interval
+            now = time.monotonic()
+            if next_tick < now:  # slow grab: skip missed ticks instead of bursting
+                next_tick = now
+            self._stop.wait(next_tick - now)
+
+    def status(self) -> str:
+        state = f"on ({self.fps:g} fps)" if self.running else "off"
+        return (f"Recorder {state}: {len(self.ring)} frames, {self.ring.span:.0f}s, "
+                f"{self.ring.nbytes / 1024 / 1024:.1f}/{RECORD_MAX_BYTES // 1024 // 1024} MB")
+
+
+recorder = Recorder()
+
+
+def ffmpeg_path() -> str | None:
+    return shutil.which("ffmpeg")
+
+
+def pick_format(requested: str | None, video: bool = True) -> str:
+    """mp4 when ffmpeg is installed, else animated WebP (or GIF if Pillow lacks WebP)."""
+    if requested:
+        return requested
+    if video and ffmpeg_path():
+        return "mp4"
+    from PIL import features
+    return "webp" if features.check("webp") else "gif"
+
+
+def encode_animation(clip: Clip, fmt: str) -> tuple[io.BytesIO, int]:
+    """Animated WebP or GIF with each frame shown until the next one was captured (blocking).
+
+    Pillow keeps every frame of an animation in memory while saving, so busy clips are
+    thinned to what fits in RECORD_MAX_BYTES decoded. Returns the file and the frame count.
+    """
+    width, height = clip.size
+    keep = max(2, RECORD_MAX_BYTES // max(1, width * height * 3))
+    step = -(-len(clip) // keep)
+    times = clip.times[::step]
+    durations = [max(20, int((b - a) * 1000)) for a, b in zip(times, times[1:])]
+    durations.append(durations[-1] if durations else 500)
+    frames = (img for _, img in clip.images(step))
+    first = next(frames)
+    buf = io.BytesIO()
+    if fmt == "webp":
+        first.save(buf, "WEBP", save_all=True, append_images=frames, duration=durations,
+                   loop=0, quality=60, method=0)
+    else:
+        first.save(buf, "GIF", save_all=True, append_images=frames, duration=durations,
+                   loop=0, optimize=False)
+    buf.seek(0)
+    return buf, len(times)
+
+
+def pipe_raw(clip: Clip, proc: subprocess.Popen, timeout: float) -> int:
+    """Feed rgb24 frames to ffmpeg's stdin one at a time, then wait for it (blocking).
+
+    Returns ffmpeg's exit code; a BrokenPipeError means ffmpeg quit early (see its stderr).
+    """
+    try:
+        for _, img in clip.images():
+            proc.stdin.write((img if img.size == clip.size else img.resize(clip.size)).tobytes())
+    finally:
+        with contextlib.suppress(OSError):
+            proc.stdin.close()
+    return proc.wait(timeout)
@@ -0,0 +1,86 @@
+import logging
+import time
+from dataclasses import dataclass
+from PIL import Image, ImageChops
+from config import (
+    SETTLE_INTERVAL, SETTLE_PIXEL_DELTA, SETTLE_QUIET_MS, SETTLE_SAMPLE_DIM, SETTLE_STABLE_MS, SETTLE_TIMEOUT,
+    SETTLE_TOLERANCE,
+)
+from utils.capture import engine
+from utils.metrics import stage
+
+logger = logging.getLogger("bot.settle")
+
+
+@dataclass
+class Settled:
+    elapsed_ms: float
+    samples: int
+    changed: bool  # the screen reacted at all
+    timed_out: bool
+
+    def summary(self) -> str:
+        state = "timed out" if self.timed_out else ("settled" if self.changed else "no change")
+        return f"{state} after {self.elapsed_ms:.0f}ms ({self.samples} samples)"
+
+
+def sample(region: dict | None = None) -> Image.Image | None:
+    """Thumbnail of the screen, or None when capture isn't available (settling then returns at once)."""
+    try:
+        return engine.sample(region, SETTLE_SAMPLE_DIM)
+    except Exception as e:
+        logger.debug("Settle sample failed: %s", e)
+        return None
+
+
+def differs(a: Image.Image, b: Image.Image, tolerance: float = SETTLE_TOLERANCE) -> bool:
+    """More than `tolerance` of the thumbnail's pixels changed (a blinking caret stays below it)."""
+    if a.size != b.size:
+        return True
+    changed = sum(ImageChops.difference(a, b).histogram()[SETTLE_PIXEL_DELTA:])
+    return changed > tolerance * a.width * a.height
+
+
+def wait(baseline: Image.Image | None, region: dict | None = None, stable_ms: float = SETTLE_STABLE_MS,
+         timeout: float = SETTLE_TIMEOUT, quiet_ms: float = SETTLE_QUIET_MS) -> Settled:
+    """Block until the screen changed from `baseline` and then held still for stable_ms.
+
+    stable_ms=0 returns on the first visible change. If nothing changes within quiet_ms the
+    action presumably had no visible effect; timeout caps the wait for animated screens.
+    Without a baseline it only waits for stability.
+    """
+    start = time.perf_counter()
+    prev, changed, stable_since, samples = baseline, baseline is None, start, 0
+    with stage("settle"):
+        while True:
+            cur = sample(region)
+            if cur is None:
+                break
+            samples += 1
+            now = time.perf_counter()
+            if prev is not None and differs(cur, prev):
+                changed, stable_since = True, now
+                if not stable_ms:
+                    break
+            prev = cur
+            if changed and (now - stable_since) * 1000 >= stable_ms:
+                break
+            if not changed and (now - start) * 1000 >= quiet_ms:
+                break
+            if now - start >= timeout:
+                break
+            time.sleep(SETTLE_INTERVAL)
+    elapsed = time.perf_counter() - start
+    result = Settled(elapsed * 1000, samples, changed, elapsed >= timeout)
+    logger.debug("Screen %s", result.summary())
+    return result
+
+
+def after(action, *args, region: dict | None = None, stable_ms: float = SETTLE_STABLE_MS,
+          timeout: float = SETTLE_TIMEOUT, **kwargs):
+    """Run a blocking action, then wait for the screen to settle. Returns the action's result."""
+    baseline = sample(region)
+    result = action(*args, **kwargs)
+    if baseline is not None:
+        wait(baseline, region, stable_ms, timeout)
+    return result
@@ -0,0 +1,145 @@
+import asyncio
+import codecs
+import logging
+import tempfile
+import time
+from telegram.error import BadRequest, RetryAfter
+from config import SEND_GZIP_OVER, STREAM_EDIT_INTERVAL, STREAM_TAIL_CHARS
+from utils.chunks import TG_MSG_LIMIT, gzip_file, retry_after_seconds, tg_len
+from utils.executor import run_blocking
+
+logger = logging.getLogger("bot.stream")
+
+
+class OutputDecoder:
+    """Incremental UTF-8 decoder that switches to cp866 once invalid bytes show up."""
+
+    def __init__(self):
+        self._dec = codecs.getincrementaldecoder("utf-8")()
+
+    def decode(self, data: bytes, final: bool = False) -> str:
+        try:
+            return self._dec.decode(data, final)
+        except UnicodeDecodeError:
+            logger.debug("Output is not UTF-8, switching to cp866")
+            self._dec = codecs.getincrementaldecoder("cp866")(errors="replace")
+            return self._dec.decode(data, final)
+
+
+class LineSplitter:
+    """Byte-chunk callback that decodes and calls on_line per complete line. Call with final=True to flush."""
+
+    def __init__(self, on_line):
+        self._decoder = OutputDecoder()
+        self._partial = ""
+        self._on_line = on_line
+
+    def __call__(self, data: bytes, final: bool = False):
+        text = self._partial + self._decoder.decode(data, final)
+        *lines, self._partial = text.split("\n")
+        for line in lines:
+            self._on_line(line)
+        if final and self._partial:
+            self._on_line(self._partial)
+            self._partial = ""
+
+
+class StreamingReply:
+    """One message showing a rolling tail of output, edited at a throttled rate.
+
+    Full output is spooled (memory up to 1 MB, then disk) and attached as a file
+    when it outgrows a single message.
+    """
+
+    def __init__(self, bot, chat_id: int, message_id: int, header: str, reply_markup=None,
+                 interval: float = STREAM_EDIT_INTERVAL, tail_chars: int = STREAM_TAIL_CHARS):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.header = header
+        self.reply_markup = reply_markup
+        self.interval = interval
+        self.tail_chars = tail_chars
+        self.total_chars = 0
+        self.total_units = 0  # UTF-16 code units, as Telegram counts the message limit
+        self._tail = ""
+        self._decoders = {"out": OutputDecoder(), "err": OutputDecoder()}  # a split UTF-8 char per stream
+        self._spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+        self._shown = ""
+        self._next_edit = 0.0
+        self._started = time.monotonic()
+
+    def feed(self, data: bytes, final: bool = False, stream: str = "out"):
+        """Append raw process output (stdout, or stream="err")."""
+        text = self._decoders[stream].decode(data, final)
+        self._spool.write(text.encode("utf-8"))
+        self.total_chars += len(text)
+        self.total_units += tg_len(text)
+        self._tail = (self._tail + text)[-self.tail_chars:]
+
+    def feed_err(self, data: bytes):
+        """stderr callback for stream_process — decoded separately from stdout."""
+        self.feed(data, stream="err")
+
+    @property
+    def tail(self) -> str:
+        return self._tail
+
+    def _render(self, footer: str) -> str:
+        body = self._tail
+        if self.total_chars > len(body):
+            body = "…" + body[body.find("\n") + 1:] if "\n" in body else "…" + body
+        text = f"{self.header}\n{body}\n{footer}".strip()
+        start = max(0, len(text) - TG_MSG_LIMIT)
+        while (over := tg_len(text[start:]) - TG_MSG_LIMIT) > 0:  # a char is 1-2 units
+            start += max(1, over // 2)
+        return text[start:]
+
+    async def _edit(self, text: str, reply_markup=None):
+        if text == self._shown:
+            return
+        try:
+            await self.bot.edit_message_text(
+                text, chat_id=self.chat_id, message_id=self.message_id, reply_markup=reply_markup,
+            )
+            self._shown = text
+        except RetryAfter as e:
+            self._next_edit = time.monotonic() + retry_after_seconds(e)
+        except BadRequest as e:
+            if "not modified" not in str(e).lower():
+                logger.debug("Stream edit failed: %s", e)
+
+    async def run(self):
+        """Edit the message every interval until cancelled."""
+        while True:
+            await asyncio.sleep(max(self.interval, self._next_edit - time.monotonic()))
+            elapsed = int(time.monotonic() - self._started)
+            await self._edit(self._render(f"[running {elapsed}s]"), self.reply_markup)
+
+    async def finish(self, footer: str):
+        """Final edit without buttons; attach full output if it didn't fit."""
+        self.feed(b"", final=True)
+        self.feed(b"", final=True, stream="err")
+        if self.total_chars == 0:
+            self._tail = "(no output)"
+        # The final state must land: wait out a pending flood-wait instead of dropping the edit
+        for _ in range(3):
+            await asyncio.sleep(max(0.0, self._next_edit - time.monotonic()))
+            await self._edit(self._render(footer))
+            if self._next_edit <= time.monotonic():
+                break
+        if self.total_units + tg_len(self.header) + tg_len(footer) + 2 > TG_MSG_LIMIT:
+            self._spool.seek(0, 2)
+            size = self._spool.tell()
+            self._spool.seek(0)
+            doc, name = self._spool, "output.txt"
+            if size > SEND_GZIP_OVER:
+                doc, name = await run_blocking(gzip_file, self._spool), "output.txt.gz"
+            try:
+                await self.bot.send_document(
+                    self.chat_id, document=doc, filename=name,
+                    caption=f"Full output ({self.total_chars} chars)",
+                )
+            finally:
+                doc.close()
+        self._spool.close()
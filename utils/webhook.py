@@ -0,0 +1,87 @@
+import asyncio
+import json
+import logging
+import time
+from telegram import Update
+from telegram.error import TelegramError
+from telegram.ext import Application, ContextTypes, TypeHandler
+from config import (
+    UPDATE_RECORD_FILE, WEBHOOK_HEALTH_INTERVAL, WEBHOOK_LISTEN, WEBHOOK_PATH, WEBHOOK_PORT, WEBHOOK_SECRET,
+    WEBHOOK_URL,
+)
+
+logger = logging.getLogger("bot.webhook")
+
+mode = "polling"  # current update delivery, shown in /status
+_watchdog: asyncio.Task | None = None
+
+
+def webhook_available() -> str | None:
+    """None if webhook mode can run, else the reason to fall back to polling."""
+    if not WEBHOOK_URL:
+        return "WEBHOOK_URL not set"
+    try:
+        import tornado  # noqa: F401 — PTB's embedded webhook server
+    except ImportError:
+        return "tornado missing (pip install 'python-telegram-bot[webhooks]')"
+    return None
+
+
+async def _record(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Append every raw update to UPDATE_RECORD_FILE for replay with `python -m bench.webhook`."""
+    with open(UPDATE_RECORD_FILE, "a", encoding="utf-8") as f:
+        f.write(json.dumps(update.to_dict(), ensure_ascii=False) + "\n")
+
+
+async def _watch_webhook(app: Application):
+    """Fall back to polling if Telegram reports it can't deliver to our webhook."""
+    global mode
+    while True:
+        await asyncio.sleep(WEBHOOK_HEALTH_INTERVAL)
+        if mode != "webhook":
+            return
+        try:
+            info = await app.bot.get_webhook_info()
+        except TelegramError as e:
+            logger.debug("getWebhookInfo failed: %s", e)
+            continue
+        error_at = info.last_error_date.timestamp() if info.last_error_date else 0
+        if info.pending_update_count and time.time() - error_at < WEBHOOK_HEALTH_INTERVAL:
+            logger.warning("Webhook failing (%s, %d pending) — switching to polling",
+                           info.last_error_message, info.pending_update_count)
+            await app.updater.stop()
+            await app.updater.start_polling()  # also deletes the webhook
+            mode = "polling"
+
+
+async def _start_watchdog(app: Application):
+    # post_init runs before the application is started, so not via app.create_task
+    global _watchdog
+    _watchdog = asyncio.create_task(_watch_webhook(app))
+
+
+def run(app: Application):
+    """Serve updates via webhook when configured, else (or if it fails to start) long polling."""
+    global mode
+    if UPDATE_RECORD_FILE:
+        app.add_handler(TypeHandler(Update, _record), group=-1)
+
+    reason = webhook_available()
+    if reason is None:
+        url = f"{WEBHOOK_URL.rstrip('/')}/{WEBHOOK_PATH}"
+        mode = "webhook"
+        app.post_init = _start_watchdog
+        logger.info("Webhook mode: %s (listening on %s:%d)", url, WEBHOOK_LISTEN, WEBHOOK_PORT)
+        try:
+            app.run_webhook(
+                listen=WEBHOOK_LISTEN, port=WEBHOOK_PORT, url_path=WEBHOOK_PATH, webhook_url=url,
+                secret_token=WEBHOOK_SECRET, close_loop=False,
+            )
+            return
+        except (TelegramError, OSError, RuntimeError) as e:
+            reason = f"webhook failed to start: {e}"
+        app.post_init = None
+
+    mode = "polling"
+    logger.info("Polling mode (%s)", reason)
+    app.run_polling()
@@ -1,52 +1,167 @@
+import difflib
+import itertools
 import logging
+import threading
 import time
-import pygetwindow as gw
+from dataclasses import dataclass
+from backends import WindowInfo, get_window
+from config import SETTLE_FOCUS_TIMEOUT, WINDOW_TTL
+from utils import settle
 
 logger = logging.getLogger("bot.window")
 
 
-def _activate_window(win):
-    """Activate window with minimize/restore fallback for Windows."""
+@dataclass
+class WindowEntry:
+    id: int  # short id, stable while the window exists
+    info: WindowInfo
+
+    def describe(self) -> str:
+        proc = f" — {self.info.process}" if self.info.process else ""
+        return f"#{self.id} {self.info.title[:60]}{proc}" + (" (min)" if self.info.minimized else "")
+
+
+def _score(query: str, text: str) -> float:
+    """0..100: exact > prefix > word prefix > substring > all words > in-order letters > similar."""
+    q, t = query.lower(), text.lower()
+    if not q or not t:
+        return 0.0
+    if q == t:
+        return 100.0
+    if t.startswith(q):
+        return 90.0
+    pos = t.find(q)
+    if pos >= 0:
+        word_start = t[pos - 1] in " -_./\\|:[(" if pos else True
+        return (85.0 if word_start else 75.0) - min(pos, 50) / 10
+    words = q.split()
+    if len(words) > 1 and all(w in t for w in words):
+        return 65.0
+    it = iter(t)
+    if all(ch in it for ch in q.replace(" ", "")):  # letters in order: "vsc" → "Visual Studio Code"
+        return 40.0 + 20.0 * len(q) / len(t)
+    ratio = difflib.SequenceMatcher(None, q, t).ratio()
+    return ratio * 40.0 if ratio > 0.6 else 0.0
+
+
+class WindowRegistry:
+    """Cached window list with short ids that stay stable across refreshes.
+
+    The OS enumeration is re-run only when the cache is older than WINDOW_TTL (or on
+    demand), so repeated /windows, /focus and capture calls don't re-enumerate. Refresh
+    also notes which windows appeared or closed since the last one.
+    """
+
+    def __init__(self, ttl: float = WINDOW_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._entries: dict[int, WindowEntry] = {}  # handle -> entry, topmost first
+        self._refreshed = 0.0
+        self.version = 0  # bumped whenever windows open or close
+
+    def refresh(self, force: bool = False) -> list[WindowEntry]:
+        """Re-enumerate if stale (blocking). Returns entries, topmost first."""
+        with self._lock:
+            if not force and time.monotonic() - self._refreshed < self.ttl:
+                return list(self._entries.values())
+            windows = get_window().list_windows()
+            old, entries = self._entries, {}
+            for info in windows:
+                entry = old.get(info.handle)
+                if entry is None:
+                    entry = WindowEntry(next(self._ids), info)
+                entry.info = info
+                entries[info.handle] = entry
+            added, closed = entries.keys() - old.keys(), old.keys() - entries.keys()
+            if added or closed:
+                self.version += 1
+                logger.debug("Windows: %d open, %d new, %d closed", len(entries), len(added), len(closed))
+            self._entries, self._refreshed = entries, time.monotonic()
+            return list(entries.values())
+
+    def get(self, window_id: int) -> WindowEntry | None:
+        """Entry by short id from the cache — no enumeration."""
+        with self._lock:
+            return next((e for e in self._entries.values() if e.id == window_id), None)
+
+    def by_handle(self, handle: int) -> WindowEntry | None:
+        entry = self._entries.get(handle)
+        if entry is None:
+            self.refresh(force=True)
+            entry = self._entries.get(handle)
+        return entry
+
+    def match(self, query: str, limit: int = 5) -> list[tuple[float, WindowEntry]]:
+        """Best matches by title (or process name, slightly lower), ties broken by z-order."""
+        scored = []
+        for z, entry in enumerate(self.refresh()):
+            score = max(_score(query, entry.info.title), _score(query, entry.info.process) * 0.9)
+            if score > 0:
+                scored.append((score, -z, entry))
+        scored.sort(key=lambda s: (s[0], s[1]), reverse=True)
+        return [(score, entry) for score, _, entry in scored[:limit]]
+
+    def resolve(self, query: str) -> WindowEntry | None:
+        """'#3' / '3' → entry by id, anything else → best fuzzy match."""
+        key = query.strip().removeprefix("#")
+        if key.isdigit():
+            entry = self.get(int(key))
+            if entry is not None:
+                return entry
+        best = self.match(query, limit=1)
+        return best[0][1] if best else None
+
+    def rect(self, entry: WindowEntry) -> tuple[int, int, int, int] | None:
+        """Current bounds of a known window (one OS call; the window may have moved)."""
+        rect = get_window().rect(entry.info.handle)
+        if rect is not None:
+            entry.info.rect = rect
+        return rect
+
+    def active(self) -> WindowEntry | None:
+        handle = get_window().active_handle()
+        return self.by_handle(handle) if handle is not None else None
+
+
+registry = WindowRegistry()
+
+
+def region_of(rect: tuple[int, int, int, int]) -> dict:
+    left, top, width, height = rect
+    return {"left": left, "top": top, "width": width, "height": height}
+
+
+def focus_entry(entry: WindowEntry) -> tuple[bool, str]:
+    """Activate a registry entry; returns once it has been drawn."""
     try:
-        win.activate()
-    except Exception:
-        # Windows blocks .activate() when caller isn't foreground —
-        # minimize+restore forces the OS to bring it forward
-        if win.isMinimized:
-            win.restore()
-        else:
-            win.minimize()
-            time.sleep(0.1)
-            win.restore()
+        settle.after(get_window().activate, entry.info.handle, stable_ms=100, timeout=SETTLE_FOCUS_TIMEOUT)
+        return True, f"Focused: {entry.describe()}"
+    except Exception as e:
+        logger.error("focus_entry error: %s", e)
+        return False, f"Focus failed: {e}"
 
 
 def focus_window(title: str) -> tuple[bool, str]:
-    """Find window by partial title match and activate it."""
+    """Focus a window by id (#3) or best fuzzy title/process match."""
     try:
-        matches = gw.getWindowsWithTitle(title)
-        if not matches:
-            logger.debug("No windows matching '%s'", title)
-            return False, f"No window found matching '{title}'"
-
-        win = matches[0]
-        _activate_window(win)
-        time.sleep(0.3)
-        logger.debug("Focused window: %s", win.title)
-        return True, f"Focused: {win.title}"
+        entry = registry.resolve(title)
     except Exception as e:
         logger.error("focus_window error: %s", e)
         return False, f"Focus failed: {e}"
+    if entry is None:
+        logger.debug("No windows matching '%s'", title)
+        return False, f"No window found matching '{title}'"
+    logger.debug("focus_window(%s): %s", title, entry.describe())
+    return focus_entry(entry)
 
 
 def get_active_window_rect() -> tuple[int, int, int, int] | None:
     """Return (left, top, width, height) of active window, or None."""
     try:
-        win = gw.getActiveWindow()
-        if win is None:
-            logger.debug("No active window found")
-            return None
-        rect = (win.left, win.top, win.width, win.height)
-        logger.debug("Active window rect: %s (%s)", rect, win.title)
+        handle = get_window().active_handle()
+        rect = get_window().rect(handle) if handle is not None else None
+        logger.debug("Active window rect: %s", rect)
         return rect
     except Exception as e:
         logger.error("get_active_window_rect error: %s", e)